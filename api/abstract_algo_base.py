@@ -6,12 +6,18 @@ class Algorithms(ABC):
 
     @staticmethod
     @abstractmethod
-    def merge_sort(data: list[dict], key: str, reverse: bool = False) -> list[dict]:
+    def merge_sort(data: list[dict], key: str, reverse: bool = False, deadline=None) -> list[dict]:
         """Perform a mergesort on a list of dictionaries."""
         raise NotImplementedError
 
     @staticmethod
     @abstractmethod
-    def quick_sort(data: list[dict], key: str, reverse: bool = False) -> list[dict]:
+    def quick_sort(data: list[dict], key: str, reverse: bool = False, deadline=None) -> list[dict]:
         """Perform a quicksort on a list of dictionaries."""
         raise NotImplementedError
+
+    @staticmethod
+    @abstractmethod
+    def natural_merge_sort(data: list[dict], key: str, reverse: bool = False, deadline=None) -> list[dict]:
+        """Perform a natural (run detecting) mergesort on a list of dictionaries."""
+        raise NotImplementedError
@@ -1,17 +1,176 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Max, Min
+from django.db.models.functions import Lower
+from django.utils.functional import cached_property
 from api.models import Company, FinancialData, CompanyDetails
+from api.signals import bulk_delete, sync_companies
+
+
+# SQLite's LOWER() folds A-Z only
+ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that does not count a whole big table on every changelist page.
+
+    An unfiltered list is estimated from the primary key range - two index lookups instead of a
+    full scan. Deleted rows leave gaps, so the estimate can be too high and the last pages may
+    come out empty. Filtered lists and small tables are counted exactly.
+    """
+
+    # Below this many rows the exact COUNT(*) is cheap enough
+    EXACT_COUNT_LIMIT = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.where or query.distinct:
+            return super().count
+        bounds = self.object_list.order_by().aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            return 0
+        estimate = bounds['high'] - bounds['low'] + 1
+        if estimate < self.EXACT_COUNT_LIMIT:
+            return super().count
+        return estimate
+
+
+class CompanyValueFilter(admin.SimpleListFilter):
+    """List filter on a column of the related company.
+
+    The choices are read from the indexed company table, the default filter of a related
+    field would collect them with a JOIN over every row of the listed table.
+    """
+
+    company_field = None
+
+    def lookups(self, request, model_admin):
+        values = Company.objects.order_by(self.company_field).values_list(self.company_field, flat=True).distinct()
+        return [(value, value) for value in values]
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        return queryset.filter(**{f'company__{self.company_field}': self.value()})
+
+
+class IndustryFilter(CompanyValueFilter):
+    title = 'industry'
+    parameter_name = 'industry'
+    company_field = 'industry'
+
+
+class CountryFilter(CompanyValueFilter):
+    title = 'country'
+    parameter_name = 'country'
+    company_field = 'country'
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Base admin for the tables with millions of rows.
+
+    Estimated counts, no full count next to a filtered result, a case insensitive company
+    name prefix search that runs on the lower cased name index, and deletes that update the
+    search snapshot once for all the deleted rows.
+
+    Methods
+    _______
+    get_search_results(request, queryset, search_term: str) -> tuple
+        Filters by a case insensitive company name prefix with a range on the lower cased name index.
+    delete_queryset(request, queryset) -> None
+        Deletes the rows with plain DELETE statements and syncs the touched companies in one go.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        """Filters by a case insensitive company name prefix with a range on the lower cased name index.
+
+        SQLite runs the LIKE of the default search as a full scan, a range on `LOWER(name)` is a
+        seek in the `company_name_lower_idx` expression index. SQLite's LOWER only folds ASCII
+        letters, so the term is folded the same way - other letters have to match their case.
+        The related tables are filtered through a subquery, so SQLite starts from the name index
+        instead of walking the whole table in the list order.
+
+        :param search_term: The typed search term.
+        :type search_term: str.
+        :return: The filtered queryset and whether it may hold duplicates.
+        :rType: tuple[QuerySet, bool].
+        """
+        prefix = search_term.strip().translate(ASCII_LOWER)
+        if not prefix:
+            return queryset, False
+
+        companies = queryset if queryset.model is Company else Company.objects.all()
+        companies = companies.alias(name_lower=Lower('name')).filter(
+            name_lower__gte=prefix, name_lower__lt=prefix + '\U0010ffff',
+        )
+        if queryset.model is Company:
+            return companies, False
+        return queryset.filter(company__in=companies), False
+
+    def delete_queryset(self, request, queryset):
+        """Deletes the rows with plain DELETE statements and syncs the touched companies in one go.
+
+        :param queryset: The selected rows.
+        :type queryset: QuerySet.
+        """
+        bulk_delete(queryset)
+
 
 # Model registering in Django admin Panel
 @admin.register(Company)
-class CompanyAdmin(admin.ModelAdmin):
+class CompanyAdmin(LargeTableAdmin):
     list_display = ('name', 'country', 'industry', 'founded_year')
+    list_filter = ('industry', 'country')
+    search_fields = ('name',)
+    actions = ('resync_search_rows',)
+
+    @admin.action(description="Resync the search rows of the selected companies")
+    def resync_search_rows(self, request, queryset):
+        company_ids = list(queryset.values_list('pk', flat=True))
+        with transaction.atomic():
+            sync_companies(company_ids)
+        self.message_user(request, f"Resynced {len(company_ids)} companies.", messages.SUCCESS)
 
 
 @admin.register(FinancialData)
-class FinancialDataAdmin(admin.ModelAdmin):
+class FinancialDataAdmin(LargeTableAdmin):
     list_display = ('company', 'year', 'revenue', 'net_income')
+    list_select_related = ('company',)
+    list_filter = ('year', IndustryFilter, CountryFilter)
+    raw_id_fields = ('company',)
+    search_fields = ('company__name',)
 
 
 @admin.register(CompanyDetails)
-class CompanyDetailsAdmin(admin.ModelAdmin):
+class CompanyDetailsAdmin(LargeTableAdmin):
     list_display = ('company', 'company_type', 'size', 'ceo_name', 'headquarters')
+    list_select_related = ('company',)
+    list_filter = ('company_type', IndustryFilter, CountryFilter)
+    raw_id_fields = ('company',)
+    search_fields = ('company__name',)
+    actions = ('mark_public', 'mark_private')
+
+    def _set_company_type(self, request, queryset, company_type: str) -> None:
+        """Updates the selected rows with one query and syncs their companies - `update` sends no signals.
+
+        :param company_type: The new company type.
+        :type company_type: str.
+        """
+        with transaction.atomic():
+            company_ids = list(queryset.values_list('company_id', flat=True))
+            updated = queryset.update(company_type=company_type)
+            sync_companies(company_ids)
+        self.message_user(request, f"{updated} companies marked as {company_type}.", messages.SUCCESS)
+
+    @admin.action(description="Mark the selected companies as public")
+    def mark_public(self, request, queryset):
+        self._set_company_type(request, queryset, CompanyDetails.CompanyTypeChoices.PUBLIC)
+
+    @admin.action(description="Mark the selected companies as private")
+    def mark_private(self, request, queryset):
+        self._set_company_type(request, queryset, CompanyDetails.CompanyTypeChoices.PRIVATE)
@@ -0,0 +1,245 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from .csv_snapshot import SNAPSHOT_COLUMNS
+from .custom_exceptions import SearchDeadlineExceeded, SearchOverloaded
+
+
+class FieldStats:
+    """Number of distinct values of one company field, the selectivity statistic of the cost estimate.
+
+    Kept in the snapshot index registry next to the fuzzy and autocomplete indexes. The count
+    is an estimate, so a patched snapshot keeps the count of the version it was built for.
+
+    Methods
+    _______
+    build(field: str, rollups: dict) -> FieldStats
+        Counts the distinct values of the field over all companies.
+    patched(changes: dict) -> FieldStats
+        Returns the statistics for the next snapshot version.
+    """
+
+    __slots__ = ('field', 'distinct')
+
+    def __init__(self, field: str, distinct: int):
+        """
+        :param field: The company field.
+        :type field: str.
+        :param distinct: The number of distinct lowercased values.
+        :type distinct: int.
+        """
+        self.field = field
+        self.distinct = distinct
+
+    @classmethod
+    def build(cls, field: str, rollups: dict):
+        """Counts the distinct values of the field over all companies.
+
+        :param field: The company field.
+        :type field: str.
+        :param rollups: Company id -> its rollup row, see `DataSnapshot.rollups`.
+        :type rollups: dict[int, dict].
+        :rType: FieldStats.
+        """
+        values = {str(row[field]).lower() for row in rollups.values() if row.get(field) is not None}
+        return cls(field, len(values))
+
+    def patched(self, changes: dict):
+        """Returns the statistics for the next snapshot version, a few changed companies don't move the estimate.
+
+        :rType: FieldStats.
+        """
+        return self
+
+
+class QueryCost:
+    """Estimated work of one search, in rows matched against a filter.
+
+    Follows `filter_data`: every clause scans the rows left by the clauses before it, and
+    the result is sorted by a custom algorithm and encoded to JSON at the end.
+
+    Methods
+    _______
+    estimate(snapshot, data: list, clauses: list, sort_field: str) -> QueryCost
+        Estimates the cost of a parsed search from the snapshot statistics.
+    """
+
+    # Fraction of the rows kept by a filter of the operator, equality uses the distinct count of the field
+    SELECTIVITY = {"~": 0.1, "%": 0.01, ">": 0.33, "<": 0.33, ">=": 0.33, "<=": 0.33}
+    DEFAULT_SELECTIVITY = 0.1
+
+    # Cost of one sort comparison and of encoding one returned row, relative to one filter match
+    SORT_WEIGHT = 2
+    ENCODE_WEIGHT = 10
+
+    __slots__ = ('rows_scanned', 'rows_sorted', 'rows_returned', 'units')
+
+    def __init__(self, rows_scanned: int, rows_sorted: int, rows_returned: int):
+        """
+        :param rows_scanned: The estimated rows matched against the filters.
+        :type rows_scanned: int.
+        :param rows_sorted: The estimated rows sorted, 0 without a sort.
+        :type rows_sorted: int.
+        :param rows_returned: The estimated rows in the result.
+        :type rows_returned: int.
+        """
+        self.rows_scanned = rows_scanned
+        self.rows_sorted = rows_sorted
+        self.rows_returned = rows_returned
+        self.units = int(
+            rows_scanned
+            + self.SORT_WEIGHT * rows_sorted * math.log2(max(rows_sorted, 2))
+            + self.ENCODE_WEIGHT * rows_returned
+        )
+
+    @classmethod
+    def _selectivity(cls, snapshot, f: dict) -> float:
+        """The estimated fraction of the rows that match a filter.
+
+        :rType: float.
+        """
+        if f["op"] in (":", "="):
+            # Only the snapshot columns get statistics, a field name of the query must not build an index
+            if f["field"] not in SNAPSHOT_COLUMNS:
+                return cls.DEFAULT_SELECTIVITY
+            distinct = snapshot.index(FieldStats, f["field"]).distinct if snapshot.rollups else 0
+            return 1 / distinct if distinct else cls.DEFAULT_SELECTIVITY
+        if f["op"] == "%" and "terms" in f:
+            # Already narrowed by the fuzzy index in `_select_data`
+            return 1.0
+        return cls.SELECTIVITY.get(f["op"], cls.DEFAULT_SELECTIVITY)
+
+    @classmethod
+    def estimate(cls, snapshot, data: list, clauses: list, sort_field: str = None):
+        """Estimates the cost of a parsed search from the snapshot statistics.
+
+        :param snapshot: The searched snapshot.
+        :type snapshot: DataSnapshot.
+        :param data: The rows returned by `_select_data`.
+        :type data: list[dict].
+        :param clauses: Parsed query filters from `_parse_query`.
+        :type clauses: list[dict].
+        :param sort_field: The sort field, None without a sort.
+        :type sort_field: str.
+        :rType: QueryCost.
+        """
+        rows, scanned = float(len(data)), 0.0
+        for clause in clauses:
+            scanned += rows
+            if clause.get("logic") != "OR":
+                for f in clause.get("filters", []):
+                    rows *= cls._selectivity(snapshot, f)
+        rows = int(math.ceil(rows))
+        return cls(int(scanned), rows if sort_field else 0, rows)
+
+
+class Deadline:
+    """The time by which a search has to finish, checked cooperatively in the filter and sort loops.
+
+    Methods
+    _______
+    start() -> Deadline | NoDeadline
+        Starts the deadline of a request (`SEARCH_DEADLINE_MS` setting).
+    check() -> None
+        Raises `SearchDeadlineExceeded` once the deadline has passed.
+    """
+
+    __slots__ = ('expires_at',)
+
+    def __init__(self, seconds: float):
+        """
+        :param seconds: The time budget from now on.
+        :type seconds: float.
+        """
+        self.expires_at = time.monotonic() + seconds
+
+    @staticmethod
+    def start():
+        """Starts the deadline of a request, a no-op deadline if `SEARCH_DEADLINE_MS` is 0.
+
+        :rType: Deadline | NoDeadline.
+        """
+        budget_ms = getattr(settings, 'SEARCH_DEADLINE_MS', 0)
+        return Deadline(budget_ms / 1000) if budget_ms > 0 else NO_DEADLINE
+
+    def check(self) -> None:
+        """Raises `SearchDeadlineExceeded` once the deadline has passed.
+
+        :raises SearchDeadlineExceeded: If the search ran out of time.
+        """
+        if time.monotonic() >= self.expires_at:
+            raise SearchDeadlineExceeded("The search did not finish in time, narrow it down or try again later")
+
+
+class NoDeadline:
+    """Do-nothing stand-in for `Deadline` used while the deadline is disabled."""
+
+    __slots__ = ()
+
+    def check(self) -> None:
+        pass
+
+
+NO_DEADLINE = NoDeadline()
+
+
+class AdmissionControl:
+    """Per-process concurrency budget for the heavy searches.
+
+    A search whose estimated cost reaches `SEARCH_HEAVY_QUERY_COST` needs one of the
+    `SEARCH_HEAVY_QUERY_CONCURRENCY` slots. If none frees up within `SEARCH_ADMISSION_WAIT_MS`
+    the search is rejected right away instead of queueing behind the others, cheap searches
+    are always admitted.
+
+    Methods
+    _______
+    admit(cost: QueryCost) -> ContextManager
+        Holds a heavy query slot for the duration of the block.
+    reset() -> None
+        Drops the slots, they are created again from the current settings.
+    """
+
+    _lock = threading.Lock()
+    _slots = None
+    _size = None
+
+    @classmethod
+    def _semaphore(cls, size: int) -> threading.BoundedSemaphore:
+        """The slot semaphore, created again when the configured concurrency changes.
+
+        :rType: threading.BoundedSemaphore.
+        """
+        with cls._lock:
+            if cls._slots is None or cls._size != size:
+                cls._slots, cls._size = threading.BoundedSemaphore(size), size
+            return cls._slots
+
+    @classmethod
+    @contextmanager
+    def admit(cls, cost: QueryCost):
+        """Holds a heavy query slot for the duration of the block.
+
+        :param cost: The estimated cost of the search.
+        :type cost: QueryCost.
+        :raises SearchOverloaded: If the search is heavy and every slot stayed taken.
+        """
+        size = getattr(settings, 'SEARCH_HEAVY_QUERY_CONCURRENCY', 0)
+        if size <= 0 or cost.units < getattr(settings, 'SEARCH_HEAVY_QUERY_COST', 0):
+            yield
+            return
+
+        slots = cls._semaphore(size)
+        if not slots.acquire(timeout=getattr(settings, 'SEARCH_ADMISSION_WAIT_MS', 0) / 1000):
+            raise SearchOverloaded("Too many heavy searches are running, try again later")
+        try:
+            yield
+        finally:
+            slots.release()
+
+    @classmethod
+    def reset(cls) -> None:
+        """Drops the slots, they are created again from the current settings."""
+        with cls._lock:
+            cls._slots, cls._size = None, None
@@ -1,3 +1,5 @@
+import operator
+import random
 from .abstract_algo_base import Algorithms
 
 
@@ -9,15 +11,34 @@ class CustomAlgorithms(Algorithms):
     
     Methods
     _______
-    merge_sort(data: list[dict], key: str, reverse: bool) -> list[dict]
+    merge_sort(data: list[dict], key: str, reverse: bool, deadline: Deadline = None) -> list[dict]
         Performs a mergesort on a list of dictionaries with None-safe comparisons.
-    quick_sort(data: list, key: str, reverse: bool = False) -> list
+    quick_sort(data: list, key: str, reverse: bool = False, deadline: Deadline = None) -> list
         Perform an quciksort on a list of dictionaries.
+    natural_merge_sort(data: list, key: str, reverse: bool = False, deadline: Deadline = None) -> list
+        Perform a mergesort that merges the already ordered runs of the input.
+    algorithm_name(requested: str) -> str
+        Normalizes the algorithm requested by the client.
+    choose_algorithm(data: list, key: str, reverse: bool) -> str
+        Picks the algorithm for the data from a sample of it ("auto").
+    sort(data: list, key: str, reverse: bool, algorithm: str, deadline: Deadline = None) -> tuple[list, str]
+        Sorts with the requested algorithm and tells which one ran.
 
     """
 
+    # Partitions of at least this size check the request deadline
+    DEADLINE_CHECK_SIZE = 4096
+
+    # Runs shorter than this are extended by insertion sort before merging
+    MIN_RUN = 32
+
+    # "auto": how many neighbouring pairs are sampled and the limits it decides by
+    AUTO_SAMPLE_SIZE = 256
+    AUTO_MAX_DESCENT_RATE = 0.02
+    AUTO_MAX_DISTINCT_RATE = 0.1
+
     @staticmethod
-    def merge_sort(data: list, key: str, reverse: bool = False) -> list:
+    def merge_sort(data: list, key: str, reverse: bool = False, deadline=None) -> list:
         """Perform a mergesort on a list of dictionaries.
         
         :param data: The list of dictionaries to sort.
@@ -26,15 +47,21 @@ class CustomAlgorithms(Algorithms):
         :type key: str
         :param reverse: Sort descending if True; ascending otherwise.
         :type reverse: bool
+        :param deadline: The request deadline, checked around every big partition.
+        :type deadline: Deadline | None
         :return: A new list of dictionaries sorted by the given key.
         :rtype: list[dict]
         """
         if len(data) <= 1:
             return data
+        if deadline is not None and len(data) >= CustomAlgorithms.DEADLINE_CHECK_SIZE:
+            deadline.check()
 
         mid = len(data) // 2
-        left = CustomAlgorithms.merge_sort(data[:mid], key, reverse)
-        right = CustomAlgorithms.merge_sort(data[mid:], key, reverse)
+        left = CustomAlgorithms.merge_sort(data[:mid], key, reverse, deadline)
+        right = CustomAlgorithms.merge_sort(data[mid:], key, reverse, deadline)
+        if deadline is not None and len(data) >= CustomAlgorithms.DEADLINE_CHECK_SIZE:
+            deadline.check()
 
         result, i, j = [], 0, 0
 
@@ -65,8 +92,8 @@ class CustomAlgorithms(Algorithms):
                     i += 1
                 continue
 
-            # Normal comparison
-            if (a <= b and not reverse) or (a > b and reverse):
+            # Normal comparison, equal keys keep their input order in both directions
+            if (a <= b and not reverse) or (a >= b and reverse):
                 result.append(left[i])
                 i += 1
             else:
@@ -79,7 +106,7 @@ class CustomAlgorithms(Algorithms):
 
 
     @staticmethod
-    def quick_sort(data: list, key: str, reverse: bool = False) -> list:
+    def quick_sort(data: list, key: str, reverse: bool = False, deadline=None) -> list:
         """Perform quicksort on a list of dictionaries.
         
         :param data: The list of dictionaries to sort.
@@ -88,11 +115,15 @@ class CustomAlgorithms(Algorithms):
         :type key: str
         :param reverse: Sort descending if True; ascending otherwise.
         :type reverse: bool
+        :param deadline: The request deadline, checked before every big partition.
+        :type deadline: Deadline | None
         :return: A new list of dictionaries sorted by the given key.
         :rtype: list[dict]
         """
         if len(data) <= 1:
             return data
+        if deadline is not None and len(data) >= CustomAlgorithms.DEADLINE_CHECK_SIZE:
+            deadline.check()
 
         pivot = data[len(data) // 2]
         pivot_value = pivot.get(key)
@@ -114,7 +145,181 @@ class CustomAlgorithms(Algorithms):
         right = [item for item in data if compare(item.get(key), pivot_value) > 0]
 
         return (
-            CustomAlgorithms.quick_sort(left, key, reverse)
+            CustomAlgorithms.quick_sort(left, key, reverse, deadline)
             + middle
-            + CustomAlgorithms.quick_sort(right, key, reverse)
+            + CustomAlgorithms.quick_sort(right, key, reverse, deadline)
         )
+
+
+    @staticmethod
+    def _merge_runs(left: list, right: list, before) -> list:
+        """Merges two ordered runs of (sort key, row) pairs, equal keys keep the left run first.
+
+        :rtype: list[tuple]
+        """
+        # The runs are already in order, the common case for presorted input
+        if not before(right[0][0], left[-1][0]):
+            return left + right
+
+        result, i, j = [], 0, 0
+        while i < len(left) and j < len(right):
+            if before(right[j][0], left[i][0]):
+                result.append(right[j])
+                j += 1
+            else:
+                result.append(left[i])
+                i += 1
+
+        result.extend(left[i:])
+        result.extend(right[j:])
+        return result
+
+    @staticmethod
+    def natural_merge_sort(data: list, key: str, reverse: bool = False, deadline=None) -> list:
+        """Perform a natural mergesort on a list of dictionaries.
+
+        The input is split into the runs that are already in order - strictly reversed runs
+        are flipped, so equal keys keep their input order - short runs are extended to
+        `MIN_RUN` by insertion sort, and neighbouring runs are merged until one is left.
+        Input that is ordered by the sort key, or in the opposite order, is sorted in a
+        single pass. None values go last in ascending and first in descending order, like
+        in the other algorithms.
+
+        :param data: The list of dictionaries to sort.
+        :type data: list[dict]
+        :param key: The dictionary key to sort by.
+        :type key: str
+        :param reverse: Sort descending if True; ascending otherwise.
+        :type reverse: bool
+        :param deadline: The request deadline, checked after every merge pass.
+        :type deadline: Deadline | None
+        :return: A new list of dictionaries sorted by the given key.
+        :rtype: list[dict]
+        """
+        if len(data) <= 1:
+            return list(data)
+
+        # None sorts after every value, (True, None) never compares None with a value
+        keyed = [((value is None, value), row) for row in data for value in (row.get(key),)]
+        before = operator.gt if reverse else operator.lt
+        check = deadline is not None and len(data) >= CustomAlgorithms.DEADLINE_CHECK_SIZE
+
+        runs, start, size = [], 0, len(keyed)
+        while start < size:
+            end = start + 1
+            if end < size and before(keyed[end][0], keyed[start][0]):
+                while end < size and before(keyed[end][0], keyed[end - 1][0]):
+                    end += 1
+                run = keyed[start:end][::-1]
+            else:
+                while end < size and not before(keyed[end][0], keyed[end - 1][0]):
+                    end += 1
+                run = keyed[start:end]
+
+            limit = min(start + CustomAlgorithms.MIN_RUN, size)
+            if end < limit:
+                for item in keyed[end:limit]:
+                    position = len(run)
+                    while position > 0 and before(item[0], run[position - 1][0]):
+                        position -= 1
+                    run.insert(position, item)
+                end = limit
+
+            runs.append(run)
+            start = end
+
+        while len(runs) > 1:
+            if check:
+                deadline.check()
+            merged = [
+                CustomAlgorithms._merge_runs(runs[index], runs[index + 1], before)
+                for index in range(0, len(runs) - 1, 2)
+            ]
+            if len(runs) % 2:
+                merged.append(runs[-1])
+            runs = merged
+
+        return [row for _, row in runs[0]]
+
+    @staticmethod
+    def algorithm_name(requested) -> str:
+        """Normalizes the algorithm requested by the client, anything unknown runs quicksort.
+
+        :param requested: The "algorithm" of the request body.
+        :type requested: str | None
+        :return: "mergesort", "quicksort", "natural_mergesort" or "auto".
+        :rtype: str
+        """
+        if requested is None:
+            return "mergesort"
+        if requested in ("mergesort", "natural_mergesort", "auto"):
+            return requested
+        return "quicksort"
+
+    @staticmethod
+    def choose_algorithm(data: list, key: str, reverse: bool = False) -> str:
+        """Picks the algorithm for the data from a sample of it.
+
+        Input that mostly keeps the sort order (or the opposite one) between neighbours is
+        made of long runs, the natural mergesort merges them in a few passes. Keys with few
+        distinct values - years, industries, countries - suit the three-way partitions of
+        quicksort. Anything else, and lists of mixed key types, go to the plain mergesort.
+
+        :param data: The list of dictionaries to sort.
+        :type data: list[dict]
+        :param key: The dictionary key to sort by.
+        :type key: str
+        :param reverse: Sort descending if True; ascending otherwise.
+        :type reverse: bool
+        :return: "mergesort", "quicksort" or "natural_mergesort".
+        :rtype: str
+        """
+        size = len(data)
+        if size < 2 * CustomAlgorithms.MIN_RUN:
+            return "natural_mergesort"
+
+        # Seeded by the size, the same data always gets the same algorithm
+        sampler = random.Random(size)
+        positions = sampler.sample(range(size - 1), min(CustomAlgorithms.AUTO_SAMPLE_SIZE, size - 1))
+        before = operator.gt if reverse else operator.lt
+        descents, values = 0, set()
+        try:
+            for position in positions:
+                first, second = data[position].get(key), data[position + 1].get(key)
+                if before((second is None, second), (first is None, first)):
+                    descents += 1
+                values.add(first)
+        except TypeError:
+            return "mergesort"
+
+        descent_rate = descents / len(positions)
+        if min(descent_rate, 1 - descent_rate) <= CustomAlgorithms.AUTO_MAX_DESCENT_RATE:
+            return "natural_mergesort"
+        if len(values) <= CustomAlgorithms.AUTO_MAX_DISTINCT_RATE * len(positions):
+            return "quicksort"
+        return "mergesort"
+
+    @classmethod
+    def sort(cls, data: list, key: str, reverse: bool = False, algorithm: str = "mergesort", deadline=None) -> tuple:
+        """Sorts with the requested algorithm and tells which one ran.
+
+        :param data: The list of dictionaries to sort.
+        :type data: list[dict]
+        :param key: The dictionary key to sort by.
+        :type key: str
+        :param reverse: Sort descending if True; ascending otherwise.
+        :type reverse: bool
+        :param algorithm: A name normalized by `algorithm_name`, "auto" samples the data.
+        :type algorithm: str
+        :param deadline: The request deadline.
+        :type deadline: Deadline | None
+        :return: The sorted list and the algorithm that sorted it.
+        :rtype: tuple[list[dict], str]
+        """
+        if algorithm == "auto":
+            algorithm = cls.choose_algorithm(data, key, reverse)
+        if algorithm == "mergesort":
+            return cls.merge_sort(data, key, reverse, deadline), algorithm
+        if algorithm == "natural_mergesort":
+            return cls.natural_merge_sort(data, key, reverse, deadline), algorithm
+        return cls.quick_sort(data, key, reverse, deadline), "quicksort"
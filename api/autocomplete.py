@@ -0,0 +1,283 @@
+from bisect import bisect_left
+from heapq import nlargest
+from django.http import HttpRequest
+from .custom_exceptions import DataNotValid
+from .snapshot import SnapshotStore
+
+FIELDS = ("name", "industry", "country", "ceo_name")
+
+RANKINGS = ("count", "revenue")
+
+
+class AutocompleteIndex:
+    """Sorted array prefix index over the distinct values of one company field.
+
+    The lowercased values are kept sorted, so the completions of a prefix are one slice
+    found by binary search. The best completions of the short prefixes - whose slices cover
+    most of the values - are ranked up front, every other slice is ranked on the lookup.
+
+    An index is never mutated once it is built, the request threads share it without a lock -
+    `patched` copies the arrays and ranks again only the prefixes of the changed values.
+
+    Methods
+    _______
+    build(field: str, rollups: dict) -> AutocompleteIndex
+        Indexes the field of every company.
+    patched(changes: dict) -> AutocompleteIndex
+        Builds the next version with the values of the given companies replaced.
+    complete(prefix: str, limit: int, rank_by: str) -> list[dict]
+        Returns the top distinct completions of a prefix.
+    """
+
+    # Short prefix slices up to this size are ranked on every lookup, like the longer prefixes
+    SCAN_LIMIT = 256
+
+    # Prefixes up to this length (the empty one included) are ranked when the index is built
+    PRECOMPUTED_LENGTH = 2
+
+    MAX_LIMIT = 50
+
+    __slots__ = ('field', 'keys', 'values', 'counts', 'revenues', 'top')
+
+    def __init__(self, field: str, keys: list, values: list, counts: list, revenues: list, top: dict = None):
+        """
+        :param field: The indexed company field.
+        :type field: str.
+        :param keys: The sorted lowercased distinct values.
+        :type keys: list[str].
+        :param values: The value to show for every key.
+        :type values: list[str].
+        :param counts: The number of companies with every key.
+        :type counts: list[int].
+        :param revenues: The summed latest revenue of the companies with every key, in cents.
+        :type revenues: list[int].
+        :param top: (ranking, prefix) -> the best `MAX_LIMIT` keys of a big slice, ranked if not given.
+        :type top: dict[tuple[str, str], list[str]].
+        """
+        self.field = field
+        self.keys = keys
+        self.values = values
+        self.counts = counts
+        self.revenues = revenues
+        if top is None:
+            top = {}
+            for prefix in self._short_prefixes(keys):
+                top.update(self._top_entries(prefix))
+        self.top = top
+
+    @classmethod
+    def _short_prefixes(cls, keys) -> set:
+        """The prefixes up to `PRECOMPUTED_LENGTH` characters of the given keys.
+
+        :rType: set[str].
+        """
+        return {key[:length] for key in keys for length in range(cls.PRECOMPUTED_LENGTH + 1)}
+
+    @staticmethod
+    def _revenue(row: dict) -> int:
+        """The latest revenue of a company rollup in cents, 0 if it has none.
+
+        :rType: int.
+        """
+        return (row.get("revenue") or 0) if row is not None else 0
+
+    @classmethod
+    def build(cls, field: str, rollups: dict):
+        """Indexes the field of every company.
+
+        :param field: The company field to index.
+        :type field: str.
+        :param rollups: Company id -> its rollup row, see `DataSnapshot.rollups`.
+        :type rollups: dict[int, dict].
+        :rType: AutocompleteIndex.
+        """
+        entries = {}
+        for row in rollups.values():
+            value = row.get(field)
+            if value is None:
+                continue
+            entry = entries.get(str(value).lower())
+            if entry is None:
+                entries[str(value).lower()] = [str(value), 1, cls._revenue(row)]
+            else:
+                entry[1] += 1
+                entry[2] += cls._revenue(row)
+
+        keys = sorted(entries)
+        return cls(
+            field,
+            keys,
+            [entries[key][0] for key in keys],
+            [entries[key][1] for key in keys],
+            [entries[key][2] for key in keys],
+        )
+
+    def _range(self, prefix: str) -> tuple:
+        """The slice of the keys that start with the given lowercased prefix.
+
+        :rType: tuple[int, int].
+        """
+        return bisect_left(self.keys, prefix), bisect_left(self.keys, prefix + "\U0010ffff")
+
+    def _scores(self, rank_by: str) -> list:
+        """The score array of a ranking.
+
+        :rType: list[int].
+        """
+        return self.counts if rank_by == "count" else self.revenues
+
+    def _rank(self, start: int, end: int, limit: int, rank_by: str) -> list:
+        """The best keys of a slice, ties in alphabetical order.
+
+        :rType: list[str].
+        """
+        positions = nlargest(limit, range(start, end), key=self._scores(rank_by).__getitem__)
+        return [self.keys[position] for position in positions]
+
+    def _top_entries(self, prefix: str) -> dict:
+        """Ranks the completions of a prefix up front, if its slice is too big to rank on a lookup.
+
+        :rType: dict[tuple[str, str], list[str]].
+        """
+        start, end = self._range(prefix)
+        if end - start <= self.SCAN_LIMIT:
+            return {}
+        return {(rank_by, prefix): self._rank(start, end, self.MAX_LIMIT, rank_by) for rank_by in RANKINGS}
+
+    def patched(self, changes: dict):
+        """Builds the next version with the values of the given companies replaced.
+
+        :param changes: Company id -> (old rollup, new rollup), None for a missing company.
+        :type changes: dict[int, tuple[dict | None, dict | None]].
+        :return: The patched index.
+        :rType: AutocompleteIndex.
+        """
+        deltas = {}
+        for old_row, new_row in changes.values():
+            for row, sign in ((old_row, -1), (new_row, 1)):
+                if row is not None and row.get(self.field) is not None:
+                    value = str(row[self.field])
+                    delta = deltas.setdefault(value.lower(), [value, 0, 0])
+                    delta[1] += sign
+                    delta[2] += sign * self._revenue(row)
+        deltas = {key: delta for key, delta in deltas.items() if delta[1] != 0 or delta[2] != 0}
+
+        keys, values, counts, revenues = list(self.keys), list(self.values), list(self.counts), list(self.revenues)
+        for key, (value, count, revenue) in deltas.items():
+            position = bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                counts[position] += count
+                revenues[position] += revenue
+                if counts[position] <= 0:
+                    for array in (keys, values, counts, revenues):
+                        del array[position]
+            elif count > 0:
+                for array, item in ((keys, key), (values, value), (counts, count), (revenues, revenue)):
+                    array.insert(position, item)
+
+        index = AutocompleteIndex(self.field, keys, values, counts, revenues, top={})
+        for (rank_by, prefix), top_keys in list(self.top.items()):
+            changed = [key for key in deltas if key.startswith(prefix)]
+            if not changed:
+                index.top[(rank_by, prefix)] = top_keys
+                continue
+
+            score = 1 if rank_by == "count" else 2
+            if any(deltas[key][score] < 0 for key in changed if key in top_keys):
+                # A ranked key lost score, a key outside the ranking may overtake it
+                index.top.update(index._top_entries(prefix))
+                continue
+
+            # Only the changed keys can enter the ranking
+            scores = index._scores(rank_by)
+            candidates = []
+            for key in set(top_keys).union(changed):
+                position = bisect_left(keys, key)
+                if position < len(keys) and keys[position] == key:
+                    candidates.append((-scores[position], key))
+            index.top[(rank_by, prefix)] = [key for _, key in sorted(candidates)[:self.MAX_LIMIT]]
+
+        # Short prefixes whose slice just got big
+        for prefix in self._short_prefixes(deltas):
+            if ("count", prefix) not in index.top:
+                index.top.update(index._top_entries(prefix))
+        return index
+
+    def complete(self, prefix: str, limit: int = 10, rank_by: str = "count") -> list:
+        """Returns the top distinct completions of a prefix.
+
+        :param prefix: The typed text, compared case insensitive.
+        :type prefix: str.
+        :param limit: The number of completions, at most `MAX_LIMIT`.
+        :type limit: int.
+        :param rank_by: "count" - the number of companies, or "revenue" - their summed latest revenue.
+        :type rank_by: str.
+        :return: [{"value": ..., "count": ..., "revenue": ...}, ...].
+        :rType: list[dict].
+        """
+        prefix = prefix.lower()
+        top_keys = self.top.get((rank_by, prefix))
+        if top_keys is None:
+            # Not cached on the index, a lookup only reads it
+            start, end = self._range(prefix)
+            top_keys = self._rank(start, end, limit, rank_by)
+
+        completions = []
+        for key in top_keys[:limit]:
+            position = bisect_left(self.keys, key)
+            completions.append({
+                "value": self.values[position],
+                "count": self.counts[position],
+                "revenue": self.revenues[position] / 100,
+            })
+        return completions
+
+
+class Autocomplete:
+    """A service class for the prefix autocomplete of the search box.
+
+    Methods
+    _______
+    suggest(request) -> list[dict]
+        Returns the completions of the typed prefix from the current snapshot.
+    """
+
+    DEFAULT_LIMIT = 10
+
+    @staticmethod
+    def suggest(request: HttpRequest) -> list:
+        """Returns the completions of the typed prefix from the current snapshot.
+
+        Reads "field", "prefix", "limit" and "rank by" from the request body or the query string.
+
+        :param request: The HTTP request data.
+        :type request: HttpRequest.
+        :raises DataNotValid: If a parameter is not valid.
+        :return: The completions, best first.
+        :rType: list[dict].
+
+        Example
+        _______
+        request.data = {
+            "field": "name",
+            "prefix": "tech",
+            "limit": 5,
+            "rank by": "revenue"
+        }
+        """
+        params = request.data or request.query_params
+        field = params.get("field", "name")
+        prefix = str(params.get("prefix", ""))
+        rank_by = str(params.get("rank by", "count")).lower()
+        if field not in FIELDS:
+            raise DataNotValid(f"Autocomplete is not available for {field}, use one of: {', '.join(FIELDS)}")
+        if rank_by not in RANKINGS:
+            raise DataNotValid(f"Unsupported ranking: {rank_by}, use one of: {', '.join(RANKINGS)}")
+        try:
+            limit = int(params.get("limit", Autocomplete.DEFAULT_LIMIT))
+        except (ValueError, TypeError):
+            raise DataNotValid(f"Invalid limit: {params.get('limit')}")
+        if not 1 <= limit <= AutocompleteIndex.MAX_LIMIT:
+            raise DataNotValid(f"The limit must be between 1 and {AutocompleteIndex.MAX_LIMIT}")
+
+        return SnapshotStore.get().index(AutocompleteIndex, field).complete(prefix, limit, rank_by)
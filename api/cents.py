@@ -0,0 +1,135 @@
+import math
+from decimal import Decimal, InvalidOperation
+
+# Snapshot columns stored as integer cents, see `SnapshotStore._fetch_rows`
+MONEY_FIELDS = ("revenue", "net_income")
+
+# Row key of the money values that `from_cents` can't give back exactly, see `money_to_cents`
+RAW_MONEY = "raw_money"
+
+# Operators whose literal is converted to cents once, when the query is parsed
+CENTS_OPERATORS = (":", "=", ">", "<", ">=", "<=")
+
+
+def to_cents(value):
+    """Converts a money column value into integer cents.
+
+    :param value: The value as returned by the database - int or float on SQLite, Decimal elsewhere.
+    :type value: int | float | Decimal | None.
+    :rType: int | None.
+    """
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value * 100
+    if isinstance(value, float):
+        # Exact for every value with two decimal places below 10 ** 13
+        return round(value * 100)
+    return int((Decimal(value) * 100).to_integral_value())
+
+
+def from_cents(cents):
+    """Converts integer cents back into a plain amount.
+
+    NUMERIC affinity stores integral amounts as INTEGER and the others as REAL, so this gives
+    1000 and 1234.56. A REAL that is not the closest float to its two decimal places
+    (51470929.53000001) comes out rounded - `money_to_cents` keeps those values for the output.
+
+    :param cents: The amount in cents.
+    :type cents: int | None.
+    :rType: int | float | None.
+    """
+    if cents is None:
+        return None
+    return cents // 100 if cents % 100 == 0 else cents / 100
+
+
+def money_to_cents(record: dict) -> dict:
+    """Converts the money columns of a loaded row into integer cents, in place.
+
+    Filters and sorts compare the cents. The output has to show the value the database
+    returned, so every value that `from_cents` would not give back with the same type and
+    value is kept under `RAW_MONEY` - only a few rows carry the extra dictionary.
+
+    :param record: The row as read from the database.
+    :type record: dict.
+    :return: The same row, money in cents.
+    :rType: dict.
+    """
+    raw = None
+    for field in MONEY_FIELDS:
+        value = record[field]
+        cents = record[field] = to_cents(value)
+        plain = from_cents(cents)
+        if type(plain) is not type(value) or plain != value:
+            if raw is None:
+                raw = record[RAW_MONEY] = {}
+            raw[field] = value
+    return record
+
+
+def money_value(row: dict, field: str):
+    """The output value of a money column of a snapshot row.
+
+    :param row: The snapshot row, money in cents.
+    :type row: dict.
+    :param field: One of `MONEY_FIELDS`.
+    :type field: str.
+    :return: The value the database returned.
+    :rType: int | float | Decimal | None.
+    """
+    raw = row.get(RAW_MONEY)
+    if raw is not None and field in raw:
+        return raw[field]
+    return from_cents(row[field])
+
+
+def present(row: dict) -> dict:
+    """Copy of a snapshot row with the money columns converted back for output.
+
+    :param row: The snapshot row.
+    :type row: dict.
+    :rType: dict.
+    """
+    row = dict(row)
+    for field in MONEY_FIELDS:
+        if field in row:
+            row[field] = money_value(row, field)
+    row.pop(RAW_MONEY, None)
+    return row
+
+
+def literal_to_cents(op: str, value: str):
+    """Converts the literal of a money filter into a bound on the integer cents.
+
+    The comparison operators round the bound towards the side that keeps the result
+    of comparing against the exact decimal literal. Equality keeps the text semantics
+    of `_match`: "revenue:1000" matches 1000, while "revenue:1000.00" never did.
+
+    :param op: The filter operator, one of `CENTS_OPERATORS`.
+    :type op: str.
+    :param value: The literal of the filter.
+    :type value: str.
+    :return: The bound, None if no value can match the filter.
+    :rType: int | float | None.
+    """
+    try:
+        exact = Decimal(str(value)) * 100
+    except InvalidOperation:
+        return None
+    if exact.is_nan():
+        return None
+    if exact.is_infinite():
+        return float(exact)
+
+    match op:
+        case ":" | "=":
+            if exact != exact.to_integral_value():
+                return None
+            cents = int(exact)
+            return cents if str(from_cents(cents)) == str(value) else None
+        case ">" | "<=":
+            return math.floor(exact)
+        case "<" | ">=":
+            return math.ceil(exact)
+    return None
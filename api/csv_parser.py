@@ -1,22 +1,12 @@
-import pandas
-import os
-import django
-import sys
-
-# Add the project root path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-# Path to djano settings
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'coolboxtest.settings')
-
-# Django initialize
-django.setup()
-
-from coolboxtest.settings import COMPANY_INFORMATION_FILE_PATH
-from api.models import Company, FinancialData, CompanyDetails
-from api.custom_exceptions import ErrorMissingColumns, GenericException
+from coolboxtest.sqlite_profile import import_profile
+from api.models import Company, FinancialData, CompanyDetails, CompanySearchRow
+from api.custom_exceptions import DataNotValid, ErrorMissingColumns, GenericException
+from api.signals import bulk_delete
+from api.snapshot import SnapshotStore
 from django.db import transaction
 
+# pandas is imported by the importer only - the web process imports this module for the mapping
+# and should not pay for pandas at startup.
 
 COMPANY_INFORMATION_DATA_MAPPING = {
     'Name': 'name',
@@ -32,6 +22,12 @@ COMPANY_INFORMATION_DATA_MAPPING = {
     'Headquarters': 'headquarters',
 }
 
+# Columns that have to hold numbers, checked by the dry run
+NUMERIC_FIELDS = ('founded_year', 'year', 'revenue', 'net_income')
+
+# Rows read from the file and written in one transaction
+DEFAULT_CHUNK_SIZE = 1000
+
 
 class ParseFile:
     """Custom class for handling the parsing of the .csv files.
@@ -43,8 +39,14 @@ class ParseFile:
         _check_columns(columns, mapping_to_use: dict) -> tuple[bool, list]
             Method to verify the data integrity of the .csv file
 
-        read_csv_file_and_create_records(cls, file_path: str, mapping_to_use: dict) -> None
-            Method to parse the .csv file into pandas - dataframe, and create records.
+        _check_values(chunk, mapping_to_use: dict) -> list
+            Method to find the rows with values that are not numbers in the numeric columns.
+
+        _create_records(row_data: dict) -> None
+            Method to create the records of one row.
+
+        read_csv_file_and_create_records(cls, file_path: str, mapping_to_use: dict, chunk_size: int, dry_run: bool) -> int
+            Method to parse the .csv file into pandas - dataframe in chunks, and create records.
     """
 
     @staticmethod
@@ -66,69 +68,150 @@ class ParseFile:
         return True, []
     
 
+    @staticmethod
+    def _check_values(chunk, mapping_to_use: dict) -> list:
+        """Method to find the rows with values that are not numbers in the numeric columns.
+        :param chunk: The read rows.
+        :type chunk: pandas.DataFrame.
+        :param mapping_to_use: Tells the function which mapping to use.
+        :type mapping_to_use: dict
+        ...
+        :return: The line numbers in the file of the invalid rows.
+        :rtype: list[int].
+        """
+        import pandas
+
+        invalid = None
+        for column, field in mapping_to_use.items():
+            if field not in NUMERIC_FIELDS:
+                continue
+            not_numbers = pandas.to_numeric(chunk[column], errors='coerce').isna()
+            invalid = not_numbers if invalid is None else invalid | not_numbers
+        if invalid is None:
+            return []
+        # The index counts the data rows from 0, the file has the header in line 1
+        return [int(index) + 2 for index in chunk.index[invalid]]
+
+    @staticmethod
+    def _create_records(row_data: dict) -> None:
+        """Method to create the records of one row.
+        :param row_data: The row, keyed by the model fields.
+        :type row_data: dict
+        ...
+        :return: None.
+        :rtype: NoneType.
+        """
+        # Create company
+        company = Company.objects.create(
+            name=row_data['name'],
+            country=row_data['country'],
+            industry=row_data['industry'],
+            founded_year=row_data['founded_year'],
+        )
+
+        # Create related FinancialData
+        FinancialData.objects.create(
+            company=company,
+            year=row_data['year'],
+            revenue=row_data['revenue'],
+            net_income=row_data['net_income'],
+        )
+
+        # Create related CompanyDetails
+        CompanyDetails.objects.create(
+            company=company,
+            company_type=row_data['company_type'],
+            size=row_data['size'],
+            ceo_name=row_data['ceo_name'],
+            headquarters=row_data['headquarters'],
+        )
+
+        # Create the denormalized search row
+        CompanySearchRow.objects.create(
+            company_id=company.id,
+            name=row_data['name'],
+            country=row_data['country'],
+            industry=row_data['industry'],
+            founded_year=row_data['founded_year'],
+            company_type=row_data['company_type'],
+            size=row_data['size'],
+            ceo_name=row_data['ceo_name'],
+            headquarters=row_data['headquarters'],
+            financial_year=row_data['year'],
+            revenue=row_data['revenue'],
+            net_income=row_data['net_income'],
+        )
+
     @classmethod
-    def read_csv_file_and_create_records(cls, file_path: str, mapping_to_use: dict) -> None:
-        """Method to parse the .csv file into pandas - dataframe, and create records.
+    def read_csv_file_and_create_records(
+        cls,
+        file_path: str,
+        mapping_to_use: dict,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        dry_run: bool = False,
+    ) -> int:
+        """Method to parse the .csv file into pandas - dataframe in chunks, and create records.
         :param file_path: The path of the file that is going to be read.
         :type file_path: str.
         :param mapping_to_use: Tells the function which mapping to use.
         :type mapping_to_use: dict
+        :param chunk_size: How many rows are read and written in one transaction.
+        :type chunk_size: int.
+        :param dry_run: Only read and validate the file, the db is not touched.
+        :type dry_run: bool.
         ...
         :raises ErrorMissingColumns: If there are missing columns - eg the data integrity of the file is breached.
+        :raises DataNotValid: If a dry run finds values that are not numbers in the numeric columns.
         :raises GenericExceptionError: If unexpected error occurs.
         ...
-        :return: None.
-        :rtype: NoneType.
+        :return: The number of rows that were (or with a dry run would be) imported.
+        :rtype: int.
         """
         try:
-            # Parse the file
-            raw_data = pandas.read_csv(file_path, keep_default_na=False, sep=';')
-            check_columns, missing_columns = cls._check_columns(raw_data.columns, mapping_to_use)
+            # Deferred, see the note at the top - a missing pandas fails like any other import error
+            import pandas
+
+            # Only the header first, the db is reset after the columns are verified
+            columns = pandas.read_csv(file_path, keep_default_na=False, sep=';', nrows=0).columns
+            check_columns, missing_columns = cls._check_columns(columns, mapping_to_use)
 
             if not check_columns:
                 raise ErrorMissingColumns(f'Missing columns: {missing_columns}')
 
-            # Reset the db
-            Company.objects.all().delete()
-
-            # Data unziping
-            # Author note - this could be separated into different function, but because of the struct
-            #   of the db, and using atomic function i decided to not separate it!
-            for _, row in raw_data.iterrows():
-                row_data = {v: row[k] for k, v in mapping_to_use.items()}
-
-                # Verifying that all records will be created.
-                with transaction.atomic():
-                    # Create company
-                    company = Company.objects.create(
-                        name=row_data['name'],
-                        country=row_data['country'],
-                        industry=row_data['industry'],
-                        founded_year=row_data['founded_year'],
-                    )
-
-                    # Create related FinancialData
-                    FinancialData.objects.create(
-                        company=company,
-                        year=row_data['year'],
-                        revenue=row_data['revenue'],
-                        net_income=row_data['net_income'],
-                    )
-
-                    # Create related CompanyDetails
-                    CompanyDetails.objects.create(
-                        company=company,
-                        company_type=row_data['company_type'],
-                        size=row_data['size'],
-                        ceo_name=row_data['ceo_name'],
-                        headquarters=row_data['headquarters'],
-                    )
-
-            print("The records were created successfully!")
+            chunks = pandas.read_csv(
+                file_path,
+                keep_default_na=False,
+                sep=';',
+                usecols=list(mapping_to_use),
+                chunksize=chunk_size,
+            )
+
+            if dry_run:
+                rows, invalid_rows = 0, []
+                for chunk in chunks:
+                    rows += len(chunk)
+                    invalid_rows += cls._check_values(chunk, mapping_to_use)
+                if invalid_rows:
+                    shown = ', '.join(map(str, invalid_rows[:10]))
+                    raise DataNotValid(f'{len(invalid_rows)} rows with invalid numbers, lines: {shown}')
+                return rows
+
+            rows = 0
+            # The snapshot ignores the row by row change signals and is rebuilt after the import
+            with SnapshotStore.paused(), import_profile():
+                # Reset the db, without the sync receivers the delete is a few DELETE statements
+                bulk_delete(Company.objects.all())
+                CompanySearchRow.objects.all().delete()
+
+                for chunk in chunks:
+                    records = chunk.rename(columns=mapping_to_use).to_dict('records')
+                    # All records of a chunk are created in one transaction
+                    with transaction.atomic():
+                        for row_data in records:
+                            cls._create_records(row_data)
+                    rows += len(records)
+
+            return rows
 
         except Exception as error:
             raise GenericException(error)
-
-
-if __name__ == "__main__":
-    ParseFile.read_csv_file_and_create_records(COMPANY_INFORMATION_FILE_PATH, COMPANY_INFORMATION_DATA_MAPPING)
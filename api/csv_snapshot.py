@@ -0,0 +1,172 @@
+import hashlib
+import os
+import time
+from django.conf import settings
+from .cents import MONEY_FIELDS
+
+# Snapshot row keys in the column order of `SnapshotStore.SQL`, the encoded rows come out the same
+SNAPSHOT_COLUMNS = (
+    'id', 'name', 'industry', 'country', 'founded_year',
+    'company_type', 'size', 'ceo_name', 'headquarters',
+    'financial_year', 'revenue', 'net_income',
+)
+
+
+class CsvSnapshotSource:
+    """Builds the snapshot rows straight from the import .csv file - the read-only mode.
+
+    Switched on by `SEARCH_SNAPSHOT_CSV`. The file is parsed with pandas in one go, checked
+    like `ParseFile` checks it, and turned into rows of the shape `SnapshotStore._fetch_rows`
+    reads from the db - one company per line, money in integer cents. The db is never touched.
+
+    The ids are synthetic - the line number, counted from 1 - and only valid in this mode. They
+    match the db ids only after a fresh import of the same file into an empty db, so they
+    must not be used to look a company up in the db or on a db backed node.
+
+    The file is checked for changes at most every `SEARCH_SNAPSHOT_CSV_CHECK_SECONDS`. A new
+    mtime or size only costs a hash of the file, the snapshot is rebuilt when the content
+    changed, and the current snapshot is served until the new one is complete. Replace the
+    file with a rename, a file that is being written can be read half done.
+
+    Methods
+    _______
+    enabled() -> bool
+        Tells whether the snapshot is built from the .csv file.
+    path() -> str
+        Returns the path of the .csv file.
+    is_current() -> bool
+        Tells whether the file still holds the content the snapshot was built from.
+    read_rows() -> list
+        Parses the file into snapshot rows.
+    reset() -> None
+        Forgets the loaded file, the next check reports it as changed.
+    """
+
+    # (path, mtime_ns, size, sha256) of the file the last build read, None before the first build
+    _seen = None
+    _checked_at = 0.0
+    _changed = False
+
+    @staticmethod
+    def enabled() -> bool:
+        """Tells whether the snapshot is built from the .csv file (`SEARCH_SNAPSHOT_CSV` setting).
+
+        :rType: bool.
+        """
+        return bool(getattr(settings, 'SEARCH_SNAPSHOT_CSV', ''))
+
+    @staticmethod
+    def path() -> str:
+        """Returns the path of the .csv file (`SEARCH_SNAPSHOT_CSV` setting).
+
+        :rType: str.
+        """
+        return settings.SEARCH_SNAPSHOT_CSV
+
+    @staticmethod
+    def _digest(path: str) -> str:
+        """Hashes the content of the file.
+
+        :rType: str.
+        """
+        with open(path, 'rb') as csv_file:
+            return hashlib.file_digest(csv_file, 'sha256').hexdigest()
+
+    @classmethod
+    def is_current(cls) -> bool:
+        """Tells whether the file still holds the content the snapshot was built from.
+
+        :return: False once the file changed, until `read_rows` reads it again.
+        :rType: bool.
+        """
+        path = cls.path()
+        seen = cls._seen
+        if seen is None or seen[0] != path or cls._changed:
+            return False
+
+        now = time.monotonic()
+        if now - cls._checked_at < settings.SEARCH_SNAPSHOT_CSV_CHECK_SECONDS:
+            return True
+        cls._checked_at = now
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # Keep serving the last content while the file is missing
+            return True
+        if (stat.st_mtime_ns, stat.st_size) == seen[1:3]:
+            return True
+
+        # Touched or copied over with the same content is not a new version
+        if cls._digest(path) == seen[3]:
+            cls._seen = (path, stat.st_mtime_ns, stat.st_size, seen[3])
+            return True
+        cls._changed = True
+        return False
+
+    @classmethod
+    def read_rows(cls) -> list:
+        """Parses the file into snapshot rows.
+
+        The file version is remembered before it is parsed, so a broken file is not parsed
+        again on every check - only once it changes again.
+
+        :raises ErrorMissingColumns: If the file misses a column of `COMPANY_INFORMATION_DATA_MAPPING`.
+        :raises DataNotValid: If a numeric column holds something that is not a number.
+        :return: The joined company records, revenue and net income in integer cents.
+        :rType: list[dict].
+        """
+        # Deferred like in `ParseFile`, the web process only pays for pandas in this mode
+        import pandas
+        from .csv_parser import COMPANY_INFORMATION_DATA_MAPPING, NUMERIC_FIELDS, ParseFile
+        from .custom_exceptions import DataNotValid, ErrorMissingColumns
+
+        path = cls.path()
+        stat = os.stat(path)
+        cls._seen = (path, stat.st_mtime_ns, stat.st_size, cls._digest(path))
+        cls._checked_at = time.monotonic()
+        cls._changed = False
+
+        columns = pandas.read_csv(path, sep=';', keep_default_na=False, nrows=0).columns
+        check_columns, missing_columns = ParseFile._check_columns(columns, COMPANY_INFORMATION_DATA_MAPPING)
+        if not check_columns:
+            raise ErrorMissingColumns(f'Missing columns: {missing_columns}')
+
+        # The numbers are parsed by the csv reader, the text columns stay text even if they look like numbers
+        text_columns = {
+            column: str for column, field in COMPANY_INFORMATION_DATA_MAPPING.items() if field not in NUMERIC_FIELDS
+        }
+        frame = pandas.read_csv(
+            path, sep=';', keep_default_na=False, usecols=list(COMPANY_INFORMATION_DATA_MAPPING), dtype=text_columns,
+        )
+        # Only a numeric column the reader could not parse holds text
+        if any(frame[column].dtype == object for column, field in COMPANY_INFORMATION_DATA_MAPPING.items()
+               if field in NUMERIC_FIELDS):
+            invalid_rows = ParseFile._check_values(frame, COMPANY_INFORMATION_DATA_MAPPING)
+            if invalid_rows:
+                shown = ', '.join(map(str, invalid_rows[:10]))
+                raise DataNotValid(f'{len(invalid_rows)} rows with invalid numbers, lines: {shown}')
+
+        fields = frame.rename(columns=COMPANY_INFORMATION_DATA_MAPPING)
+        values = {
+            # Synthetic ids, one company per line in file order - only valid within the csv mode
+            'id': range(1, len(fields) + 1),
+            'founded_year': pandas.to_numeric(fields['founded_year']).astype('int64').tolist(),
+            'financial_year': pandas.to_numeric(fields['year']).astype('int64').tolist(),
+        }
+        for field in MONEY_FIELDS:
+            # Rounded half to even like `to_cents` rounds floats
+            values[field] = (pandas.to_numeric(fields[field]) * 100).round().astype('int64').tolist()
+        for field in SNAPSHOT_COLUMNS:
+            if field not in values:
+                values[field] = fields[field].tolist()
+
+        # Plain lists zipped into dicts, several times faster than `DataFrame.to_dict`
+        return [dict(zip(SNAPSHOT_COLUMNS, row)) for row in zip(*(values[field] for field in SNAPSHOT_COLUMNS))]
+
+    @classmethod
+    def reset(cls) -> None:
+        """Forgets the loaded file, the next check reports it as changed."""
+        cls._seen = None
+        cls._checked_at = 0.0
+        cls._changed = False
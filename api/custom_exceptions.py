@@ -5,3 +5,9 @@ class GenericException(Exception): ...
 
 
 class ErrorMissingColumns(Exception): ...
+
+
+class SearchOverloaded(Exception): ...
+
+
+class SearchDeadlineExceeded(Exception): ...
@@ -0,0 +1,187 @@
+import csv
+import io
+import zlib
+from typing import Iterable, Iterator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpRequest, StreamingHttpResponse
+from .csv_parser import COMPANY_INFORMATION_DATA_MAPPING
+from .custom_exceptions import DataNotValid
+from .metrics import NULL_TIMER, SearchMetrics
+from .search_sort_filter_v3 import ManualSQLQueryEngine
+
+
+class SearchExport:
+    """A service class that streams whole search results as NDJSON or CSV.
+
+    The rows come straight from the filter / sort pipeline and are encoded in chunks of
+    `CHUNK_SIZE`, so the memory used by one export does not depend on the result size.
+    The stream keeps iterating the snapshot version it started with, while later
+    versions are published by the change signals. An unsorted export holds its admission
+    slot and checks its deadline until the stream ends, and is timed when the stream ends.
+
+    Methods
+    _______
+    iter_ndjson(rows: Iterable) -> Iterator[str]
+        Encodes the records as newline delimited JSON, one chunk at a time.
+    iter_csv(rows: Iterable) -> Iterator[str]
+        Encodes the records as semicolon separated CSV in the `ParseFile` input format.
+    iter_gzip(chunks: Iterable) -> Iterator[bytes]
+        Compresses the encoded chunks into a single gzip stream.
+    export(request, timer) -> StreamingHttpResponse
+        Runs the search of the request and streams its result.
+    """
+
+    CHUNK_SIZE = 1000
+
+    FORMATS = {
+        "ndjson": "application/x-ndjson",
+        "csv": "text/csv; charset=utf-8",
+    }
+
+    # CSV header -> search row field, the financial year is called "year" in the import mapping
+    CSV_COLUMNS = {
+        header: "financial_year" if field == "year" else field
+        for header, field in COMPANY_INFORMATION_DATA_MAPPING.items()
+    }
+
+    @staticmethod
+    def _chunks(rows: Iterable, size: int) -> Iterator[list]:
+        """Splits the records into lists of at most `size` records.
+
+        :param rows: The records to split.
+        :type rows: Iterable[dict].
+        :param size: The chunk size.
+        :type size: int.
+        :rType: Iterator[list[dict]].
+        """
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @classmethod
+    def iter_ndjson(cls, rows: Iterable) -> Iterator[str]:
+        """Encodes the records as newline delimited JSON, one chunk at a time.
+
+        :param rows: The records to encode.
+        :type rows: Iterable[dict].
+        :return: The encoded chunks.
+        :rType: Iterator[str].
+        """
+        encoder = DjangoJSONEncoder(separators=(",", ":"))
+        for chunk in cls._chunks(rows, cls.CHUNK_SIZE):
+            yield "".join(encoder.encode(row) + "\n" for row in chunk)
+
+    @classmethod
+    def iter_csv(cls, rows: Iterable) -> Iterator[str]:
+        """Encodes the records as semicolon separated CSV in the `ParseFile` input format.
+
+        :param rows: The records to encode.
+        :type rows: Iterable[dict].
+        :return: The encoded chunks, the first one starts with the header line.
+        :rType: Iterator[str].
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=";", lineterminator="\n")
+        writer.writerow(cls.CSV_COLUMNS)
+        fields = list(cls.CSV_COLUMNS.values())
+
+        for chunk in cls._chunks(rows, cls.CHUNK_SIZE):
+            writer.writerows([row.get(field) for field in fields] for row in chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        # Header only export
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    @staticmethod
+    def iter_gzip(chunks: Iterable) -> Iterator[bytes]:
+        """Compresses the encoded chunks into a single gzip stream.
+
+        :param chunks: The encoded chunks.
+        :type chunks: Iterable[str].
+        :return: The compressed chunks.
+        :rType: Iterator[bytes].
+        """
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 - gzip header and trailer
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode("utf-8"))
+            if data:
+                yield data
+        yield compressor.flush()
+
+    @staticmethod
+    def _timed(chunks: Iterable, rows: Iterable, timer, response: StreamingHttpResponse) -> Iterator:
+        """Passes the chunks through and finishes the request timer when the stream ends.
+
+        :param chunks: The encoded chunks.
+        :type chunks: Iterable[str | bytes].
+        :param rows: The records the chunks are encoded from.
+        :type rows: Iterable[dict].
+        :param timer: The request timer.
+        :type timer: StageTimer.
+        :param response: The response that streams the chunks, its status is logged.
+        :type response: StreamingHttpResponse.
+        :rType: Iterator[str | bytes].
+        """
+        try:
+            yield from chunks
+            timer.mark("stream")
+        except Exception as error:
+            timer.mark("error")
+            timer.error = str(error)
+            raise
+        finally:
+            # A lazy search releases its admission slot when its generator is closed
+            close = getattr(rows, "close", None)
+            if close is not None:
+                close()
+            SearchMetrics.finish(timer, response)
+
+    @classmethod
+    def export(cls, request: HttpRequest, timer=NULL_TIMER) -> StreamingHttpResponse:
+        """Runs the search of the request and streams its result.
+
+        Takes the same parameters as the search, plus "format" (ndjson or csv) and "gzip".
+
+        :param request: The HTTP request data.
+        :type request: HttpRequest.
+        :param timer: The request timer, finished when the stream ends.
+        :type timer: StageTimer.
+        :raises DataNotValid: If the requested format is not supported.
+        :raises SearchOverloaded: If the export is heavy and no heavy query slot frees up.
+        :return: The streaming response.
+        :rType: StreamingHttpResponse.
+
+        Example
+        _______
+        request.data = {
+            "search input": "industry:Tech",
+            "sort_by": "revenue",
+            "format": "csv",
+            "gzip": true
+        }
+        """
+        export_format = str(request.data.get("format", "ndjson")).lower()
+        if export_format not in cls.FORMATS:
+            raise DataNotValid(f"Unsupported export format: {export_format}, use one of: {', '.join(cls.FORMATS)}")
+        compress = str(request.data.get("gzip", False)).lower() == "true"
+
+        # The snapshot is loaded here, the stream itself never touches the database
+        rows = ManualSQLQueryEngine.search_data(request, timer, lazy=True)
+        content = cls.iter_csv(rows) if export_format == "csv" else cls.iter_ndjson(rows)
+        if compress:
+            content = cls.iter_gzip(content)
+
+        response = StreamingHttpResponse(content_type=cls.FORMATS[export_format])
+        response.streaming_content = cls._timed(content, rows, timer, response)
+        response["Content-Disposition"] = f'attachment; filename="companies.{export_format}"'
+        if compress:
+            response["Content-Encoding"] = "gzip"
+        return response
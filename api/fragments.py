@@ -0,0 +1,153 @@
+import json
+from collections.abc import Sequence
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from .cents import present
+
+# The encoder and the settings `JsonResponse` uses, one instance for all the rows
+_ENCODER = DjangoJSONEncoder()
+
+
+class RowFragments:
+    """Pre-encoded JSON of every row of a snapshot, both of `rows` and of `latest_rows`.
+
+    A fragment is exactly what `JsonResponse` writes for the row, so a response is put
+    together by joining the fragments of the result rows. Fragments are keyed by the
+    identity of the row dictionary - the snapshot rows are never mutated, and every key
+    belongs to a row the snapshot still holds.
+
+    Like the snapshot, fragments are never mutated once they are built - `patched`
+    copies the mapping and replaces the fragments of the changed rows.
+
+    Methods
+    _______
+    enabled() -> bool
+        Tells whether the snapshots keep the fragments (`SEARCH_PREENCODED_ROWS` setting).
+    encode_row(row: dict) -> bytes
+        Encodes one snapshot row the way `JsonResponse` does.
+    build(rows: list) -> RowFragments
+        Encodes the given rows.
+    patched(removed: list, added: list) -> RowFragments
+        Builds the fragments of the next snapshot version.
+    """
+
+    __slots__ = ('encoded',)
+
+    def __init__(self, encoded: dict):
+        """
+        :param encoded: id() of a row -> its JSON fragment.
+        :type encoded: dict[int, bytes].
+        """
+        self.encoded = encoded
+
+    @staticmethod
+    def enabled() -> bool:
+        """Tells whether the snapshots keep the fragments (`SEARCH_PREENCODED_ROWS` setting).
+
+        :rType: bool.
+        """
+        return getattr(settings, 'SEARCH_PREENCODED_ROWS', False)
+
+    @staticmethod
+    def encode_row(row: dict) -> bytes:
+        """Encodes one snapshot row the way `JsonResponse` does, money converted back from cents.
+
+        :rType: bytes.
+        """
+        return _ENCODER.encode(present(row)).encode("utf-8")
+
+    @classmethod
+    def build(cls, rows: list):
+        """Encodes the given rows.
+
+        :param rows: The snapshot rows and rollup rows.
+        :type rows: list[dict].
+        :rType: RowFragments.
+        """
+        return cls({id(row): cls.encode_row(row) for row in rows})
+
+    def patched(self, removed: list, added: list):
+        """Builds the fragments of the next snapshot version.
+
+        The removed rows are dropped before the new ones are added, so a new row that
+        reuses the id of a freed row still gets its own fragment.
+
+        :param removed: The rows that are not in the next version.
+        :type removed: list[dict].
+        :param added: The rows that are new in the next version.
+        :type added: list[dict].
+        :rType: RowFragments.
+        """
+        encoded = dict(self.encoded)
+        for row in removed:
+            encoded.pop(id(row), None)
+        for row in added:
+            encoded[id(row)] = self.encode_row(row)
+        return RowFragments(encoded)
+
+
+class EncodedRows(Sequence):
+    """Search result rows that are rendered from the pre-encoded fragments.
+
+    Reads like a list of output rows - money converted back from cents - for the code that
+    needs the values, while `encode` joins the fragments without encoding anything. The
+    algorithm that sorted the rows travels with them to the `X-Sort-Algorithm` header.
+
+    Methods
+    _______
+    encode() -> bytes
+        Renders the rows as the JSON array `JsonResponse` would write.
+    """
+
+    __slots__ = ('rows', 'fragments', 'algorithm')
+
+    def __init__(self, rows: list, fragments: RowFragments = None, algorithm: str = None):
+        """
+        :param rows: The snapshot rows of the result.
+        :type rows: list[dict].
+        :param fragments: The fragments of their snapshot, None to encode every row.
+        :type fragments: RowFragments | None.
+        :param algorithm: The algorithm that sorted the rows, None if they are not sorted.
+        :type algorithm: str | None.
+        """
+        self.rows = rows
+        self.fragments = fragments
+        self.algorithm = algorithm
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return EncodedRows(self.rows[index], self.fragments, self.algorithm)
+        return present(self.rows[index])
+
+    def __iter__(self):
+        return map(present, self.rows)
+
+    def encode(self) -> bytes:
+        """Renders the rows as the JSON array `JsonResponse` would write.
+
+        :rType: bytes.
+        """
+        if self.fragments is None:
+            return b"[" + b", ".join(map(RowFragments.encode_row, self.rows)) + b"]"
+        encoded, encode_row = self.fragments.encoded, RowFragments.encode_row
+        # Rows of an older version that are gone from this one have no fragment
+        parts = [encoded.get(id(row)) or encode_row(row) for row in self.rows]
+        return b"[" + b", ".join(parts) + b"]"
+
+
+def render(message) -> bytes:
+    """Renders a response message holding `EncodedRows`, byte for byte like `JsonResponse`.
+
+    :param message: The rows, or a dict with the rows as one of its values.
+    :type message: EncodedRows | dict.
+    :rType: bytes.
+    """
+    if isinstance(message, EncodedRows):
+        return message.encode()
+    if isinstance(message, dict):
+        items = (json.dumps(key).encode("utf-8") + b": " + render(value) for key, value in message.items())
+        return b"{" + b", ".join(items) + b"}"
+    return json.dumps(message, cls=DjangoJSONEncoder).encode("utf-8")
@@ -0,0 +1,239 @@
+from itertools import combinations
+
+# Fields served by the deletion index, the other fields are compared row by row
+INDEXED_FIELDS = ("name", "ceo_name", "headquarters")
+
+MAX_DISTANCE = 2
+
+# Only the first and the last characters of a term produce deletions, the full term is verified afterwards
+PREFIX_LENGTH = 7
+SUFFIX_LENGTH = 4
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Levenshtein distance of two strings, giving up as soon as it exceeds `max_distance`.
+
+    :param a: The first string.
+    :type a: str.
+    :param b: The second string.
+    :type b: str.
+    :param max_distance: The largest distance of interest.
+    :type max_distance: int.
+    :return: The distance, or `max_distance + 1` if it is larger than `max_distance`.
+    :rType: int.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if a == b:
+        return 0
+
+    # The common prefix and suffix never cost anything, and terms of one index bucket share a lot
+    start, end_a, end_b = 0, len(a), len(b)
+    while start < end_a and start < end_b and a[start] == b[start]:
+        start += 1
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if not a or not b:
+        return min(len(a) + len(b), max_distance + 1)
+
+    # Only the cells within `max_distance` of the diagonal can stay below the limit
+    limit = max_distance + 1
+    previous = [j if j <= max_distance else limit for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        char_a = a[i - 1]
+        low, high = max(1, i - max_distance), min(len(b), i + max_distance)
+        current = [limit] * (len(b) + 1)
+        current[0] = i if i <= max_distance else limit
+        for j in range(low, high + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != b[j - 1]),
+                limit,
+            )
+        if min(current[low - 1:high + 1]) >= limit:
+            return limit
+        previous = current
+    return previous[-1]
+
+
+class FuzzyIndex:
+    """SymSpell style deletion index over the lowercased values of one company field.
+
+    Every distinct term prefix and suffix is stored with all its variants of up to
+    `MAX_DISTANCE` deleted characters. Two strings within an edit distance `d` always share
+    such a variant of their prefixes and of their suffixes, so a lookup only verifies the
+    terms whose prefix and suffix both share a variant with the searched value.
+
+    An index is never mutated once it is built - `patched` copies the dictionaries and
+    replaces the touched entries, the same way `DataSnapshot.patched` treats the rows.
+
+    Methods
+    _______
+    build(field: str, rollups: dict) -> FuzzyIndex
+        Indexes the field of every company.
+    patched(changes: dict) -> FuzzyIndex
+        Builds the next version with the terms of the given companies replaced.
+    lookup(value: str, distance: int) -> set[str]
+        Returns the indexed terms within the edit distance of the value.
+    companies(terms: set) -> set[int]
+        Returns the ids of the companies that have one of the terms.
+    """
+
+    __slots__ = ('field', 'postings', 'buckets', 'prefix_deletes', 'suffix_deletes')
+
+    def __init__(self, field: str, postings: dict, buckets: dict, prefix_deletes: dict, suffix_deletes: dict):
+        """
+        :param field: The indexed company field.
+        :type field: str.
+        :param postings: Term -> ids of the companies that have it.
+        :type postings: dict[str, tuple[int]].
+        :param buckets: Term prefix -> term suffix -> the terms with that prefix and suffix.
+        :type buckets: dict[str, dict[str, tuple[str]]].
+        :param prefix_deletes: Deletion variant -> the prefixes that produce it.
+        :type prefix_deletes: dict[str, set[str]].
+        :param suffix_deletes: Deletion variant -> the suffixes that produce it.
+        :type suffix_deletes: dict[str, set[str]].
+        """
+        self.field = field
+        self.postings = postings
+        self.buckets = buckets
+        self.prefix_deletes = prefix_deletes
+        self.suffix_deletes = suffix_deletes
+
+    @staticmethod
+    def _variants(part: str, distance: int) -> set:
+        """All strings made by deleting up to `distance` characters of a term prefix or suffix.
+
+        :rType: set[str].
+        """
+        variants = {part}
+        for deleted in range(1, min(distance, len(part)) + 1):
+            for positions in combinations(range(len(part)), len(part) - deleted):
+                variants.add("".join(part[position] for position in positions))
+        return variants
+
+    @staticmethod
+    def _term(row: dict, field: str):
+        """The indexed term of a company row, None if the field is empty.
+
+        :rType: str | None.
+        """
+        value = row.get(field) if row is not None else None
+        return str(value).lower() if value is not None else None
+
+    @classmethod
+    def build(cls, field: str, rollups: dict):
+        """Indexes the field of every company.
+
+        :param field: The company field to index.
+        :type field: str.
+        :param rollups: Company id -> its rollup row, see `DataSnapshot.rollups`.
+        :type rollups: dict[int, dict].
+        :rType: FuzzyIndex.
+        """
+        postings, buckets, prefix_deletes, suffix_deletes = {}, {}, {}, {}
+        for company_id, row in rollups.items():
+            term = cls._term(row, field)
+            if term is not None:
+                postings.setdefault(term, set()).add(company_id)
+
+        for term in postings:
+            prefix, suffix = term[:PREFIX_LENGTH], term[-SUFFIX_LENGTH:]
+            if prefix not in buckets:
+                buckets[prefix] = {}
+                for variant in cls._variants(prefix, MAX_DISTANCE):
+                    prefix_deletes.setdefault(variant, set()).add(prefix)
+            # A known suffix is its own variant
+            if suffix not in suffix_deletes.get(suffix, ()):
+                for variant in cls._variants(suffix, MAX_DISTANCE):
+                    suffix_deletes.setdefault(variant, set()).add(suffix)
+            buckets[prefix].setdefault(suffix, []).append(term)
+
+        # Tuples take a fraction of the memory of the many one element sets
+        postings = {term: tuple(company_ids) for term, company_ids in postings.items()}
+        for bucket in buckets.values():
+            for suffix, terms in bucket.items():
+                bucket[suffix] = tuple(terms)
+        return cls(field, postings, buckets, prefix_deletes, suffix_deletes)
+
+    def patched(self, changes: dict):
+        """Builds the next version with the terms of the given companies replaced.
+
+        :param changes: Company id -> (old row, new row), None for a missing row.
+        :type changes: dict[int, tuple[dict | None, dict | None]].
+        :return: The patched index.
+        :rType: FuzzyIndex.
+        """
+        postings, buckets = dict(self.postings), dict(self.buckets)
+        prefix_deletes, suffix_deletes = dict(self.prefix_deletes), dict(self.suffix_deletes)
+
+        for company_id, (old_row, new_row) in changes.items():
+            old_term, new_term = self._term(old_row, self.field), self._term(new_row, self.field)
+            if old_term == new_term:
+                continue
+
+            if old_term in postings:
+                # Terms without companies are left in the buckets and skipped by `lookup`
+                postings[old_term] = tuple(other for other in postings[old_term] if other != company_id)
+                if not postings[old_term]:
+                    del postings[old_term]
+
+            if new_term is not None:
+                postings[new_term] = postings.get(new_term, ()) + (company_id,)
+                prefix, suffix = new_term[:PREFIX_LENGTH], new_term[-SUFFIX_LENGTH:]
+                if prefix not in buckets:
+                    for variant in self._variants(prefix, MAX_DISTANCE):
+                        prefix_deletes[variant] = prefix_deletes.get(variant, set()) | {prefix}
+                if suffix not in suffix_deletes.get(suffix, ()):
+                    for variant in self._variants(suffix, MAX_DISTANCE):
+                        suffix_deletes[variant] = suffix_deletes.get(variant, set()) | {suffix}
+                bucket = buckets[prefix] = dict(buckets.get(prefix, {}))
+                if new_term not in bucket.get(suffix, ()):
+                    bucket[suffix] = bucket.get(suffix, ()) + (new_term,)
+
+        return FuzzyIndex(self.field, postings, buckets, prefix_deletes, suffix_deletes)
+
+    def lookup(self, value: str, distance: int) -> set:
+        """Returns the indexed terms within the edit distance of the value.
+
+        :param value: The searched value, compared case insensitive.
+        :type value: str.
+        :param distance: The largest edit distance, at most `MAX_DISTANCE`.
+        :type distance: int.
+        :rType: set[str].
+        """
+        term = str(value).lower()
+        if distance == 0:
+            return {term} if term in self.postings else set()
+
+        prefixes, suffixes = set(), set()
+        for variant in self._variants(term[:PREFIX_LENGTH], distance):
+            prefixes.update(self.prefix_deletes.get(variant, ()))
+        for variant in self._variants(term[-SUFFIX_LENGTH:], distance):
+            suffixes.update(self.suffix_deletes.get(variant, ()))
+
+        matches = set()
+        for prefix in prefixes:
+            bucket = self.buckets[prefix]
+            for suffix in (suffixes if len(suffixes) < len(bucket) else bucket):
+                if suffix not in suffixes or suffix not in bucket:
+                    continue
+                for candidate in bucket[suffix]:
+                    if candidate in self.postings and edit_distance(term, candidate, distance) <= distance:
+                        matches.add(candidate)
+        return matches
+
+    def companies(self, terms: set) -> set:
+        """Returns the ids of the companies that have one of the terms.
+
+        :param terms: Terms returned by `lookup`.
+        :type terms: set[str].
+        :rType: set[int].
+        """
+        company_ids = set()
+        for term in terms:
+            company_ids.update(self.postings.get(term, ()))
+        return company_ids
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.http import JsonResponse
 from api.custom_exceptions import *
@@ -20,9 +21,15 @@ class CustomExceptionHandler(object):
         :param exception_message: The custom exception that is passed.
         :type exception_message: Exception.
         :return: The status code and exception as error message.
+            Searches rejected by the admission control (429) or out of time (503) carry a `Retry-After` header.
         :rType: JsonResponse.
         """
         match exception_message:
+            case SearchOverloaded() | SearchDeadlineExceeded():
+                status = 429 if isinstance(exception_message, SearchOverloaded) else 503
+                retry_after = getattr(settings, 'SEARCH_RETRY_AFTER_SECONDS', 1)
+                response = JsonResponse({'Error': str(exception_message), 'Retry after': retry_after}, status=status)
+                response['Retry-After'] = str(retry_after)
             case Exception():
                 response = JsonResponse({'Error': str(exception_message)}, status=400)
             case _:
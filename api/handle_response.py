@@ -1,5 +1,6 @@
 from typing import Any
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from .fragments import EncodedRows, render
 
 
 class HandleResponseUtils(object):
@@ -23,9 +24,14 @@ class HandleResponseUtils(object):
         :param status_code: Http status code.
         :type status_code: int.
         :param message: Function that contains response.
-        :return: JsonResponse.
-        :rType: JsonResponse.
+        :return: JsonResponse, search rows are joined from their pre-encoded fragments into the same bytes.
+        :rType: JsonResponse | HttpResponse.
         """
+        if isinstance(message, EncodedRows) or (
+            isinstance(message, dict) and any(isinstance(value, EncodedRows) for value in message.values())
+        ):
+            return HttpResponse(render(message), content_type="application/json", status=status_code)
+
         # If the obj is type set return list(obj)
         if isinstance(message, set):
             return JsonResponse(data=list(message), status=status_code, safe=False)
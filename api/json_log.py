@@ -0,0 +1,112 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from django.conf import settings
+
+
+class _JsonLineFormatter(logging.Formatter):
+    """Formats the entry dictionaries as JSON lines (runs in the listener thread)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg, default=str, ensure_ascii=False)
+
+
+class _PassThroughQueueHandler(QueueHandler):
+    """Queue handler that hands over the raw entry, so nothing is formatted on the request path."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonLineLog:
+    """Asynchronous, rotating JSONL file written by a background thread.
+
+    The request thread only puts the entry on a queue, a listener thread serializes it
+    and writes it to the file. The file is configured by the `<prefix>_PATH`,
+    `<prefix>_MAX_BYTES` and `<prefix>_BACKUP_COUNT` settings, read when the writer starts
+    on the first entry. The writer is flushed and stopped at interpreter exit.
+
+    Methods
+    _______
+    started() -> bool
+        Tells whether the background writer is running.
+    write(entry: dict) -> None
+        Queues an entry, starts the background writer on first use.
+    stop() -> None
+        Flushes the queue and stops the background writer.
+    """
+
+    def __init__(self, logger_name: str, settings_prefix: str):
+        """
+        :param logger_name: Name of the queue backed logger.
+        :type logger_name: str.
+        :param settings_prefix: Prefix of the settings that configure the file.
+        :type settings_prefix: str.
+        """
+        self.logger_name = logger_name
+        self.settings_prefix = settings_prefix
+        self._lock = threading.Lock()
+        self._listener = None
+        self._logger = None
+        atexit.register(self.stop)
+
+    def _setting(self, name: str):
+        return getattr(settings, f'{self.settings_prefix}_{name}')
+
+    def _get_logger(self) -> logging.Logger:
+        """Starts the background writer on first use and returns the queue backed logger.
+
+        :rType: logging.Logger.
+        """
+        with self._lock:
+            if self._logger is None:
+                log_path = self._setting('PATH')
+                os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+
+                file_handler = RotatingFileHandler(
+                    log_path,
+                    maxBytes=self._setting('MAX_BYTES'),
+                    backupCount=self._setting('BACKUP_COUNT'),
+                    encoding='utf-8',
+                )
+                file_handler.setFormatter(_JsonLineFormatter())
+
+                log_queue = queue.SimpleQueue()
+                self._listener = QueueListener(log_queue, file_handler)
+                self._listener.start()
+
+                logger = logging.getLogger(self.logger_name)
+                logger.handlers = [_PassThroughQueueHandler(log_queue)]
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                self._logger = logger
+            return self._logger
+
+    def started(self) -> bool:
+        """Tells whether the background writer is running.
+
+        :rType: bool.
+        """
+        return self._logger is not None
+
+    def write(self, entry: dict) -> None:
+        """Queues an entry, starts the background writer on first use.
+
+        :param entry: The JSON serializable entry.
+        :type entry: dict.
+        """
+        self._get_logger().info(entry)
+
+    def stop(self) -> None:
+        """Flushes the queue and stops the background writer."""
+        with self._lock:
+            if self._listener is not None:
+                self._listener.stop()
+                for handler in self._listener.handlers:
+                    handler.close()
+                self._listener = None
+                self._logger = None
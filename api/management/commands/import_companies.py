@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.csv_parser import ParseFile, COMPANY_INFORMATION_DATA_MAPPING, DEFAULT_CHUNK_SIZE
+from api.custom_exceptions import GenericException
+
+
+class Command(BaseCommand):
+    """Imports the company .csv file - replaces all companies in the db."""
+
+    help = "Imports the semicolon separated company .csv file and replaces all companies in the db."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=None,
+            help="The .csv file to import, defaults to COMPANY_INFORMATION_FILE_PATH.",
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help="How many rows are read and written in one transaction.",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only read and validate the file, the db is not touched.",
+        )
+
+    def handle(self, *args, **options):
+        file_path = options['path'] or settings.COMPANY_INFORMATION_FILE_PATH
+        if not file_path:
+            raise CommandError("No file given, pass --path or set COMPANY_INFORMATION_FILE_PATH")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size has to be at least 1")
+
+        try:
+            rows = ParseFile.read_csv_file_and_create_records(
+                file_path,
+                COMPANY_INFORMATION_DATA_MAPPING,
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'],
+            )
+        except GenericException as error:
+            raise CommandError(f"Import of {file_path} failed: {error}")
+
+        if options['dry_run']:
+            self.stdout.write(f"Dry run: {rows} rows in {file_path} are valid, nothing was written.")
+        else:
+            self.stdout.write(f"The records were created successfully! Imported {rows} rows from {file_path}.")
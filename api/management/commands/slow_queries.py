@@ -0,0 +1,111 @@
+import glob
+import json
+import statistics
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """Summarizes the slow query log - the top offending searches."""
+
+    help = "Summarizes the slow query log and lists the most expensive searches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=None, help="The slow query log, defaults to SLOW_QUERY_LOG_PATH.")
+        parser.add_argument('--top', type=int, default=10, help="How many offenders to list.")
+        parser.add_argument(
+            '--group-by',
+            choices=['input', 'shape'],
+            default='shape',
+            help="Group by the raw search input, or by its shape (fields and operators without the values).",
+        )
+        parser.add_argument(
+            '--order-by',
+            choices=['total', 'max', 'count'],
+            default='total',
+            help="Rank by the summed time, the slowest single request or the number of slow requests.",
+        )
+
+    @staticmethod
+    def _read_entries(log_path: str) -> list:
+        """Reads the log file together with its rotated backups.
+
+        :param log_path: The path of the active log file.
+        :type log_path: str.
+        :return: All parsable log entries.
+        :rType: list[dict].
+        """
+        entries = []
+        for file_path in sorted(glob.glob(glob.escape(log_path) + '*')):
+            with open(file_path, encoding='utf-8') as log_file:
+                for line in log_file:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        return entries
+
+    @staticmethod
+    def _group_key(entry: dict, group_by: str) -> str:
+        """Builds the grouping key of one log entry.
+
+        :param entry: The log entry.
+        :type entry: dict.
+        :param group_by: "input" or "shape".
+        :type group_by: str.
+        :return: The group key.
+        :rType: str.
+        """
+        if group_by == 'input':
+            query = entry.get("search_input") or "<all>"
+        else:
+            parts = []
+            for clause in entry.get("clauses") or []:
+                parts.append(" ".join(f"{f['field']}{f['op']}?" for f in clause["filters"]))
+                if clause["logic"]:
+                    parts.append(clause["logic"])
+            query = " ".join(parts) or "<all>"
+        if entry.get("sort_by"):
+            query += f" | sort {entry['sort_by']} {entry.get('sort_order')} ({entry.get('algorithm')})"
+        return query
+
+    def handle(self, *args, **options):
+        log_path = options['path'] or settings.SLOW_QUERY_LOG_PATH
+        entries = self._read_entries(log_path)
+        if not entries:
+            raise CommandError(f"No slow queries found in {log_path}")
+
+        groups = defaultdict(list)
+        for entry in entries:
+            groups[self._group_key(entry, options['group_by'])].append(entry)
+
+        summary = []
+        for query, group in groups.items():
+            totals = [entry["total_ms"] for entry in group]
+            stage_totals = defaultdict(float)
+            for entry in group:
+                for stage, duration in (entry.get("stages_ms") or {}).items():
+                    stage_totals[stage] += duration
+            summary.append({
+                "query": query,
+                "count": len(group),
+                "total": sum(totals),
+                "median": statistics.median(totals),
+                "max": max(totals),
+                "rows_scanned": statistics.fmean(entry.get("rows_scanned") or 0 for entry in group),
+                "rows_matched": statistics.fmean(entry.get("rows_matched") or 0 for entry in group),
+                "errors": sum(1 for entry in group if entry.get("error")),
+                "slowest_stage": max(stage_totals, key=stage_totals.get) if stage_totals else "-",
+            })
+
+        summary = sorted(summary, key=lambda item: item[options['order_by']], reverse=True)[:options['top']]
+
+        self.stdout.write(f"{len(entries)} slow queries in {len(groups)} groups, top {len(summary)}:")
+        for rank, item in enumerate(summary, start=1):
+            self.stdout.write(
+                f"{rank}. {item['query']}\n"
+                f"   count={item['count']} total={item['total']:.1f}ms median={item['median']:.1f}ms "
+                f"max={item['max']:.1f}ms rows scanned={item['rows_scanned']:.0f} "
+                f"matched={item['rows_matched']:.0f} errors={item['errors']} slowest stage={item['slowest_stage']}"
+            )
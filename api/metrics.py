@@ -0,0 +1,249 @@
+import threading
+from bisect import bisect_left
+from time import perf_counter_ns
+from django.conf import settings
+from django.http import HttpResponse
+from .slow_query_log import SlowQueryLog
+
+
+class StageTimer:
+    """Lap timer that collects the stage durations and row counts of one search request.
+
+    Every `mark` call closes the stage that started with the previous mark. Only the raw
+    timestamps are stored on the hot path, durations are computed when they are read.
+    """
+
+    __slots__ = ('marks', 'rows_scanned', 'rows_returned', 'cache_hit', 'query', 'error', '_started')
+
+    def __init__(self):
+        self.marks = []
+        self.rows_scanned = 0
+        self.rows_returned = 0
+        self.cache_hit = None
+        self.query = None
+        self.error = None
+        self._started = perf_counter_ns()
+
+    def mark(self, stage: str) -> None:
+        """Closes the current stage and starts the next one.
+
+        :param stage: The name of the stage that just finished.
+        :type stage: str.
+        """
+        self.marks.append((stage, perf_counter_ns()))
+
+    @property
+    def stages(self) -> dict:
+        """The stage durations in nanoseconds, in the order the stages were marked."""
+        stages, last = {}, self._started
+        for stage, timestamp in self.marks:
+            stages[stage] = stages.get(stage, 0) + timestamp - last
+            last = timestamp
+        return stages
+
+    @property
+    def total_ns(self) -> int:
+        """The time from the timer creation until the last mark in nanoseconds."""
+        return self.marks[-1][1] - self._started if self.marks else 0
+
+    def server_timing(self) -> str:
+        """Formats the stage durations as a `Server-Timing` header value.
+
+        :return: The header value, e.g. "cache;dur=0.120, filter;dur=3.402, total;dur=3.600".
+        :rType: str.
+        """
+        entries = ["%s;dur=%.3f" % (stage, duration / 1e6) for stage, duration in self.stages.items()]
+        entries.append("total;dur=%.3f" % (self.total_ns / 1e6))
+        return ", ".join(entries)
+
+
+class NullStageTimer:
+    """Do-nothing stand-in for `StageTimer` used while the metrics are disabled."""
+
+    __slots__ = ()
+
+    stages = {}
+    rows_scanned = 0
+    rows_returned = 0
+    cache_hit = None
+    query = None
+    error = None
+    total_ns = 0
+
+    def __setattr__(self, name, value):
+        pass
+
+    def mark(self, stage: str) -> None:
+        pass
+
+
+NULL_TIMER = NullStageTimer()
+
+
+class SearchMetrics:
+    """Process wide registry of the search metrics, exported in Prometheus text format.
+
+    Methods
+    _______
+    timer() -> StageTimer | NullStageTimer
+        Starts a timer for one request, a no-op timer if nothing consumes the timings.
+    record(timer: StageTimer) -> None
+        Queues a finished request timer for the histograms and counters.
+    finish(timer: StageTimer, response: HttpResponse) -> HttpResponse
+        Adds the `Server-Timing` header, records the timer and hands it to the slow query log.
+    render() -> str
+        Renders all metrics in Prometheus text exposition format.
+    reset() -> None
+        Drops everything recorded so far.
+    """
+
+    # Histogram bucket upper bounds in seconds
+    BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    _BUCKETS_NS = tuple(int(bound * 1e9) for bound in BUCKETS)
+
+    # Finished timers are only queued on the request path and folded into the
+    # histograms when the queue grows or the metrics are rendered.
+    FLUSH_THRESHOLD = 1024
+
+    _lock = threading.Lock()
+    _pending = []
+    _histograms = {}  # stage -> [bucket counts..., +Inf count, sum_ns]
+    _counters = {
+        "requests": 0,
+        "rows_scanned": 0,
+        "rows_returned": 0,
+        "cache_hits": 0,
+        "cache_misses": 0,
+    }
+
+    @staticmethod
+    def enabled() -> bool:
+        """Tells whether the search metrics are switched on (`SEARCH_METRICS_ENABLED` setting).
+
+        :rType: bool.
+        """
+        return getattr(settings, 'SEARCH_METRICS_ENABLED', False)
+
+    @classmethod
+    def timer(cls):
+        """Starts a timer for one request.
+
+        :return: A running timer, or the shared no-op timer if both the metrics and
+            the slow query log are disabled.
+        :rType: StageTimer | NullStageTimer.
+        """
+        return StageTimer() if cls.enabled() or SlowQueryLog.enabled() else NULL_TIMER
+
+    @classmethod
+    def _observe(cls, stage: str, duration_ns: int) -> None:
+        """Adds one observation to a stage histogram, the caller must hold the lock.
+
+        :param stage: The stage name.
+        :type stage: str.
+        :param duration_ns: The stage duration in nanoseconds.
+        :type duration_ns: int.
+        """
+        histogram = cls._histograms.get(stage)
+        if histogram is None:
+            histogram = cls._histograms[stage] = [0] * (len(cls._BUCKETS_NS) + 2)
+        histogram[bisect_left(cls._BUCKETS_NS, duration_ns)] += 1
+        histogram[-1] += duration_ns
+
+    @classmethod
+    def _flush(cls) -> None:
+        """Folds the queued timers into the histograms and counters, the caller must hold the lock."""
+        pending, cls._pending = cls._pending, []
+        for timer in pending:
+            for stage, duration_ns in timer.stages.items():
+                cls._observe(stage, duration_ns)
+            cls._observe("total", timer.total_ns)
+
+            cls._counters["requests"] += 1
+            cls._counters["rows_scanned"] += timer.rows_scanned
+            cls._counters["rows_returned"] += timer.rows_returned
+            if timer.cache_hit is True:
+                cls._counters["cache_hits"] += 1
+            elif timer.cache_hit is False:
+                cls._counters["cache_misses"] += 1
+
+    @classmethod
+    def record(cls, timer) -> None:
+        """Queues a finished request timer for the histograms and counters.
+
+        :param timer: The timer of the finished request.
+        :type timer: StageTimer | NullStageTimer.
+        """
+        if timer is NULL_TIMER:
+            return
+
+        # Under the lock, a flush swaps `_pending` and would drop an append to the old list
+        with cls._lock:
+            cls._pending.append(timer)
+            if len(cls._pending) >= cls.FLUSH_THRESHOLD:
+                cls._flush()
+
+    @classmethod
+    def finish(cls, timer, response: HttpResponse) -> HttpResponse:
+        """Adds the `Server-Timing` header, records the timer and hands it to the slow query log.
+
+        :param timer: The timer of the finished request.
+        :type timer: StageTimer | NullStageTimer.
+        :param response: The response that is about to be returned.
+        :type response: HttpResponse.
+        :return: The same response.
+        :rType: HttpResponse.
+        """
+        if timer is NULL_TIMER:
+            return response
+
+        if cls.enabled():
+            response['Server-Timing'] = timer.server_timing()
+            cls.record(timer)
+        SlowQueryLog.observe(timer, response.status_code)
+        return response
+
+    @classmethod
+    def render(cls) -> str:
+        """Renders all metrics in Prometheus text exposition format.
+
+        :return: The exposition text.
+        :rType: str.
+        """
+        with cls._lock:
+            cls._flush()
+            histograms = {stage: list(values) for stage, values in cls._histograms.items()}
+            counters = dict(cls._counters)
+
+        lines = [
+            "# HELP search_stage_duration_seconds Duration of the search request stages.",
+            "# TYPE search_stage_duration_seconds histogram",
+        ]
+        for stage, values in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(cls.BUCKETS + ("+Inf",), values[:-1]):
+                cumulative += count
+                lines.append(f'search_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'search_stage_duration_seconds_sum{{stage="{stage}"}} {values[-1] / 1e9}')
+            lines.append(f'search_stage_duration_seconds_count{{stage="{stage}"}} {cumulative}')
+
+        for name, description in (
+            ("requests", "Search requests that were timed."),
+            ("rows_scanned", "Rows checked against the search filters."),
+            ("rows_returned", "Rows returned to the clients."),
+            ("cache_hits", "Searches served from the cached dataset."),
+            ("cache_misses", "Searches that had to load the dataset from the database."),
+        ):
+            lines.append(f"# HELP search_{name}_total {description}")
+            lines.append(f"# TYPE search_{name}_total counter")
+            lines.append(f"search_{name}_total {counters[name]}")
+
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def reset(cls) -> None:
+        """Drops everything recorded so far."""
+        with cls._lock:
+            cls._pending = []
+            cls._histograms.clear()
+            for name in cls._counters:
+                cls._counters[name] = 0
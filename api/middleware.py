@@ -0,0 +1,66 @@
+import json
+import random
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from .json_log import JsonLineLog
+
+
+class RequestRecorderMiddleware:
+    """Records the search requests into a JSONL workload for `benchmarks/load_test.py`.
+
+    Only listed in `MIDDLEWARE` when `REQUEST_RECORDER_PATH` is set, and Django drops it at
+    startup if the path is empty. A `REQUEST_RECORDER_SAMPLE_RATE` share of the requests
+    under `REQUEST_RECORDER_PREFIX` is queued on the request path and written by a
+    background thread, the same way as the slow query log (see `JsonLineLog`).
+
+    Methods
+    _______
+    stop() -> None
+        Flushes the queue and stops the background writer.
+    """
+
+    LOGGER_NAME = 'api.request_recorder'
+
+    _log = JsonLineLog(LOGGER_NAME, 'REQUEST_RECORDER')
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_RECORDER_PATH', ''):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = getattr(settings, 'REQUEST_RECORDER_PREFIX', '/api/companies')
+        self.sample_rate = getattr(settings, 'REQUEST_RECORDER_SAMPLE_RATE', 1.0)
+
+    def __call__(self, request):
+        if not request.path.startswith(self.prefix) or random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        # Read before the view, DRF parses the body from the cached copy
+        body = request.body
+        started = time.perf_counter()
+        response = self.get_response(request)
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        try:
+            body = json.loads(body) if body else {}
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return response
+        if not isinstance(body, dict):
+            return response
+        if not body and request.GET:
+            body = request.GET.dict()
+
+        self._log.write({
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "path": request.path,
+            "body": body,
+            "status": response.status_code,
+            "duration_ms": round(duration_ms, 3),
+        })
+        return response
+
+    @classmethod
+    def stop(cls) -> None:
+        """Flushes the queue and stops the background writer."""
+        cls._log.stop()
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_alter_companydetails_company_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanySearchRow',
+            fields=[
+                ('row_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('company_id', models.BigIntegerField(db_column='id')),
+                ('name', models.CharField(max_length=25)),
+                ('country', models.CharField(max_length=20)),
+                ('industry', models.CharField(max_length=30)),
+                ('founded_year', models.PositiveIntegerField()),
+                ('company_type', models.CharField(max_length=100, null=True)),
+                ('size', models.CharField(max_length=50, null=True)),
+                ('ceo_name', models.CharField(max_length=30, null=True)),
+                ('headquarters', models.CharField(max_length=50, null=True)),
+                ('financial_year', models.PositiveIntegerField(null=True)),
+                ('revenue', models.DecimalField(decimal_places=2, max_digits=20, null=True)),
+                ('net_income', models.DecimalField(decimal_places=2, max_digits=20, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company_id', 'financial_year'], name='searchrow_company_year_idx'), models.Index(fields=['industry', 'country'], name='searchrow_industry_country_idx'), models.Index(fields=['revenue'], name='searchrow_revenue_idx'), models.Index(fields=['name'], name='searchrow_name_idx')],
+            },
+        ),
+        # Backfill from the normalized tables
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO api_companysearchrow (
+                    id, name, industry, country, founded_year,
+                    company_type, size, ceo_name, headquarters,
+                    financial_year, revenue, net_income
+                )
+                SELECT
+                    c.id, c.name, c.industry, c.country, c.founded_year,
+                    d.company_type, d.size, d.ceo_name, d.headquarters,
+                    f.year, f.revenue, f.net_income
+                FROM api_company AS c
+                LEFT JOIN api_companydetails AS d ON d.company_id = c.id
+                LEFT JOIN api_financialdata AS f ON f.company_id = c.id
+                ORDER BY c.id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_companysearchrow'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['name'], name='company_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['industry'], name='company_industry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['country'], name='company_country_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='financialdata',
+            index=models.Index(fields=['year'], name='financialdata_year_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:54
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='company',
+            name='company_name_idx',
+        ),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='company_name_lower_idx'),
+        ),
+    ]
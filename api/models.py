@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 
 
 class Company(models.Model):
@@ -9,6 +10,14 @@ class Company(models.Model):
     industry = models.CharField(max_length=30)
     founded_year = models.PositiveIntegerField()
 
+    class Meta:
+        # The admin search (case insensitive name prefix) and list filters
+        indexes = [
+            models.Index(Lower('name'), name='company_name_lower_idx'),
+            models.Index(fields=['industry'], name='company_industry_idx'),
+            models.Index(fields=['country'], name='company_country_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -28,6 +37,10 @@ class FinancialData(models.Model):
     class Meta:
         unique_together = ('company', 'year')
         ordering = ['-year']
+        # The default ordering and the admin list filter
+        indexes = [
+            models.Index(fields=['year'], name='financialdata_year_idx'),
+        ]
 
     def __str__(self):
         return f"{self.company.name} - {self.year}"
@@ -54,3 +67,36 @@ class CompanyDetails(models.Model):
 
     def __str__(self):
         return f"{self.company.name} Details"
+
+
+class CompanySearchRow(models.Model):
+    """Model repr one denormalized search row - a company joined with its details and one financial year.
+
+    The table holds exactly the columns of the search dataset, so the snapshot loads are a single
+    scan of one table. It is written by the csv import and kept in sync by `api/signals.py`.
+    """
+
+    row_id = models.BigAutoField(primary_key=True)
+    company_id = models.BigIntegerField(db_column='id')
+    name = models.CharField(max_length=25)
+    country = models.CharField(max_length=20)
+    industry = models.CharField(max_length=30)
+    founded_year = models.PositiveIntegerField()
+    company_type = models.CharField(max_length=100, null=True)
+    size = models.CharField(max_length=50, null=True)
+    ceo_name = models.CharField(max_length=30, null=True)
+    headquarters = models.CharField(max_length=50, null=True)
+    financial_year = models.PositiveIntegerField(null=True)
+    revenue = models.DecimalField(max_digits=20, decimal_places=2, null=True)
+    net_income = models.DecimalField(max_digits=20, decimal_places=2, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company_id', 'financial_year'], name='searchrow_company_year_idx'),
+            models.Index(fields=['industry', 'country'], name='searchrow_industry_country_idx'),
+            models.Index(fields=['revenue'], name='searchrow_revenue_idx'),
+            models.Index(fields=['name'], name='searchrow_name_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - {self.financial_year}"
@@ -0,0 +1,280 @@
+import base64
+import binascii
+import hashlib
+import json
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from django.http import HttpRequest
+from .admission import NO_DEADLINE, AdmissionControl, Deadline, QueryCost
+from .algorithms import CustomAlgorithms as Algorithms
+from .custom_exceptions import DataNotValid
+from .fragments import EncodedRows
+from .metrics import NULL_TIMER
+from .search_sort_filter_v3 import ManualSQLQueryEngine
+from .snapshot import DataSnapshot, SnapshotStore
+
+
+class _PageKey:
+    """The position of a row in the page order - the sort value, then the (id, financial year) tie-breaker."""
+
+    __slots__ = ('value', 'tie', 'reverse')
+
+    def __init__(self, value, tie: tuple, reverse: bool):
+        self.value = value
+        self.tie = tie
+        self.reverse = reverse
+
+    def __lt__(self, other) -> bool:
+        a, b = self.value, other.value
+        if a != b:
+            # Same None placement as the custom sorting algorithms
+            if a is None:
+                return self.reverse
+            if b is None:
+                return not self.reverse
+            return a > b if self.reverse else a < b
+        return self.tie < other.tie
+
+
+class KeysetPagination:
+    """Cursor based pagination of the search results, pinned to a snapshot version.
+
+    The filtered and sorted order of a search is kept per snapshot version, and the next
+    page is found by binary searching the last row of the previous page in it - nothing is
+    filtered, sorted or skipped again. The opaque cursor holds the snapshot version, a
+    fingerprint of the search, the sort value (money in cents) and the (id, financial year) of the last row.
+    As long as the order of that version is cached, every page comes from the same version,
+    afterwards the search continues from the same position in the current snapshot.
+
+    Methods
+    _______
+    requested(request) -> bool
+        Tells whether the request asks for a page instead of the full result.
+    encode_cursor(cursor: dict) -> str
+        Encodes a cursor into an opaque url safe string.
+    decode_cursor(value: str) -> dict
+        Decodes a cursor made by `encode_cursor`.
+    paginate(request, timer) -> dict
+        Returns one page of the search result with the cursor of the next page.
+    clear() -> None
+        Drops the cached search orders.
+    """
+
+    DEFAULT_PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 1000
+
+    # Every cached order references the rows of its snapshot version
+    CACHE_SIZE = 16
+    CACHE_TTL = SnapshotStore.REBUILD_INTERVAL
+
+    _lock = threading.Lock()
+    _orders = OrderedDict()  # (version, fingerprint) -> (created, sorted rows, row fragments)
+
+    @staticmethod
+    def requested(request: HttpRequest) -> bool:
+        """Tells whether the request asks for a page instead of the full result.
+
+        :rType: bool.
+        """
+        return "page size" in request.data or "cursor" in request.data
+
+    @staticmethod
+    def encode_cursor(cursor: dict) -> str:
+        """Encodes a cursor into an opaque url safe string.
+
+        :param cursor: The cursor fields.
+        :type cursor: dict.
+        :rType: str.
+        """
+        raw = json.dumps(cursor, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(value: str) -> dict:
+        """Decodes a cursor made by `encode_cursor`.
+
+        :param value: The opaque cursor.
+        :type value: str.
+        :raises DataNotValid: If the cursor is malformed.
+        :rType: dict.
+        """
+        try:
+            raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+            cursor = json.loads(raw)
+            if not isinstance(cursor, dict) or not {"version", "search", "value", "tie"} <= cursor.keys():
+                raise ValueError(value)
+            cursor["tie"] = tuple(cursor["tie"])
+            return cursor
+        except (ValueError, TypeError, binascii.Error):
+            raise DataNotValid("Invalid cursor")
+
+    @classmethod
+    def _sort(
+        cls, rows: list, sort_field: str, reverse: bool, algorithm: str, ordered: bool, deadline=NO_DEADLINE,
+    ) -> tuple:
+        """Sorts the rows in the page order - by the sort field, ties by (id, financial year).
+
+        All custom algorithms are stable, so an input in tie-breaker order breaks the ties of
+        the sort field. The rows of an ordered snapshot already are, in any other case they
+        are ordered first.
+
+        :param ordered: Whether the rows come from an ordered snapshot (`DataSnapshot.ordered`).
+        :type ordered: bool.
+        :return: The sorted rows and the algorithm that sorted them, None without a sort field.
+        :rType: tuple[list[dict], str | None].
+        """
+        if not ordered:
+            rows = sorted(rows, key=DataSnapshot.tie)
+        if not sort_field:
+            return rows, None
+        return Algorithms.sort(rows, sort_field, reverse, algorithm, deadline)
+
+    @classmethod
+    def _cached_order(cls, version: int, fingerprint: str):
+        """Returns the cached order of a search in a snapshot version, if it is still there.
+
+        :return: The sorted rows, the fragments of their snapshot and the algorithm that sorted them.
+        :rType: tuple[list[dict], RowFragments | None, str | None] | None.
+        """
+        with cls._lock:
+            entry = cls._orders.get((version, fingerprint))
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= cls.CACHE_TTL:
+                del cls._orders[(version, fingerprint)]
+                return None
+            cls._orders.move_to_end((version, fingerprint))
+            return entry[1:]
+
+    @classmethod
+    def _store_order(cls, version: int, fingerprint: str, rows: list, fragments, algorithm: str = None) -> None:
+        """Caches the order of a search in a snapshot version, dropping the least recently used."""
+        with cls._lock:
+            cls._orders[(version, fingerprint)] = (time.monotonic(), rows, fragments, algorithm)
+            while len(cls._orders) > cls.CACHE_SIZE:
+                cls._orders.popitem(last=False)
+
+    @classmethod
+    def _page_size(cls, value) -> int:
+        """Validates the requested page size.
+
+        :raises DataNotValid: If it is not a number between 1 and `MAX_PAGE_SIZE`.
+        :rType: int.
+        """
+        try:
+            page_size = int(value)
+        except (ValueError, TypeError):
+            raise DataNotValid(f"Invalid page size: {value}")
+        if not 1 <= page_size <= cls.MAX_PAGE_SIZE:
+            raise DataNotValid(f"The page size must be between 1 and {cls.MAX_PAGE_SIZE}")
+        return page_size
+
+    @classmethod
+    def paginate(cls, request: HttpRequest, timer=NULL_TIMER) -> dict:
+        """Returns one page of the search result with the cursor of the next page.
+
+        Takes the search parameters plus "page size" and the "cursor" of the previous page.
+
+        :param request: The HTTP request data.
+        :type request: HttpRequest.
+        :param timer: The request timer, every stage is marked on it.
+        :type timer: StageTimer.
+        :raises DataNotValid: If the page size or the cursor is not valid.
+        :raises SearchOverloaded: If building the order is heavy and no heavy query slot frees up.
+        :raises SearchDeadlineExceeded: If building the order runs past `SEARCH_DEADLINE_MS`.
+        :return: {"results": [...], "next_cursor": str | None, "snapshot_version": int, "algorithm": str | None}.
+        :rType: dict.
+
+        Example
+        _______
+        request.data = {
+            "search input": "industry:Tech",
+            "sort_by": "revenue",
+            "sort order": "desc",
+            "page size": 50,
+            "cursor": "eyJ2ZXJzaW9uIjo..."
+        }
+        """
+        query_string = request.data.get("search input", "")
+        sort_field = request.data.get("sort_by")
+        sort_order = (request.data.get("sort order") or "asc").lower()
+        algorithm = Algorithms.algorithm_name(request.data.get("algorithm"))
+        latest_only = str(request.data.get("latest year only", False)).lower() == "true"
+        page_size = cls._page_size(request.data.get("page size", cls.DEFAULT_PAGE_SIZE))
+        cursor = cls.decode_cursor(str(request.data["cursor"])) if request.data.get("cursor") else None
+        reverse = sort_order == "desc"
+        deadline = Deadline.start()
+        timer.mark("request")
+
+        search = json.dumps([query_string, sort_field, sort_order, algorithm if sort_field else None, latest_only])
+        fingerprint = hashlib.sha1(search.encode("utf-8")).hexdigest()[:16]
+        if cursor is not None and cursor["search"] != fingerprint:
+            raise DataNotValid("The cursor belongs to a different search")
+
+        # Stay on the version of the previous page while its order is cached
+        version, order = None, None
+        if cursor is not None:
+            version, order = cursor["version"], cls._cached_order(cursor["version"], fingerprint)
+        if order is None:
+            snapshot = SnapshotStore.get(timer)
+            version, order = snapshot.version, cls._cached_order(snapshot.version, fingerprint)
+            timer.mark("cache")
+            if order is None:
+                clauses = ManualSQLQueryEngine._parse_query(query_string)
+                data = ManualSQLQueryEngine._select_data(snapshot, clauses, latest_only)
+                # Only the first page pays for the order, the rows returned are one page
+                cost = QueryCost.estimate(snapshot, data, clauses, sort_field)
+                cost = QueryCost(cost.rows_scanned, cost.rows_returned, min(cost.rows_returned, page_size))
+                timer.mark("parse")
+                with AdmissionControl.admit(cost):
+                    timer.mark("admission")
+                    filtered = ManualSQLQueryEngine.filter_data(data, clauses, timer, deadline)
+                    timer.mark("filter")
+                    rows, sorted_by = cls._sort(filtered, sort_field, reverse, algorithm, snapshot.ordered, deadline)
+                    timer.mark("sort")
+                order = rows, snapshot.fragments, sorted_by
+                cls._store_order(version, fingerprint, *order)
+        # "auto" is reported as the algorithm it picked for the cached order
+        rows, fragments, algorithm = order
+
+        timer.query = {
+            "search_input": query_string,
+            "sort_by": sort_field,
+            "sort_order": sort_order,
+            "algorithm": algorithm,
+            "latest_only": latest_only,
+        }
+
+        # Seek right after the last row of the previous page
+        start = 0
+        if cursor is not None:
+            position = lambda row: _PageKey(row.get(sort_field) if sort_field else row["id"], DataSnapshot.tie(row), reverse)
+            start = bisect_right(rows, _PageKey(cursor["value"], cursor["tie"], reverse), key=position)
+        page = rows[start:start + page_size]
+
+        next_cursor = None
+        if start + page_size < len(rows):
+            last = page[-1]
+            next_cursor = cls.encode_cursor({
+                "version": version,
+                "search": fingerprint,
+                "value": last.get(sort_field) if sort_field else last["id"],
+                "tie": DataSnapshot.tie(last),
+            })
+        timer.mark("page")
+        timer.rows_returned = len(page)
+
+        return {
+            "results": EncodedRows(page, fragments, algorithm),
+            "next_cursor": next_cursor,
+            "snapshot_version": version,
+            "algorithm": algorithm,
+        }
+
+    @classmethod
+    def clear(cls) -> None:
+        """Drops the cached search orders."""
+        with cls._lock:
+            cls._orders.clear()
@@ -1,8 +1,15 @@
 import re
+from typing import Iterator
 from django.http import HttpRequest
 from django.db import connection
-from django.core.cache import cache
+from .admission import NO_DEADLINE, AdmissionControl, Deadline, QueryCost
 from .algorithms import CustomAlgorithms as Algorithms
+from .cents import CENTS_OPERATORS, MONEY_FIELDS, literal_to_cents, money_value, present
+from .custom_exceptions import DataNotValid
+from .fragments import EncodedRows
+from .fuzzy import INDEXED_FIELDS as FUZZY_INDEXED_FIELDS, MAX_DISTANCE as FUZZY_MAX_DISTANCE, FuzzyIndex, edit_distance
+from .metrics import NULL_TIMER
+from .snapshot import DataSnapshot, SnapshotStore
 
 
 class ManualSQLQueryEngine:
@@ -13,21 +20,29 @@ class ManualSQLQueryEngine:
         
         Methods
         _______
-        _get_all_data() -> list[dict]
-            Loads and caches the full dataset from the database.
+        _get_all_data(timer, latest_only: bool) -> list[dict]
+            Returns the full dataset, or one latest year row per company, from the in-memory snapshot.
         _execute_sql(sql: str, params: list) -> list[dict]
             Executes raw SQL safely and returns results as a list of dictionaries.
         _parse_query(query_string: str) -> list[dict]
             Parses text-based search queries into structured filter clauses.
-        _filter_data(data: list, clauses: list) -> list[dict]
+        _select_data(snapshot, clauses: list, latest_only: bool) -> list[dict]
+            Resolves the fuzzy filters with the snapshot indexes and returns the rows to filter.
+        filter_data(data: list, clauses: list, timer, deadline) -> list[dict]
             Filters cached data in memory based on query clauses.
-        search_data(request)
+        iter_filter_data(data: list, clauses: list) -> Iterator[dict]
+            Lazy variant of `filter_data`, yields the matching records one by one.
+        search_data(request, timer, lazy: bool)
             Main public method for performing full in-memory search and sort operations.
     """
 
-    QUERY_RE = re.compile(r'(\w+)\s*(>=|<=|>|<|:|=|~)\s*"?([^"]+)"?')
+    QUERY_RE = re.compile(r'(\w+)\s*(>=|<=|>|<|:|=|~|%)\s*"?([^"]+)"?')
+    FUZZY_RE = re.compile(r'^(.*?)(?:~(\d+))?$')
     LOGIC_RE = re.compile(r'\s+(AND|OR)\s+', re.IGNORECASE)
 
+    # Rows filtered between two checks of the request deadline
+    DEADLINE_CHECK_ROWS = 4096
+
     FIELD_MAP = {
         "id": "id",
         "name": "name",
@@ -43,32 +58,20 @@ class ManualSQLQueryEngine:
         "net_income": "net_income",
     }
 
-    CACHE_KEY = "inmemory:all_company_data"
-    CACHE_TTL = 60 * 5  # 5 minutes
-
     @classmethod
-    def _get_all_data(cls) -> list:
-        """Fetches and caches the entire company dataset with joined details.
+    def _get_all_data(cls, timer=NULL_TIMER, latest_only: bool = False) -> list:
+        """Returns the entire company dataset with joined details from the in-memory snapshot.
         
+        :param timer: The request timer, receives whether the snapshot could be reused.
+        :type timer: StageTimer.
+        :param latest_only: Return the per-company rollup - only the latest financial year of
+            every company, extended with multi-year aggregates.
+        :type latest_only: bool.
         :return: A list of all company records (each as a dictionary).
         :rType: list of dicts.
         """
-        data = cache.get(cls.CACHE_KEY)
-        if data is not None:
-            return data
-
-        sql = """
-            SELECT 
-                c.id, c.name, c.industry, c.country, c.founded_year,
-                d.company_type, d.size, d.ceo_name, d.headquarters,
-                f.year AS financial_year, f.revenue, f.net_income
-            FROM api_company AS c
-            LEFT JOIN api_companydetails AS d ON d.company_id = c.id
-            LEFT JOIN api_financialdata AS f ON f.company_id = c.id;
-        """
-        data = cls._execute_sql(sql, [])
-        cache.set(cls.CACHE_KEY, data, cls.CACHE_TTL)
-        return data
+        snapshot = SnapshotStore.get(timer)
+        return snapshot.latest_rows if latest_only else snapshot.rows
 
     @staticmethod
     def _execute_sql(sql: str, params: list) -> list:
@@ -92,7 +95,9 @@ class ManualSQLQueryEngine:
         """Parses a structured search query into logical filter clauses.
         
         :param query_string: The text query (e.g. "industry:Tech AND revenue>1000").
+            A fuzzy filter carries its edit distance after the value, e.g. "name%technova~1".
         :type query_string: str.
+        :raises DataNotValid: If a fuzzy filter asks for a larger distance than supported.
         :return: A list of filter clauses with logic connectors (AND/OR).
         :rType: list of dictionaries.
         """
@@ -106,6 +111,17 @@ class ManualSQLQueryEngine:
             raw_filters = cls.QUERY_RE.findall(parts[i])
             filters = []
             for field, op, val in raw_filters:
+                if op == "%":
+                    val, distance = cls.FUZZY_RE.match(val.strip()).groups()
+                    distance = int(distance) if distance is not None else 1
+                    if distance > FUZZY_MAX_DISTANCE:
+                        raise DataNotValid(f"The fuzzy distance can be at most {FUZZY_MAX_DISTANCE}")
+                    filters.append({"field": field, "op": op, "val": val, "distance": distance})
+                    continue
+                if field in MONEY_FIELDS and op in CENTS_OPERATORS:
+                    # The snapshot keeps money in cents, convert the literal once instead of per row
+                    filters.append({"field": field, "op": op, "val": val, "cents": literal_to_cents(op, val)})
+                    continue
                 filters.append({"field": field, "op": op, "val": val})
 
             logic = parts[i + 1].upper() if i + 1 < len(parts) else None
@@ -113,6 +129,38 @@ class ManualSQLQueryEngine:
 
         return clauses
 
+    @staticmethod
+    def _select_data(snapshot: DataSnapshot, clauses: list, latest_only: bool = False) -> list:
+        """Resolves the fuzzy filters with the snapshot indexes and returns the rows to filter.
+
+        The matching terms of every indexed fuzzy filter are stored on the filter, and the
+        rows are narrowed to the companies that have them - only these rows are scanned.
+        Filters of "OR" clauses don't narrow anything, the same as in `filter_data`.
+
+        :param snapshot: The snapshot that is searched.
+        :type snapshot: DataSnapshot.
+        :param clauses: Parsed query filters from `_parse_query`.
+        :type clauses: list[dict].
+        :param latest_only: Search the per-company rollup instead of all rows.
+        :type latest_only: bool.
+        :return: All rows of the searched list, or the candidates of the fuzzy filters.
+        :rType: list[dict].
+        """
+        company_ids = None
+        for clause in clauses:
+            for f in clause.get("filters", []):
+                if f["op"] != "%" or f["field"] not in FUZZY_INDEXED_FIELDS:
+                    continue
+                index = snapshot.index(FuzzyIndex, f["field"])
+                f["terms"] = index.lookup(f["val"], f["distance"])
+                if clause.get("logic") != "OR":
+                    matching = index.companies(f["terms"])
+                    company_ids = matching if company_ids is None else company_ids & matching
+
+        if company_ids is None:
+            return snapshot.latest_rows if latest_only else snapshot.rows
+        return snapshot.rows_of(company_ids, latest_only)
+
     @staticmethod
     def _match(record: dict, f: dict) -> bool:
         """Compares a single record field against a filter condition.
@@ -122,6 +170,7 @@ class ManualSQLQueryEngine:
         :param record: The data record that is going to be checked.
         :type record: dict.
         :param f: The dictionary containing a 'filter' condition with keys "field", "op", and "val".
+            Money filters carry their literal in integer "cents" as well.
         :type f: dict.
         :return: True if the record satisfies the condition else False.
         :rType: bool.
@@ -134,6 +183,25 @@ class ManualSQLQueryEngine:
         if rec_val is None:
             return False
 
+        # Money filter, compared in integer cents against the literal converted by `_parse_query`
+        if "cents" in f:
+            bound = f["cents"]
+            if bound is None:
+                return False
+            match op:
+                case ":" | "=":
+                    return rec_val == bound
+                case ">":
+                    return rec_val > bound
+                case "<":
+                    return rec_val < bound
+                case ">=":
+                    return rec_val >= bound
+                case "<=":
+                    return rec_val <= bound
+        if field in MONEY_FIELDS:
+            rec_val = money_value(record, field)
+
         # Normalize case for string comparison
         if isinstance(rec_val, str):
             rec_val_lower = rec_val.lower()
@@ -150,6 +218,11 @@ class ManualSQLQueryEngine:
                     return str(rec_val_lower) == str(val_lower)
                 case "~":
                     return str(val_lower) in str(rec_val_lower)
+                case "%":
+                    # Terms resolved by the fuzzy index, otherwise the distance is computed here
+                    if "terms" in f:
+                        return str(rec_val_lower) in f["terms"]
+                    return edit_distance(str(val_lower), str(rec_val_lower), f["distance"]) <= f["distance"]
                 case ">":
                     return float(rec_val) > float(val)
                 case "<":
@@ -164,13 +237,18 @@ class ManualSQLQueryEngine:
             return False
 
     @classmethod
-    def filter_data(cls, data: list, clauses: list) -> list:
+    def filter_data(cls, data: list, clauses: list, timer=NULL_TIMER, deadline=NO_DEADLINE) -> list:
         """Applies search filters on cached data entirely in memory.
         
         :param data: List of all records (from cache).
         :type data: list[dict].
         :param clauses: Parsed query filters from `_parse_query`.
         :type clauses: list[dict].
+        :param timer: The request timer, counts the scanned rows.
+        :type timer: StageTimer.
+        :param deadline: The request deadline, checked every `DEADLINE_CHECK_ROWS` rows.
+        :type deadline: Deadline.
+        :raises SearchDeadlineExceeded: If the deadline passes while filtering.
         :return: Filtered subset of the input data.
         :rType: list[dict].
         """
@@ -181,11 +259,14 @@ class ManualSQLQueryEngine:
         for clause in clauses:
             filters = clause.get("filters", [])
             logic = clause.get("logic")
+            timer.rows_scanned += len(result)
 
             subfiltered = []
-            for r in result:
-                if all(cls._match(r, f) for f in filters):
-                    subfiltered.append(r)
+            for start in range(0, len(result), cls.DEADLINE_CHECK_ROWS):
+                deadline.check()
+                for r in result[start:start + cls.DEADLINE_CHECK_ROWS]:
+                    if all(cls._match(r, f) for f in filters):
+                        subfiltered.append(r)
 
             if logic == "OR":
                 combined = result + subfiltered
@@ -196,14 +277,74 @@ class ManualSQLQueryEngine:
         return result
 
     @classmethod
-    def search_data(cls, request: HttpRequest) -> list:
+    def iter_filter_data(cls, data: list, clauses: list, timer=NULL_TIMER, deadline=NO_DEADLINE) -> Iterator[dict]:
+        """Lazy variant of `filter_data`, yields the matching records one by one.
+
+        An "OR" clause never narrows the result of `filter_data`, so a record is kept when it
+        matches the filters of every other clause - the same records in the same order.
+
+        :param data: List of all records (from cache).
+        :type data: list[dict].
+        :param clauses: Parsed query filters from `_parse_query`.
+        :type clauses: list[dict].
+        :param timer: The request timer, counts the scanned rows.
+        :type timer: StageTimer.
+        :param deadline: The request deadline, checked every `DEADLINE_CHECK_ROWS` rows.
+        :type deadline: Deadline.
+        :raises SearchDeadlineExceeded: If the deadline passes while filtering.
+        :return: The matching records.
+        :rType: Iterator[dict].
+        """
+        filters = [f for clause in clauses if clause.get("logic") != "OR" for f in clause.get("filters", [])]
+        for start in range(0, len(data), cls.DEADLINE_CHECK_ROWS):
+            deadline.check()
+            chunk = data[start:start + cls.DEADLINE_CHECK_ROWS]
+            if filters:
+                timer.rows_scanned += len(chunk)
+            for record in chunk:
+                if all(cls._match(record, f) for f in filters):
+                    yield record
+
+    @classmethod
+    def _stream(cls, data: list, clauses: list, cost, timer, deadline) -> Iterator[dict]:
+        """Streams the matching records while holding the admission slot of the search.
+
+        Yields None once it is admitted - `search_data` takes it before returning, so an
+        overloaded search fails before the response starts, and a started generator
+        releases the slot when it is exhausted, closed or collected.
+
+        :return: None, then the matching records with the money columns converted back from cents.
+        :rType: Iterator[dict | None].
+        """
+        with AdmissionControl.admit(cost):
+            timer.mark("admission")
+            yield None
+            returned = 0
+            for record in cls.iter_filter_data(data, clauses, timer, deadline):
+                returned += 1
+                yield present(record)
+            timer.mark("filter")
+            timer.rows_returned = returned
+
+    @classmethod
+    def search_data(cls, request: HttpRequest, timer=NULL_TIMER, lazy: bool = False) -> list:
         """The 'orchestrator' function, combines all of the above methods,
             performs filtering / sorting if needed and returns the results as a list.
         
         :param request: The HTTP request data.
         :type request: HttpRequest.
-        :return: A NON / filtered /& sorted list of company records.
-        :rType: list[dict].
+        :param timer: The request timer, every stage is marked on it.
+        :type timer: StageTimer.
+        :param lazy: Return a generator instead of a list when no sorting is requested,
+            so the records can be streamed as they are matched. The generator holds the
+            admission slot and checks the deadline until it is exhausted or closed.
+        :type lazy: bool.
+        :raises SearchOverloaded: If the search is heavy and no heavy query slot frees up.
+        :raises SearchDeadlineExceeded: If the search runs past `SEARCH_DEADLINE_MS`.
+        :return: A NON / filtered /& sorted list of company records, money columns converted back from cents.
+            The list is rendered from the pre-encoded row fragments of the snapshot, and tells the
+            algorithm that sorted it ("auto" picks one from a sample of the rows).
+        :rType: EncodedRows | Iterator[dict].
         
         Example
         _______
@@ -211,28 +352,57 @@ class ManualSQLQueryEngine:
             "search input": "industry:Tech AND revenue>1000000",
             "sort_by": "revenue",
             "sort order": "desc",
-            "algorithm": "quicksort"
+            "algorithm": "auto",
+            "latest year only": true
         }
         """
         # Get requerid data
         query_string = request.data.get("search input", "")
         sort_field = request.data.get("sort_by")
         sort_order = (request.data.get("sort order") or "asc").lower()
-        algo_to_use = request.data.get("algorithm", "mergesort")
+        algorithm = Algorithms.algorithm_name(request.data.get("algorithm"))
+        latest_only = str(request.data.get("latest year only", False)).lower() == "true"
+        deadline = Deadline.start()
+        timer.mark("request")
 
         # Load the cached data
-        all_data = cls._get_all_data()
+        snapshot = SnapshotStore.get(timer)
+        timer.mark("cache")
 
         # Apply filters
         clauses = cls._parse_query(query_string)
-        filtered = cls.filter_data(all_data, clauses)
+        all_data = cls._select_data(snapshot, clauses, latest_only)
+        cost = QueryCost.estimate(snapshot, all_data, clauses, sort_field)
+        timer.mark("parse")
+        timer.query = {
+            "search_input": query_string,
+            "clauses": clauses,
+            "sort_by": sort_field,
+            "sort_order": sort_order,
+            "algorithm": algorithm if sort_field else None,
+            "latest_only": latest_only,
+            "estimated_cost": cost.units,
+        }
+        if lazy and not sort_field:
+            # The slot is held until the stream ends, the deadline is checked while it is read
+            rows = cls._stream(all_data, clauses, cost, timer, deadline)
+            next(rows)
+            return rows
 
-        # Sorting
-        if sort_field:
-            reverse = sort_order == "desc"
-            if algo_to_use == "mergesort":
-                filtered = Algorithms.merge_sort(filtered, sort_field, reverse)
-            else:
-                filtered = Algorithms.quick_sort(filtered, sort_field, reverse)
+        # Heavy searches wait for a slot, every search stops at its deadline
+        with AdmissionControl.admit(cost):
+            timer.mark("admission")
+            filtered = cls.filter_data(all_data, clauses, timer, deadline)
+            timer.mark("filter")
+
+            # Sorting
+            if sort_field:
+                reverse = sort_order == "desc"
+                filtered, algorithm = Algorithms.sort(filtered, sort_field, reverse, algorithm, deadline)
+                timer.mark("sort")
+                # "auto" is reported as the algorithm it picked
+                if timer.query is not None:
+                    timer.query["algorithm"] = algorithm
 
-        return filtered
+        timer.rows_returned = len(filtered)
+        return EncodedRows(filtered, snapshot.fragments, algorithm if sort_field else None)
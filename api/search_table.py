@@ -0,0 +1,63 @@
+from django.db import connection
+
+
+class SearchTable:
+    """A service class that keeps the denormalized `CompanySearchRow` table in sync.
+
+    The rows are always rebuilt from the normalized tables with one INSERT ... SELECT,
+    so the flat table holds exactly what the JOIN would return.
+
+    Methods
+    _______
+    refresh(company_ids: list) -> None
+        Rewrites the flat rows of the given companies.
+    rebuild() -> None
+        Rewrites the whole flat table.
+    """
+
+    COLUMNS = (
+        "id, name, industry, country, founded_year, "
+        "company_type, size, ceo_name, headquarters, "
+        "financial_year, revenue, net_income"
+    )
+
+    JOIN_SQL = """
+        SELECT
+            c.id, c.name, c.industry, c.country, c.founded_year,
+            d.company_type, d.size, d.ceo_name, d.headquarters,
+            f.year, f.revenue, f.net_income
+        FROM api_company AS c
+        LEFT JOIN api_companydetails AS d ON d.company_id = c.id
+        LEFT JOIN api_financialdata AS f ON f.company_id = c.id
+        {where}
+        ORDER BY c.id
+    """
+
+    # SQLite allows up to 999 bound parameters on older builds
+    BATCH_SIZE = 500
+
+    @classmethod
+    def refresh(cls, company_ids: list) -> None:
+        """Rewrites the flat rows of the given companies, deleted companies lose their rows.
+
+        :param company_ids: The created, changed or deleted companies.
+        :type company_ids: list[int].
+        """
+        company_ids = list(company_ids)
+        with connection.cursor() as cursor:
+            for start in range(0, len(company_ids), cls.BATCH_SIZE):
+                batch = company_ids[start:start + cls.BATCH_SIZE]
+                placeholders = ', '.join(['%s'] * len(batch))
+                cursor.execute(f"DELETE FROM api_companysearchrow WHERE id IN ({placeholders})", batch)
+                cursor.execute(
+                    f"INSERT INTO api_companysearchrow ({cls.COLUMNS}) "
+                    + cls.JOIN_SQL.format(where=f"WHERE c.id IN ({placeholders})"),
+                    batch,
+                )
+
+    @classmethod
+    def rebuild(cls) -> None:
+        """Rewrites the whole flat table from the normalized tables."""
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM api_companysearchrow")
+            cursor.execute(f"INSERT INTO api_companysearchrow ({cls.COLUMNS}) " + cls.JOIN_SQL.format(where=""))
@@ -0,0 +1,72 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from api.models import Company, FinancialData, CompanyDetails
+from api.search_table import SearchTable
+from api.snapshot import SnapshotStore
+
+# Rows that cascade from a company, deleted first by `bulk_delete`
+COMPANY_DEPENDENTS = (FinancialData, CompanyDetails)
+
+
+def sync_companies(company_ids) -> None:
+    """Rewrites the companies' flat search rows inside the current transaction,
+    and queues the snapshot patch for when the transaction commits.
+
+    Bulk writes such as `QuerySet.update` send no model signals and call this directly.
+
+    :param company_ids: The ids of the touched companies.
+    :type company_ids: Iterable[int].
+    """
+    if SnapshotStore.is_paused():
+        return
+    company_ids = set(company_ids)
+    if not company_ids:
+        return
+    SearchTable.refresh(company_ids)
+    for company_id in company_ids:
+        SnapshotStore.mark_changed(company_id)
+
+
+def bulk_delete(queryset) -> None:
+    """Deletes the rows with plain DELETE statements and syncs the touched companies once afterwards.
+
+    `QuerySet.delete` loads and deletes the objects one by one while a `post_delete` receiver
+    is connected. The rows are deleted the way Django fast deletes them instead - the companies'
+    dependents first - so no receiver runs and the search rows are refreshed in one go.
+    The receivers stay connected, deletes of other threads are synced as usual.
+
+    Nothing is synced while the snapshot is paused - the importer replaces the search rows itself.
+
+    :param queryset: The rows of `Company`, `FinancialData` or `CompanyDetails` to delete.
+    :type queryset: QuerySet.
+    """
+    queryset = queryset.order_by()
+    with transaction.atomic(using=queryset.db):
+        company_ids = []
+        if not SnapshotStore.is_paused():
+            field = 'pk' if queryset.model is Company else 'company_id'
+            company_ids = list(queryset.values_list(field, flat=True).distinct())
+        if queryset.model is Company:
+            for model in COMPANY_DEPENDENTS:
+                dependents = model.objects.all()
+                # Without a filter SQLite empties the table without a scan
+                if queryset.query.where:
+                    dependents = dependents.filter(company__in=queryset.values('pk'))
+                dependents._raw_delete(queryset.db)
+        queryset._raw_delete(queryset.db)
+        sync_companies(company_ids)
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def company_changed(sender, instance, **kwargs):
+    sync_companies([instance.pk])
+
+
+@receiver(post_save, sender=FinancialData)
+@receiver(post_delete, sender=FinancialData)
+@receiver(post_save, sender=CompanyDetails)
+@receiver(post_delete, sender=CompanyDetails)
+def company_related_changed(sender, instance, **kwargs):
+    sync_companies([instance.company_id])
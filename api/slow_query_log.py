@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+from django.conf import settings
+from .json_log import JsonLineLog
+
+
+class SlowQueryLog:
+    """Asynchronous, rotating JSONL log of the searches slower than `SLOW_QUERY_THRESHOLD_MS`.
+
+    The request thread only puts the entry on a queue, a background listener thread
+    serializes it and writes it to the file (see `JsonLineLog`).
+
+    Methods
+    _______
+    enabled() -> bool
+        Tells whether the slow query log is switched on.
+    observe(timer: StageTimer, status_code: int) -> bool
+        Queues a log entry if the finished request was slower than the threshold.
+    build_entry(timer: StageTimer, status_code: int) -> dict
+        Builds the JSON serializable log entry of a finished request.
+    logged_clauses(clauses: list) -> list
+        The parsed clauses as the user wrote them, without the keys the search derives.
+    stop() -> None
+        Flushes the queue and stops the background writer.
+    """
+
+    LOGGER_NAME = 'api.slow_queries'
+
+    _log = JsonLineLog(LOGGER_NAME, 'SLOW_QUERY_LOG')
+
+    @staticmethod
+    def enabled() -> bool:
+        """Tells whether the slow query log is switched on (threshold above 0).
+
+        :rType: bool.
+        """
+        return getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 0) > 0
+
+    @staticmethod
+    def logged_clauses(clauses: list) -> list:
+        """The parsed clauses as the user wrote them - field, operator and value of every filter.
+
+        The search stores derived keys on the filters (the "cents" of a money literal, the
+        matched "terms" of a fuzzy filter), these are not logged.
+
+        :param clauses: The clauses from `_parse_query`.
+        :type clauses: list[dict] | None.
+        :rType: list[dict] | None.
+        """
+        if clauses is None:
+            return None
+        return [
+            {
+                "filters": [{"field": f["field"], "op": f["op"], "val": f["val"]} for f in clause["filters"]],
+                "logic": clause["logic"],
+            }
+            for clause in clauses
+        ]
+
+    @classmethod
+    def build_entry(cls, timer, status_code: int) -> dict:
+        """Builds the JSON serializable log entry of a finished request.
+
+        :param timer: The timer of the finished request.
+        :type timer: StageTimer.
+        :param status_code: The HTTP status of the response.
+        :type status_code: int.
+        :return: The log entry.
+        :rType: dict.
+        """
+        query = timer.query or {}
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "total_ms": round(timer.total_ns / 1e6, 3),
+            "status": status_code,
+            "search_input": query.get("search_input"),
+            "clauses": cls.logged_clauses(query.get("clauses")),
+            "sort_by": query.get("sort_by"),
+            "sort_order": query.get("sort_order"),
+            "algorithm": query.get("algorithm"),
+            "latest_only": query.get("latest_only"),
+            "rows_scanned": timer.rows_scanned,
+            "rows_matched": timer.rows_returned,
+            "stages_ms": {stage: round(duration / 1e6, 3) for stage, duration in timer.stages.items()},
+            "error": timer.error,
+        }
+
+    @classmethod
+    def observe(cls, timer, status_code: int) -> bool:
+        """Queues a log entry if the finished request was slower than the threshold.
+
+        :param timer: The timer of the finished request.
+        :type timer: StageTimer.
+        :param status_code: The HTTP status of the response.
+        :type status_code: int.
+        :return: True if the request was logged.
+        :rType: bool.
+        """
+        if not cls.enabled() or timer.total_ns < settings.SLOW_QUERY_THRESHOLD_MS * 1e6:
+            return False
+        cls._log.write(cls.build_entry(timer, status_code))
+        return True
+
+    @classmethod
+    def stop(cls) -> None:
+        """Flushes the queue and stops the background writer."""
+        cls._log.stop()
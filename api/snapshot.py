@@ -0,0 +1,524 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from itertools import count, islice
+from django.db import connection, transaction
+from .cents import money_to_cents
+from .csv_snapshot import CsvSnapshotSource
+from .fragments import RowFragments
+from .metrics import NULL_TIMER
+from .search_table import SearchTable
+
+logger = logging.getLogger(__name__)
+
+
+class DataSnapshot:
+    """An in-memory, versioned copy of the joined company dataset.
+
+    A snapshot is never mutated once it is published - `patched` builds the next version
+    and reuses every row dictionary that did not change, so readers can keep iterating
+    the version they started with.
+
+    Next to the rows it keeps a per-company rollup - the latest financial year of every
+    company with multi-year aggregates - so "latest year only" searches scan one row per
+    company instead of one per company and year.
+
+    Field indexes (fuzzy matching, autocomplete) are built from the rollups on first use, and
+    patched together with the rows afterwards. The pre-encoded JSON of the rows, if it is
+    kept, is built with the snapshot and patched the same way.
+
+    A loaded snapshot has its rows in (id, financial year) order and its rollups in id order.
+    A patch mostly keeps it, `ordered` tells whether it still holds.
+
+    Methods
+    _______
+    tie(row: dict) -> tuple
+        The (id, financial year) order key of a row, unique within a snapshot.
+    rollup(company_rows: list) -> dict
+        Builds the latest year row of one company with its multi-year aggregates.
+    patched(company_rows: dict, version: int) -> DataSnapshot
+        Builds the next version with the rows of the given companies replaced.
+    index(index_class: type, field: str) -> FuzzyIndex | AutocompleteIndex
+        Returns an index of a company field, building it on first use.
+    rows_of(company_ids: set, latest_only: bool) -> list[dict]
+        Returns the rows of the given companies in the order of the searched list.
+    """
+
+    __slots__ = (
+        'rows', 'positions', 'rollups', 'latest_rows', 'version', 'built_at', 'indexes', 'fragments',
+        'ordered', '_latest_positions',
+    )
+
+    def __init__(
+        self, rows: list, version: int, built_at: float, positions: dict = None, rollups: dict = None,
+        indexes: dict = None, fragments=None, ordered: bool = None,
+    ):
+        """
+        :param rows: The joined company records.
+        :type rows: list[dict].
+        :param version: The dataset version, grows with every rebuild and patch.
+        :type version: int.
+        :param built_at: `time.monotonic()` of the last full rebuild.
+        :type built_at: float.
+        :param positions: Company id -> positions of its rows, built from `rows` if not given.
+        :type positions: dict[int, list[int]].
+        :param rollups: Company id -> its rollup row, built from `rows` if not given.
+        :type rollups: dict[int, dict].
+        :param indexes: (index class, field) -> the index, the indexes that were already built.
+        :type indexes: dict[tuple[type, str], FuzzyIndex | AutocompleteIndex].
+        :param fragments: The pre-encoded JSON of the rows and rollups, None if they are not kept.
+        :type fragments: RowFragments | None.
+        :param ordered: Whether the rows and the rollups are in `tie` order, checked if not given.
+        :type ordered: bool | None.
+        """
+        self.rows = rows
+        self.version = version
+        self.built_at = built_at
+        self.positions = positions if positions is not None else self._index(rows)
+        if rollups is None:
+            rollups = {
+                company_id: self.rollup([rows[position] for position in company_positions])
+                for company_id, company_positions in self.positions.items()
+            }
+        self.rollups = rollups
+        self.latest_rows = list(rollups.values())
+        self.indexes = indexes if indexes is not None else {}
+        self.fragments = fragments
+        if ordered is None:
+            ordered = (
+                self._ordered_at(rows, range(1, len(rows)))
+                and self._ordered_at(self.latest_rows, range(1, len(self.latest_rows)))
+            )
+        self.ordered = ordered
+        self._latest_positions = None
+
+    @staticmethod
+    def tie(row: dict) -> tuple:
+        """The (id, financial year) order key of a row, unique within a snapshot.
+
+        :rType: tuple[int, int].
+        """
+        return row["id"], row["financial_year"] or 0
+
+    @classmethod
+    def _ordered_at(cls, rows: list, positions) -> bool:
+        """Tells whether the rows at the given positions come after their predecessors in `tie` order.
+
+        :param rows: The rows to check.
+        :type rows: list[dict].
+        :param positions: The positions to check, the first and out of range ones are skipped.
+        :type positions: Iterable[int].
+        :rType: bool.
+        """
+        tie, size = cls.tie, len(rows)
+        return all(tie(rows[position - 1]) <= tie(rows[position]) for position in positions if 0 < position < size)
+
+    @staticmethod
+    def _index(rows: list) -> dict:
+        """Maps every company id to the positions of its rows.
+
+        :param rows: The joined company records.
+        :type rows: list[dict].
+        :rType: dict[int, list[int]].
+        """
+        positions = {}
+        for position, row in enumerate(rows):
+            positions.setdefault(row["id"], []).append(position)
+        return positions
+
+    @staticmethod
+    def rollup(company_rows: list) -> dict:
+        """Builds the latest year row of one company with its multi-year aggregates.
+
+        :param company_rows: All joined rows of one company, money in cents.
+        :type company_rows: list[dict].
+        :return: A copy of the latest year row extended with "years_reported", "first_financial_year",
+            "average_revenue", "average_net_income" and "revenue_cagr" (None when it can't be computed).
+        :rType: dict.
+        """
+        reported = [row for row in company_rows if row["financial_year"] is not None]
+        if not reported:
+            return dict(
+                company_rows[0],
+                years_reported=0,
+                first_financial_year=None,
+                average_revenue=None,
+                average_net_income=None,
+                revenue_cagr=None,
+            )
+
+        first = latest = reported[0]
+        for row in reported:
+            if row["financial_year"] > latest["financial_year"]:
+                latest = row
+            if row["financial_year"] < first["financial_year"]:
+                first = row
+
+        revenue_cagr = None
+        span = latest["financial_year"] - first["financial_year"]
+        if span > 0 and first["revenue"] > 0 and latest["revenue"] >= 0:
+            revenue_cagr = round((latest["revenue"] / first["revenue"]) ** (1 / span) - 1, 6)
+
+        # The sums are exact in cents, only the averages are floats
+        return dict(
+            latest,
+            years_reported=len(reported),
+            first_financial_year=first["financial_year"],
+            average_revenue=round(sum(row["revenue"] for row in reported) / len(reported) / 100, 2),
+            average_net_income=round(sum(row["net_income"] for row in reported) / len(reported) / 100, 2),
+            revenue_cagr=revenue_cagr,
+        )
+
+    def patched(self, company_rows: dict, version: int):
+        """Builds the next version with the rows of the given companies replaced.
+
+        Changed rows are written over the old positions, extra rows are appended and
+        surplus rows are removed by moving the last row into the hole, so the cost
+        depends on the number of changed rows, not on the dataset size.
+
+        :param company_rows: Company id -> its fresh joined rows, an empty list deletes the company.
+        :type company_rows: dict[int, list[dict]].
+        :param version: The version of the new snapshot.
+        :type version: int.
+        :return: The patched snapshot.
+        :rType: DataSnapshot.
+        """
+        rows = list(self.rows)
+        positions = dict(self.positions)
+        rollups = dict(self.rollups)
+        surplus = []
+        # Positions whose row changed, and the companies that are new at the end of the rollups
+        touched, added_companies = [], 0
+
+        for company_id, new_rows in company_rows.items():
+            # Updated rollups keep their place, new ones are added at the end
+            if new_rows:
+                added_companies += company_id not in rollups
+                rollups[company_id] = self.rollup(new_rows)
+            else:
+                rollups.pop(company_id, None)
+
+            old_positions = positions.pop(company_id, [])
+            kept = old_positions[:len(new_rows)]
+            for position, row in zip(kept, new_rows):
+                rows[position] = row
+            for row in new_rows[len(kept):]:
+                kept.append(len(rows))
+                rows.append(row)
+            surplus.extend(old_positions[len(new_rows):])
+            if kept:
+                positions[company_id] = kept
+            touched.extend(kept)
+
+        # Swap-remove from the back, so a moved row is never one that is removed later
+        copied = set(company_rows)
+        for position in sorted(surplus, reverse=True):
+            last = len(rows) - 1
+            if position != last:
+                moved = rows[last]
+                rows[position] = moved
+                moved_id = moved["id"]
+                if moved_id not in copied:
+                    positions[moved_id] = list(positions[moved_id])
+                    copied.add(moved_id)
+                moved_positions = positions[moved_id]
+                moved_positions[moved_positions.index(last)] = position
+                touched.append(position)
+            rows.pop()
+
+        changes = {company_id: (self.rollups.get(company_id), rollups.get(company_id)) for company_id in company_rows}
+        indexes = {key: index.patched(changes) for key, index in list(self.indexes.items())}
+
+        fragments = None
+        if self.fragments is not None:
+            removed = [self.rows[position] for company_id in company_rows for position in self.positions.get(company_id, ())]
+            removed.extend(old for old, _ in changes.values() if old is not None)
+            added = [row for new_rows in company_rows.values() for row in new_rows]
+            added.extend(new for _, new in changes.values() if new is not None)
+            fragments = self.fragments.patched(removed, added)
+
+        # Untouched neighbours were in order already, so only the touched rows and the new rollups are checked
+        new_rollups = list(islice(reversed(rollups.values()), added_companies + 1))[::-1]
+        ordered = (
+            self.ordered
+            and self._ordered_at(rows, [position + step for position in touched for step in (0, 1)])
+            and self._ordered_at(new_rollups, range(1, len(new_rollups)))
+        )
+        return DataSnapshot(rows, version, self.built_at, positions, rollups, indexes, fragments, ordered)
+
+    def index(self, index_class: type, field: str):
+        """Returns an index of a company field, building it on first use.
+
+        :param index_class: The index type, `FuzzyIndex` or `AutocompleteIndex`.
+        :type index_class: type.
+        :param field: The indexed company field.
+        :type field: str.
+        :rType: FuzzyIndex | AutocompleteIndex.
+        """
+        index = self.indexes.get((index_class, field))
+        if index is None:
+            # Two threads may build it at the same time, both results are equal
+            index = self.indexes[(index_class, field)] = index_class.build(field, self.rollups)
+        return index
+
+    def rows_of(self, company_ids: set, latest_only: bool = False) -> list:
+        """Returns the rows of the given companies in the order of the searched list.
+
+        :param company_ids: The company ids.
+        :type company_ids: set[int].
+        :param latest_only: Take the rows from `latest_rows` instead of `rows`.
+        :type latest_only: bool.
+        :rType: list[dict].
+        """
+        if latest_only:
+            if self._latest_positions is None:
+                self._latest_positions = {row["id"]: position for position, row in enumerate(self.latest_rows)}
+            positions = [self._latest_positions[company_id] for company_id in company_ids
+                         if company_id in self._latest_positions]
+            return [self.latest_rows[position] for position in sorted(positions)]
+
+        positions = [position for company_id in company_ids for position in self.positions.get(company_id, ())]
+        return [self.rows[position] for position in sorted(positions)]
+
+
+class SnapshotStore:
+    """Process wide holder of the current `DataSnapshot`.
+
+    The snapshot is loaded from the flat search table when it is missing, and patched with
+    the companies reported by the model signals in `api/signals.py`. A snapshot older than
+    `REBUILD_INTERVAL` is rebuilt after the flat table was rewritten from the normalized
+    tables (the periodic consistency check), so a flat row that drifted - raw SQL, a write
+    without signals - is repaired within one interval.
+
+    With `SEARCH_SNAPSHOT_CSV` set the node is read-only - the snapshot is built from the
+    .csv file by `CsvSnapshotSource`, rebuilt when the file content changes, and the
+    change signals are ignored.
+
+    Methods
+    _______
+    get(timer) -> DataSnapshot
+        Returns the current snapshot, (re)building it if needed.
+    rebuild(reconcile: bool) -> DataSnapshot
+        Loads the whole dataset and publishes it as a new version.
+    apply_changes(company_ids: set) -> DataSnapshot | None
+        Reloads the rows of the given companies and publishes the patched version.
+    mark_changed(company_id: int) -> None
+        Queues a company for patching once the current transaction commits.
+    is_paused() -> bool
+        Tells whether the change signals are currently ignored.
+    paused() -> ContextManager
+        Ignores the change signals (bulk imports) and drops the snapshot afterwards.
+    invalidate() -> None
+        Drops the snapshot, the next `get` rebuilds it.
+    reset() -> None
+        Drops the snapshot and forgets the indexes built so far.
+    """
+
+    REBUILD_INTERVAL = 60 * 5  # 5 minutes
+
+    # One scan of the denormalized table along the (id, financial_year) index, see `CompanySearchRow`.
+    # The rows are in a stable order even after a company's rows were rewritten at the end of the table.
+    SQL = """
+        SELECT
+            id, name, industry, country, founded_year,
+            company_type, size, ceo_name, headquarters,
+            financial_year, revenue, net_income
+        FROM api_companysearchrow
+        {where}
+        ORDER BY id, financial_year;
+    """
+
+    # SQLite allows up to 999 bound parameters on older builds
+    PATCH_BATCH_SIZE = 500
+
+    _lock = threading.RLock()
+    _snapshot = None
+    _versions = count(1)
+    _paused = False
+    _local = threading.local()
+    # (index class, field) of every index that was built, rebuilt with every new snapshot
+    _index_keys = set()
+
+    @classmethod
+    def _fetch_rows(cls, company_ids: list = None) -> list:
+        """Reads the search rows, of all companies or only of the given ones.
+
+        :param company_ids: Restricts the query to these companies if given.
+        :type company_ids: list[int].
+        :return: The joined company records, revenue and net income in integer cents.
+        :rType: list[dict].
+        """
+        where, params = "", []
+        if company_ids is not None:
+            where = f"WHERE id IN ({', '.join(['%s'] * len(company_ids))})"
+            params = list(company_ids)
+
+        with connection.cursor() as cursor:
+            cursor.execute(cls.SQL.format(where=where), params)
+            columns = [col[0] for col in cursor.description]
+            rows = cursor.fetchall()
+
+        # Money is kept in integer cents, see `api/cents.py`
+        return [money_to_cents(dict(zip(columns, row))) for row in rows]
+
+    @classmethod
+    def _is_fresh(cls, snapshot: DataSnapshot) -> bool:
+        """Tells whether the snapshot was fully rebuilt less than `REBUILD_INTERVAL` ago,
+        or in the read-only mode whether the .csv file still holds the same content.
+
+        :rType: bool.
+        """
+        if CsvSnapshotSource.enabled():
+            return CsvSnapshotSource.is_current()
+        return time.monotonic() - snapshot.built_at < cls.REBUILD_INTERVAL
+
+    @classmethod
+    def get(cls, timer=NULL_TIMER) -> DataSnapshot:
+        """Returns the current snapshot, (re)building it if it is missing or expired.
+
+        While another thread refreshes an expired snapshot the old one keeps being served.
+
+        :param timer: The request timer, receives whether the snapshot could be reused.
+        :type timer: StageTimer.
+        :rType: DataSnapshot.
+        """
+        snapshot = cls._snapshot
+        if snapshot is not None and cls._is_fresh(snapshot):
+            timer.cache_hit = True
+            return snapshot
+
+        # Keep serving the expired snapshot while another thread rebuilds it
+        if not cls._lock.acquire(blocking=snapshot is None):
+            timer.cache_hit = True
+            return snapshot
+
+        try:
+            current = cls._snapshot
+            if current is not None and cls._is_fresh(current):
+                timer.cache_hit = True
+                return current
+            timer.cache_hit = False
+            # An expired snapshot is the periodic consistency check
+            return cls.rebuild(reconcile=current is not None)
+        finally:
+            cls._lock.release()
+
+    @classmethod
+    def rebuild(cls, reconcile: bool = False) -> DataSnapshot:
+        """Loads the whole dataset and publishes it as a new version.
+
+        A .csv file that can't be read keeps the current snapshot in place, if there is one.
+
+        :param reconcile: Rewrite the flat search table from the normalized tables first.
+            Skipped while paused, the bulk writer fills the table itself.
+        :type reconcile: bool.
+        :rType: DataSnapshot.
+        """
+        with cls._lock:
+            if CsvSnapshotSource.enabled():
+                try:
+                    rows = CsvSnapshotSource.read_rows()
+                except Exception:
+                    if cls._snapshot is None:
+                        raise
+                    logger.exception("Reloading the snapshot from %s failed", CsvSnapshotSource.path())
+                    return cls._snapshot
+            else:
+                if reconcile and not cls._paused:
+                    with transaction.atomic():
+                        SearchTable.rebuild()
+                rows = cls._fetch_rows()
+            snapshot = DataSnapshot(rows, next(cls._versions), time.monotonic())
+            if RowFragments.enabled():
+                snapshot.fragments = RowFragments.build(snapshot.rows + snapshot.latest_rows)
+
+            # The indexes in use are built before the version is published, not by its first request
+            if cls._snapshot is not None:
+                cls._index_keys.update(cls._snapshot.indexes)
+            for index_class, field in cls._index_keys:
+                snapshot.indexes[(index_class, field)] = index_class.build(field, snapshot.rollups)
+            cls._snapshot = snapshot
+            return cls._snapshot
+
+    @classmethod
+    def apply_changes(cls, company_ids: set):
+        """Reloads the rows of the given companies and publishes the patched version.
+
+        :param company_ids: The companies that were created, changed or deleted.
+        :type company_ids: set[int].
+        :return: The patched snapshot, None if there was no snapshot to patch.
+        :rType: DataSnapshot | None.
+        """
+        with cls._lock:
+            if cls._snapshot is None or not company_ids:
+                return cls._snapshot
+
+            ids = list(company_ids)
+            company_rows = {company_id: [] for company_id in ids}
+            for start in range(0, len(ids), cls.PATCH_BATCH_SIZE):
+                for row in cls._fetch_rows(ids[start:start + cls.PATCH_BATCH_SIZE]):
+                    company_rows[row["id"]].append(row)
+
+            cls._snapshot = cls._snapshot.patched(company_rows, next(cls._versions))
+            return cls._snapshot
+
+    @classmethod
+    def _flush_changes(cls) -> None:
+        """Applies the companies collected by this thread, the first commit callback takes them all."""
+        company_ids = getattr(cls._local, 'pending', None)
+        if company_ids:
+            cls._local.pending = set()
+            cls.apply_changes(company_ids)
+
+    @classmethod
+    def mark_changed(cls, company_id: int) -> None:
+        """Queues a company for patching once the current transaction commits.
+
+        All companies touched by one transaction are reloaded with a single query. Ids left
+        over by a rolled back transaction are simply reloaded with the next commit.
+
+        :param company_id: The id of the created, changed or deleted company.
+        :type company_id: int.
+        """
+        if cls._paused or cls._snapshot is None or CsvSnapshotSource.enabled():
+            return
+
+        if getattr(cls._local, 'pending', None) is None:
+            cls._local.pending = set()
+        cls._local.pending.add(company_id)
+        transaction.on_commit(cls._flush_changes)
+
+    @classmethod
+    def is_paused(cls) -> bool:
+        """Tells whether the change signals are currently ignored (bulk import running).
+
+        :rType: bool.
+        """
+        return cls._paused
+
+    @classmethod
+    @contextmanager
+    def paused(cls):
+        """Ignores the change signals while bulk writing, and drops the snapshot afterwards."""
+        cls._paused = True
+        try:
+            yield
+        finally:
+            cls._paused = False
+            cls.invalidate()
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Drops the snapshot, the next `get` rebuilds it."""
+        with cls._lock:
+            if cls._snapshot is not None:
+                cls._index_keys.update(cls._snapshot.indexes)
+            cls._snapshot = None
+
+    @classmethod
+    def reset(cls) -> None:
+        """Drops the snapshot and forgets the indexes built so far."""
+        with cls._lock:
+            cls._snapshot = None
+            cls._index_keys = set()
@@ -0,0 +1,64 @@
+import json
+import pytest
+from api.admission import AdmissionControl
+from api.csv_snapshot import CsvSnapshotSource
+from api.metrics import SearchMetrics
+from api.middleware import RequestRecorderMiddleware
+from api.models import Company, FinancialData, CompanyDetails
+from api.pagination import KeysetPagination
+from api.slow_query_log import SlowQueryLog
+from api.snapshot import SnapshotStore
+
+
+def reset_search_state():
+    """Drops every class level cache and counter of the search, so no test sees another one's state."""
+    SnapshotStore.reset()
+    KeysetPagination.clear()
+    AdmissionControl.reset()
+    SearchMetrics.reset()
+    CsvSnapshotSource.reset()
+    SlowQueryLog.stop()
+    RequestRecorderMiddleware.stop()
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    reset_search_state()
+    yield
+    reset_search_state()
+
+
+@pytest.fixture
+def create_company(db):
+    """Creates a company with its details and financial years (year, revenue, net income)."""
+    def create(name, industry="Tech", country="USA", financials=((2024, 1000, 100),), **details):
+        company = Company.objects.create(name=name, country=country, industry=industry, founded_year=2000)
+        details = {"size": "50-100", "ceo_name": "Jane Doe", "headquarters": "NY", **details}
+        CompanyDetails.objects.create(company=company, **details)
+        for year, revenue, net_income in financials:
+            FinancialData.objects.create(company=company, year=year, revenue=revenue, net_income=net_income)
+        return company
+    return create
+
+
+@pytest.fixture
+def companies(create_company):
+    for name, industry, revenue in (("Acme", "Tech", 1000), ("Beta", "Finance", 500), ("Gamma", "Tech", 250)):
+        create_company(name, industry, financials=[(2024, revenue, 100)], company_type="Private")
+
+
+@pytest.fixture
+def search(client):
+    """Sends a search body to an endpoint, checks the status and returns the response."""
+    def send(body, expected_status=200, url="/api/companies"):
+        response = client.generic("GET", url, json.dumps(body), content_type="application/json")
+        assert response.status_code == expected_status, getattr(response, "content", b"")[:500]
+        return response
+    return send
+
+
+@pytest.fixture
+def export(search):
+    def send(body, expected_status=200):
+        return search(body, expected_status, url="/api/companies/export")
+    return send
@@ -0,0 +1,124 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.admin import EstimatedCountPaginator
+from api.models import Company, CompanyDetails, CompanySearchRow
+from api.search_table import SearchTable
+from api.snapshot import SnapshotStore
+
+
+@pytest.fixture
+def companies(create_company):
+    for index, (name, industry, country) in enumerate((
+        ("Acme", "Tech", "USA"),
+        ("Acorn", "Energy", "UK"),
+        ("Beta", "Tech", "UK"),
+        ("Gamma", "Finance", "USA"),
+    )):
+        create_company(name, industry, country, financials=[(2023, 1000 + index, 100), (2024, 1000 + index, 100)])
+
+
+def changelist_names(response) -> list:
+    return sorted(str(row) for row in response.context["cl"].result_list)
+
+
+class TestEstimatedCountPaginator:
+    """Tests for the paginator that estimates big unfiltered tables."""
+
+    def test_estimates_from_the_key_range(self, companies, monkeypatch):
+        monkeypatch.setattr(EstimatedCountPaginator, "EXACT_COUNT_LIMIT", 2)
+        Company.objects.filter(name="Beta").delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            count = EstimatedCountPaginator(Company.objects.order_by("pk"), 2).count
+        assert count == 4
+        assert "COUNT(" not in queries[0]["sql"]
+
+    def test_small_and_filtered_lists_are_counted_exactly(self, companies, monkeypatch):
+        Company.objects.filter(name="Beta").delete()
+        assert EstimatedCountPaginator(Company.objects.order_by("pk"), 2).count == 3
+
+        monkeypatch.setattr(EstimatedCountPaginator, "EXACT_COUNT_LIMIT", 2)
+        assert EstimatedCountPaginator(Company.objects.filter(country="USA").order_by("pk"), 2).count == 2
+        assert EstimatedCountPaginator(Company.objects.none().order_by("pk"), 2).count == 0
+
+
+class TestAdminChangelists:
+    """Tests for the changelists of the big tables."""
+
+    def test_related_company_is_selected_with_the_rows(self, admin_client, companies, django_assert_max_num_queries):
+        admin_client.get("/admin/api/financialdata/")
+        with django_assert_max_num_queries(10):
+            response = admin_client.get("/admin/api/financialdata/")
+        assert response.status_code == 200
+        assert len(response.context["cl"].result_list) == 8
+
+    def test_search_is_a_name_prefix(self, admin_client, companies):
+        response = admin_client.get("/admin/api/company/", {"q": "ac"})
+        assert changelist_names(response) == ["Acme", "Acorn"]
+
+        response = admin_client.get("/admin/api/financialdata/", {"q": "Acm"})
+        assert changelist_names(response) == ["Acme - 2023", "Acme - 2024"]
+
+    @pytest.mark.parametrize("term", ["acm", "ACM", "aCm "])
+    def test_search_ignores_the_case(self, admin_client, companies, term):
+        response = admin_client.get("/admin/api/company/", {"q": term})
+        assert changelist_names(response) == ["Acme"]
+
+        response = admin_client.get("/admin/api/companydetails/", {"q": term})
+        assert len(response.context["cl"].result_list) == 1
+
+    def test_search_seeks_the_lower_cased_name_index(self, admin_client, companies):
+        with CaptureQueriesContext(connection) as queries:
+            admin_client.get("/admin/api/company/", {"q": "AC"})
+        search_sql = next(query["sql"] for query in queries if 'LOWER("api_company"."name") >=' in query["sql"])
+        with connection.cursor() as cursor:
+            plan = " ".join(str(row) for row in cursor.execute("EXPLAIN QUERY PLAN " + search_sql).fetchall())
+        assert "company_name_lower_idx" in plan
+
+    def test_filters_on_industry_country_and_year(self, admin_client, companies):
+        response = admin_client.get("/admin/api/financialdata/", {"industry": "Tech", "country": "UK", "year": "2024"})
+        assert changelist_names(response) == ["Beta - 2024"]
+
+        response = admin_client.get("/admin/api/companydetails/", {"industry": "Tech"})
+        assert changelist_names(response) == ["Acme Details", "Beta Details"]
+
+        response = admin_client.get("/admin/api/company/", {"country": "USA"})
+        assert changelist_names(response) == ["Acme", "Gamma"]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAdminActions:
+    """Tests for the bulk actions, they patch the search snapshot right away."""
+
+    def test_mark_private_updates_the_snapshot(self, admin_client, companies):
+        SnapshotStore.get()
+        ids = list(CompanyDetails.objects.filter(company__industry="Tech").values_list("pk", flat=True))
+        admin_client.post("/admin/api/companydetails/", {"action": "mark_private", "_selected_action": ids})
+
+        rows = SnapshotStore.get().rows
+        assert {row["name"] for row in rows if row["company_type"] == "Private"} == {"Acme", "Beta"}
+        assert CompanySearchRow.objects.filter(company_type="Private").count() == 4
+
+    def test_bulk_delete_refreshes_the_search_rows_once(self, admin_client, companies, monkeypatch):
+        SnapshotStore.get()
+        refreshed = []
+        refresh = SearchTable.refresh
+
+        def record_refresh(company_ids):
+            refreshed.append(set(company_ids))
+            refresh(company_ids)
+
+        monkeypatch.setattr(SearchTable, "refresh", record_refresh)
+
+        ids = list(Company.objects.filter(industry="Tech").values_list("pk", flat=True))
+        admin_client.post("/admin/api/company/", {"action": "delete_selected", "_selected_action": ids, "post": "yes"})
+
+        assert refreshed == [set(ids)]
+        assert {row["name"] for row in SnapshotStore.get().rows} == {"Acorn", "Gamma"}
+
+    def test_resync_action(self, admin_client, companies):
+        CompanySearchRow.objects.all().delete()
+        ids = list(Company.objects.values_list("pk", flat=True))
+        admin_client.post("/admin/api/company/", {"action": "resync_search_rows", "_selected_action": ids})
+        assert CompanySearchRow.objects.count() == 8
@@ -0,0 +1,123 @@
+import pytest
+from api.admission import AdmissionControl, Deadline, QueryCost
+from api.algorithms import CustomAlgorithms
+from api.custom_exceptions import SearchDeadlineExceeded
+from api.search_sort_filter_v3 import ManualSQLQueryEngine
+from api.snapshot import DataSnapshot
+
+
+@pytest.fixture
+def companies(create_company):
+    for name, industry in (("Acme", "Tech"), ("Beta", "Energy"), ("Gamma", "Tech")):
+        create_company(name, industry, financials=[(2023, 1000, 100), (2024, 1000, 100)])
+
+
+@pytest.fixture
+def heavy_slot_taken(settings):
+    # Every search is heavy and the only slot is held by another request
+    settings.SEARCH_HEAVY_QUERY_COST = 1
+    settings.SEARCH_HEAVY_QUERY_CONCURRENCY = 1
+    settings.SEARCH_ADMISSION_WAIT_MS = 0
+    with AdmissionControl.admit(QueryCost(10 ** 9, 0, 0)):
+        yield
+
+
+class TestQueryCost:
+    """Tests for the cost estimate of a parsed search."""
+
+    def test_sort_and_clauses_add_up(self):
+        rows = [
+            {"id": i, "name": f"company {i}", "industry": "Tech" if i % 2 else "Energy", "financial_year": None}
+            for i in range(1000)
+        ]
+        snapshot = DataSnapshot(rows, version=1, built_at=0)
+        clauses = ManualSQLQueryEngine._parse_query("industry:tech AND name~company 1")
+
+        unfiltered = QueryCost.estimate(snapshot, rows, [])
+        sorted_ = QueryCost.estimate(snapshot, rows, [], "name")
+        filtered = QueryCost.estimate(snapshot, rows, clauses, "name")
+
+        assert (unfiltered.rows_scanned, unfiltered.rows_sorted, unfiltered.rows_returned) == (0, 0, 1000)
+        assert sorted_.units > unfiltered.units
+        # Two industries keep half of the rows, the second clause scans only those
+        assert filtered.rows_scanned == 1500
+        assert filtered.rows_returned == 50
+        assert filtered.units < sorted_.units
+
+    def test_unknown_field_does_not_build_statistics(self):
+        rows = [{"id": i, "name": f"company {i}", "financial_year": None} for i in range(10)]
+        snapshot = DataSnapshot(rows, version=1, built_at=0)
+        clauses = [{"filters": [{"field": "no_such_field", "op": ":", "value": "x"}], "logic": None}]
+
+        cost = QueryCost.estimate(snapshot, rows, clauses)
+        assert cost.rows_returned == 1
+        assert snapshot.indexes == {}
+
+
+class TestDeadline:
+    """Tests for the cooperative deadline checks."""
+
+    def test_expired_deadline_stops_the_filter(self):
+        rows = [{"id": i, "name": "Acme"} for i in range(10)]
+        clauses = ManualSQLQueryEngine._parse_query("name:acme")
+        with pytest.raises(SearchDeadlineExceeded):
+            ManualSQLQueryEngine.filter_data(rows, clauses, deadline=Deadline(0))
+
+    def test_expired_deadline_stops_the_lazy_filter(self):
+        rows = [{"id": i, "name": "Acme"} for i in range(10)]
+        clauses = ManualSQLQueryEngine._parse_query("name:acme")
+        with pytest.raises(SearchDeadlineExceeded):
+            list(ManualSQLQueryEngine.iter_filter_data(rows, clauses, deadline=Deadline(0)))
+
+    @pytest.mark.parametrize("sort", [CustomAlgorithms.merge_sort, CustomAlgorithms.quick_sort])
+    def test_expired_deadline_stops_big_sorts_only(self, sort):
+        rows = [{"revenue": i % 97} for i in range(CustomAlgorithms.DEADLINE_CHECK_SIZE)]
+        with pytest.raises(SearchDeadlineExceeded):
+            sort(rows, "revenue", deadline=Deadline(0))
+        assert len(sort(rows[:100], "revenue", deadline=Deadline(0))) == 100
+
+
+@pytest.mark.django_db
+class TestAdmissionControl:
+    """Tests for the 429 / 503 responses of the search endpoint."""
+
+    def test_heavy_search_is_rejected_while_the_slots_are_taken(self, search, companies, heavy_slot_taken):
+        response = search({"sort_by": "name"}, 429)
+        assert response["Retry-After"] == "2"
+        assert response.json()["Retry after"] == 2
+
+    def test_heavy_page_is_rejected_while_the_slots_are_taken(self, search, companies, heavy_slot_taken):
+        search({"sort_by": "name", "page size": 1}, 429)
+
+    def test_cheap_search_is_admitted(self, search, companies, heavy_slot_taken, settings):
+        settings.SEARCH_HEAVY_QUERY_COST = 10 ** 9
+        search({"sort_by": "name"})
+
+    def test_slot_is_released_after_the_search(self, search, companies, settings):
+        settings.SEARCH_HEAVY_QUERY_COST = 1
+        settings.SEARCH_HEAVY_QUERY_CONCURRENCY = 1
+        settings.SEARCH_ADMISSION_WAIT_MS = 0
+        for _ in range(3):
+            search({"sort_by": "name"})
+
+    def test_search_past_the_deadline(self, search, companies, settings):
+        settings.SEARCH_DEADLINE_MS = 1e-9
+        response = search({"search input": "industry:tech"}, 503)
+        assert response["Retry-After"] == "2"
+
+    def test_export_is_rejected_while_the_slots_are_taken(self, export, companies, heavy_slot_taken):
+        export({}, 429)
+
+    @pytest.mark.parametrize("finish", ["read", "close"])
+    def test_export_holds_the_slot_until_the_stream_ends(self, search, export, companies, settings, finish):
+        settings.SEARCH_HEAVY_QUERY_COST = 1
+        settings.SEARCH_HEAVY_QUERY_CONCURRENCY = 1
+        settings.SEARCH_ADMISSION_WAIT_MS = 0
+        response = export({})
+        search({"sort_by": "name"}, 429)
+
+        if finish == "read":
+            assert len(b"".join(response.streaming_content).splitlines()) == 6
+        else:
+            response.close()
+        search({"sort_by": "name"})
@@ -1,10 +1,11 @@
+import random
 import pytest
 from api.algorithms import CustomAlgorithms
 
 # Custom decorator
 both_algorithms = pytest.mark.parametrize(
     "sort_func",
-    [CustomAlgorithms.merge_sort, CustomAlgorithms.quick_sort],
+    [CustomAlgorithms.merge_sort, CustomAlgorithms.quick_sort, CustomAlgorithms.natural_merge_sort],
 )
 
 @pytest.fixture
@@ -54,3 +55,67 @@ class TestCustomAlgorithms:
         merge_sorted = CustomAlgorithms.merge_sort(sample_data, key="key")
         quick_sorted = CustomAlgorithms.quick_sort(sample_data, key="key")
         assert [d["key"] for d in merge_sorted] == [d["key"] for d in quick_sorted]
+
+    @both_algorithms
+    @pytest.mark.parametrize("reverse", [False, True])
+    def test_sort_is_stable(self, sort_func, reverse):
+        data = [{"key": 1, "value": "A"}, {"key": 2, "value": "B"}, {"key": 1, "value": "C"}, {"key": 2, "value": "D"}]
+        values = [d["value"] for d in sort_func(data, key="key", reverse=reverse)]
+        assert values == (["B", "D", "A", "C"] if reverse else ["A", "C", "B", "D"])
+
+    def test_descending_merge_sort_keeps_the_tie_order(self):
+        # Behaviour change of the keyset pagination: the descending merge sort used to put
+        # equal keys in reverse input order (E, D, C, B, A), now it keeps them like the ascending one
+        data = [{"key": 1, "value": value} for value in "ABCDE"] + [{"key": 2, "value": "F"}]
+        values = [d["value"] for d in CustomAlgorithms.merge_sort(data, key="key", reverse=True)]
+        assert values == ["F", "A", "B", "C", "D", "E"]
+
+
+class TestNaturalMergeSort:
+    """Tests for the run detecting mergesort and the automatic algorithm choice."""
+
+    @pytest.mark.parametrize("reverse", [False, True])
+    @pytest.mark.parametrize("layout", ["random", "sorted", "reversed", "runs"])
+    def test_same_order_as_mergesort(self, reverse, layout):
+        generator = random.Random(7)
+        data = [{"key": generator.choice([None, *range(50)]), "value": index} for index in range(500)]
+        if layout != "random":
+            data.sort(key=lambda row: (row["key"] is None, row["key"] or 0))
+        if layout == "reversed":
+            data.reverse()
+        if layout == "runs":
+            data = data[250:] + data[:250]
+
+        expected = CustomAlgorithms.merge_sort(data, key="key", reverse=reverse)
+        assert CustomAlgorithms.natural_merge_sort(data, key="key", reverse=reverse) == expected
+
+    @pytest.mark.parametrize("layout, expected", [
+        ("sorted", "natural_mergesort"),
+        ("reversed", "natural_mergesort"),
+        ("random", "mergesort"),
+        ("few distinct", "quicksort"),
+        ("small", "natural_mergesort"),
+    ])
+    def test_auto_choice(self, layout, expected):
+        generator = random.Random(1)
+        data = {
+            "sorted": lambda: [{"key": index} for index in range(1000)],
+            "reversed": lambda: [{"key": index} for index in range(1000, 0, -1)],
+            "random": lambda: [{"key": generator.random()} for _ in range(1000)],
+            "few distinct": lambda: [{"key": generator.choice(["Tech", "Energy", "Finance"])} for _ in range(1000)],
+            "small": lambda: [{"key": generator.random()} for _ in range(10)],
+        }[layout]()
+
+        rows, algorithm = CustomAlgorithms.sort(data, "key", algorithm="auto")
+        assert algorithm == expected
+        assert rows == CustomAlgorithms.merge_sort(data, "key")
+
+    def test_auto_falls_back_on_mixed_key_types(self):
+        data = [{"key": index if index % 2 else str(index)} for index in range(100)]
+        assert CustomAlgorithms.choose_algorithm(data, "key") == "mergesort"
+
+    @pytest.mark.parametrize("requested, expected", [
+        (None, "mergesort"), ("auto", "auto"), ("natural_mergesort", "natural_mergesort"), ("bogo", "quicksort"),
+    ])
+    def test_algorithm_name(self, requested, expected):
+        assert CustomAlgorithms.algorithm_name(requested) == expected
@@ -0,0 +1,93 @@
+import pytest
+from api.autocomplete import AutocompleteIndex
+from api.models import Company
+
+
+@pytest.fixture
+def companies(create_company):
+    for name, industry, country, revenue in (
+        ("TechNova", "Software", "USA", 100),
+        ("Technik", "Software", "Germany", 900),
+        ("TerraNet", "Telecom", "USA", 500),
+        ("EcoGen", "Energy", "Germany", 300),
+    ):
+        create_company(name, industry, country, financials=[(2024, revenue, 10)])
+
+
+def complete(client, params, expected_status=200):
+    response = client.get("/api/companies/autocomplete", params)
+    assert response.status_code == expected_status
+    return response.json()
+
+
+def rollups(*rows):
+    return {company_id: row for company_id, row in enumerate(rows, 1)}
+
+
+class TestAutocompleteIndex:
+    """Tests for the sorted array prefix index."""
+
+    def test_ranks_by_count_then_alphabetically(self):
+        index = AutocompleteIndex.build("industry", rollups(
+            {"industry": "Telecom"}, {"industry": "Software"}, {"industry": "Software"}, {"industry": "Solar"},
+        ))
+        assert [c["value"] for c in index.complete("", 10)] == ["Software", "Solar", "Telecom"]
+        assert index.complete("SO", 1) == [{"value": "Software", "count": 2, "revenue": 0}]
+
+    def test_big_slices_are_ranked_up_front(self, monkeypatch):
+        monkeypatch.setattr(AutocompleteIndex, "SCAN_LIMIT", 2)
+        index = AutocompleteIndex.build("name", rollups(*({"name": f"Tech {i}", "revenue": i} for i in range(10))))
+        assert index.top[("revenue", "te")][:3] == ["tech 9", "tech 8", "tech 7"]
+        assert [c["value"] for c in index.complete("tech ", 2, "revenue")] == ["Tech 9", "Tech 8"]
+
+    def test_lookups_do_not_change_the_index(self, monkeypatch):
+        monkeypatch.setattr(AutocompleteIndex, "SCAN_LIMIT", 2)
+        index = AutocompleteIndex.build("name", rollups(*({"name": f"Tech {i}", "revenue": i} for i in range(10))))
+        top = dict(index.top)
+        assert [c["value"] for c in index.complete("tech ", 2, "revenue")] == ["Tech 9", "Tech 8"]
+        assert [c["value"] for c in index.complete("tech", 2)] == ["Tech 0", "Tech 1"]
+        assert index.top == top
+
+    def test_patched_index_updates_the_rankings(self, monkeypatch):
+        monkeypatch.setattr(AutocompleteIndex, "SCAN_LIMIT", 2)
+        rows = rollups(*({"name": f"Tech {i}", "revenue": i} for i in range(10)))
+        index = AutocompleteIndex.build("name", rows)
+        patched = index.patched({
+            9: (rows[9], dict(rows[9], revenue=0)),
+            11: (None, {"name": "Techno", "revenue": 100}),
+            1: (rows[1], None),
+        })
+        assert [c["value"] for c in patched.complete("t", 3, "revenue")] == ["Techno", "Tech 9", "Tech 7"]
+        assert [c["value"] for c in index.complete("t", 3, "revenue")] == ["Tech 9", "Tech 8", "Tech 7"]
+        assert "tech 0" not in patched.keys
+
+
+@pytest.mark.django_db
+class TestAutocompleteView:
+    """Tests for the autocomplete endpoint."""
+
+    def test_name_completions(self, client, companies):
+        assert [c["value"] for c in complete(client, {"prefix": "te"})] == ["Technik", "TechNova", "TerraNet"]
+
+    def test_rank_by_revenue(self, client, companies):
+        completions = complete(client, {"prefix": "te", "rank by": "revenue", "limit": 2})
+        assert completions == [
+            {"value": "Technik", "count": 1, "revenue": 900},
+            {"value": "TerraNet", "count": 1, "revenue": 500},
+        ]
+
+    def test_distinct_values_ranked_by_frequency(self, client, companies):
+        completions = complete(client, {"field": "country", "prefix": ""})
+        assert [(c["value"], c["count"]) for c in completions] == [("Germany", 2), ("USA", 2)]
+
+    def test_follows_the_changes(self, client, companies, django_capture_on_commit_callbacks):
+        assert complete(client, {"field": "industry", "prefix": "s"})[0]["count"] == 2
+        with django_capture_on_commit_callbacks(execute=True):
+            company = Company.objects.get(name="Technik")
+            company.industry = "Security"
+            company.save()
+        assert [c["value"] for c in complete(client, {"field": "industry", "prefix": "s"})] == ["Security", "Software"]
+
+    @pytest.mark.parametrize("params", [{"field": "revenue"}, {"rank by": "age"}, {"limit": 0}, {"limit": "x"}])
+    def test_invalid_parameters(self, client, companies, params):
+        complete(client, params, expected_status=400)
@@ -1,5 +1,9 @@
+import io
 import pytest
-from api.models import Company, FinancialData, CompanyDetails
+import sys
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from api.models import Company, FinancialData, CompanyDetails, CompanySearchRow
 from api.custom_exceptions import ErrorMissingColumns, GenericException
 from api.csv_parser import ParseFile, COMPANY_INFORMATION_DATA_MAPPING
 
@@ -57,6 +61,17 @@ class TestParseFile:
             assert FinancialData.objects.filter(company=company).exists()
             assert CompanyDetails.objects.filter(company=company).exists()
 
+    def test_read_csv_fills_the_search_table(self, mock_csv_ok):
+        """The flat search rows are written together with the normalized records."""
+        ParseFile.read_csv_file_and_create_records(mock_csv_ok, COMPANY_INFORMATION_DATA_MAPPING)
+
+        rows = {row.name: row for row in CompanySearchRow.objects.all()}
+        assert set(rows) == {"Acme", "Beta"}
+        acme = Company.objects.get(name="Acme")
+        assert rows["Acme"].company_id == acme.id
+        assert rows["Acme"].financial_year == 2024
+        assert rows["Acme"].headquarters == "New York"
+
     def test_read_csv_missing_column_raises(self, mock_csv_missing_column):
         """Should raise an exception that includes 'Missing columns: Headquarters'."""
         with pytest.raises((GenericException, ErrorMissingColumns)) as exc_info:
@@ -71,3 +86,62 @@ class TestParseFile:
         """Invalid path should raise GenericException."""
         with pytest.raises(GenericException):
             ParseFile.read_csv_file_and_create_records("nonexistent.csv", COMPANY_INFORMATION_DATA_MAPPING)
+
+    def test_read_csv_in_chunks_returns_the_row_count(self, mock_csv_ok):
+        """Every chunk is written, a chunk of one row included."""
+        rows = ParseFile.read_csv_file_and_create_records(mock_csv_ok, COMPANY_INFORMATION_DATA_MAPPING, chunk_size=1)
+
+        assert rows == 2
+        assert CompanySearchRow.objects.count() == 2
+
+    def test_dry_run_does_not_touch_the_db(self, mock_csv_ok):
+        """A dry run counts the rows and keeps the existing companies."""
+        Company.objects.create(name="Old", country="USA", industry="Tech", founded_year=1990)
+        rows = ParseFile.read_csv_file_and_create_records(
+            mock_csv_ok, COMPANY_INFORMATION_DATA_MAPPING, chunk_size=1, dry_run=True,
+        )
+
+        assert rows == 2
+        assert list(Company.objects.values_list("name", flat=True)) == ["Old"]
+
+    def test_dry_run_reports_invalid_numbers(self, tmp_path):
+        """The line numbers of the rows with broken numbers are reported."""
+        file_path = tmp_path / "invalid.csv"
+        file_path.write_text(
+            "Name;Country;Industry;Year of foundation;Year;Revenue;Net Income;Privacy;Size;CEO Name;Headquarters\n"
+            "Acme;USA;Tech;2000;2024;1000;200;Public;100-500;Jane Doe;New York\n"
+            "Beta;UK;Finance;1995;2023;;100;Private;50-100;John Smith;London\n"
+            "Gamma;UK;Finance;1995;20x3;5;100;Private;50-100;John Smith;London\n"
+        )
+        with pytest.raises(GenericException, match="2 rows with invalid numbers, lines: 3, 4"):
+            ParseFile.read_csv_file_and_create_records(
+                file_path, COMPANY_INFORMATION_DATA_MAPPING, chunk_size=2, dry_run=True,
+            )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestImportCommand:
+    """Tests for the `import_companies` management command."""
+
+    def test_imports_the_file(self, mock_csv_ok):
+        out = io.StringIO()
+        call_command("import_companies", "--path", str(mock_csv_ok), "--chunk-size", "1", stdout=out)
+
+        assert "Imported 2 rows" in out.getvalue()
+        assert set(Company.objects.values_list("name", flat=True)) == {"Acme", "Beta"}
+
+    def test_dry_run(self, mock_csv_ok):
+        out = io.StringIO()
+        call_command("import_companies", "--path", str(mock_csv_ok), "--dry-run", stdout=out)
+
+        assert "Dry run: 2 rows" in out.getvalue()
+        assert not Company.objects.exists()
+
+    def test_failure_is_a_command_error(self, mock_csv_missing_column):
+        with pytest.raises(CommandError, match="Missing columns: Headquarters"):
+            call_command("import_companies", "--path", str(mock_csv_missing_column))
+
+    def test_missing_pandas_is_a_command_error(self, mock_csv_ok, monkeypatch):
+        monkeypatch.setitem(sys.modules, "pandas", None)
+        with pytest.raises(CommandError, match="pandas"):
+            call_command("import_companies", "--path", str(mock_csv_ok))
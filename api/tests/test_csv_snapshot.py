@@ -0,0 +1,85 @@
+import json
+import os
+import pytest
+from api.csv_parser import ParseFile, COMPANY_INFORMATION_DATA_MAPPING
+from api.csv_snapshot import CsvSnapshotSource
+from api.snapshot import SnapshotStore
+
+HEADER = "Name;Country;Industry;Year of foundation;Year;Revenue;Net Income;Privacy;Size;CEO Name;Headquarters\n"
+LINES = (
+    "Acme;USA;Tech;2000;2024;1000.10;-0.5;Public;100-500;Jane Doe;New York\n"
+    "Beta;UK;Finance;1995;2023;500;100;Private;50-100;John Smith;London\n"
+    "Gamma;UK;Tech;2010;2022;12345678.99;7;Public;10-50;José Ruiz;Madrid\n"
+)
+
+
+@pytest.fixture
+def csv_file(tmp_path, settings):
+    file_path = tmp_path / "companies.csv"
+    file_path.write_text(HEADER + LINES, encoding="utf-8")
+    settings.SEARCH_SNAPSHOT_CSV = str(file_path)
+    settings.SEARCH_SNAPSHOT_CSV_CHECK_SECONDS = 0
+    return file_path
+
+
+def rewrite(file_path, content):
+    """Replaces the file content and moves its mtime, like a deploy that copies a new file."""
+    stat = os.stat(file_path)
+    file_path.write_text(content, encoding="utf-8")
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class TestCsvSnapshot:
+    """Tests for the read-only mode that builds the snapshot from the .csv file."""
+
+    def test_searches_without_the_db(self, search, csv_file):
+        # No db fixture - any query would fail the test
+        rows = search({"search input": "industry:Tech", "sort_by": "revenue", "sort order": "desc"}).json()
+        assert [(row["id"], row["name"], row["revenue"]) for row in rows] == [
+            (3, "Gamma", 12345678.99), (1, "Acme", 1000.1),
+        ]
+        assert rows[1]["net_income"] == -0.5
+        assert SnapshotStore.get().rows[0]["revenue"] == 100010
+
+    @pytest.mark.django_db(transaction=True)
+    def test_same_fields_as_the_imported_db(self, search, csv_file, settings):
+        ParseFile.read_csv_file_and_create_records(csv_file, COMPANY_INFORMATION_DATA_MAPPING)
+        settings.SEARCH_SNAPSHOT_CSV = ""
+        from_db = search({"sort_by": "name"}).json()
+
+        settings.SEARCH_SNAPSHOT_CSV = str(csv_file)
+        SnapshotStore.invalidate()
+        from_csv = search({"sort_by": "name"}).json()
+
+        # The csv ids are synthetic, the db ones depend on the earlier tests
+        strip_ids = lambda rows: [{key: value for key, value in row.items() if key != "id"} for row in rows]
+        assert strip_ids(from_csv) == strip_ids(from_db)
+        assert [list(row) for row in from_csv] == [list(row) for row in from_db]
+
+    def test_reloads_when_the_content_changes(self, search, csv_file):
+        version = SnapshotStore.get().version
+        rewrite(csv_file, HEADER + LINES)
+        assert SnapshotStore.get().version == version
+
+        rewrite(csv_file, HEADER + LINES + "Delta;USA;Energy;1980;2024;1;1;Public;1-10;Ann Lee;Boston\n")
+        snapshot = SnapshotStore.get()
+        assert snapshot.version > version
+        assert [row["name"] for row in search({"search input": "name:delta"}).json()] == ["Delta"]
+
+    def test_broken_file_keeps_the_current_snapshot(self, csv_file):
+        snapshot = SnapshotStore.get()
+        rewrite(csv_file, HEADER.replace(";Headquarters", "") + "Acme;USA;Tech;2000;2024;1;1;Public;1-10;Jane Doe\n")
+
+        assert SnapshotStore.get() is snapshot
+        # The broken version is not parsed again on every check
+        assert CsvSnapshotSource.is_current()
+
+    def test_invalid_file_without_a_snapshot_is_an_error(self, search, csv_file):
+        csv_file.write_text(HEADER + "Acme;USA;Tech;2000;twenty;1;1;Public;1-10;Jane Doe;NY\n", encoding="utf-8")
+        response = search({}, 400)
+        assert "lines: 2" in json.dumps(response.json())
+
+    def test_changes_in_the_db_are_ignored(self, csv_file):
+        snapshot = SnapshotStore.get()
+        SnapshotStore.mark_changed(1)
+        assert SnapshotStore.get() is snapshot
@@ -0,0 +1,44 @@
+import io
+import pytest
+from django.core.management import call_command
+from benchmarks.data_generator import CompanyDataGenerator, CSV_HEADERS
+from api.csv_parser import ParseFile, COMPANY_INFORMATION_DATA_MAPPING
+from api.models import Company
+
+
+class TestCompanyDataGenerator:
+    """Tests for the seeded synthetic data generator of the benchmark suite."""
+
+    def test_headers_match_the_import_mapping(self):
+        assert CSV_HEADERS == list(COMPANY_INFORMATION_DATA_MAPPING.keys())
+
+    def test_same_seed_same_rows(self):
+        first = list(CompanyDataGenerator(seed=7).rows(200))
+        second = list(CompanyDataGenerator(seed=7).rows(200))
+        assert first == second
+
+    def test_different_seed_different_rows(self):
+        assert list(CompanyDataGenerator(seed=1).rows(50)) != list(CompanyDataGenerator(seed=2).rows(50))
+
+    def test_null_rate_empties_numeric_columns(self):
+        rows = list(CompanyDataGenerator(seed=3, null_rate=1).rows(20))
+        assert all(row['Revenue'] is None and row['Net Income'] is None for row in rows)
+
+    def test_categorical_columns_are_skewed(self):
+        rows = list(CompanyDataGenerator(seed=5).rows(5000))
+        industries = [row['Industry'] for row in rows]
+        assert industries.count('Software') > 3 * industries.count('Hospitality')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_generated_file_can_be_imported(self, tmp_path):
+        file_path = CompanyDataGenerator(seed=11, null_rate=0).write_csv(str(tmp_path / "generated.csv"), 25)
+        ParseFile.read_csv_file_and_create_records(file_path, COMPANY_INFORMATION_DATA_MAPPING)
+        assert Company.objects.count() == 25
+
+    @pytest.mark.django_db(transaction=True)
+    def test_default_output_passes_the_import_command(self, tmp_path):
+        file_path = CompanyDataGenerator().write_csv(str(tmp_path / "generated.csv"), 500)
+        out = io.StringIO()
+        call_command("import_companies", "--path", file_path, stdout=out)
+        assert "Imported 500 rows" in out.getvalue()
+        assert Company.objects.count() == 500
@@ -0,0 +1,64 @@
+import gzip
+import json
+import pytest
+from api.csv_parser import ParseFile, COMPANY_INFORMATION_DATA_MAPPING
+from api.export import SearchExport
+from api.models import Company
+from api.snapshot import SnapshotStore
+
+
+def content(response):
+    return b"".join(response.streaming_content)
+
+
+class TestSearchExport:
+    """Tests for the streaming NDJSON / CSV export."""
+
+    def test_ndjson_matches_the_search_result(self, export, search, companies):
+        body = {"search input": "industry:Tech", "sort_by": "revenue", "sort order": "desc"}
+        response = export(body)
+        assert response["Content-Type"] == "application/x-ndjson"
+
+        exported = [json.loads(line) for line in content(response).decode().splitlines()]
+        searched = search(body).json()
+        assert exported == searched
+        assert [row["name"] for row in exported] == ["Acme", "Gamma"]
+
+    def test_unsorted_export_keeps_the_filter_semantics(self, export, search, companies):
+        body = {"search input": "industry:Finance OR industry:Tech"}
+        exported = [json.loads(line) for line in content(export(body)).decode().splitlines()]
+        searched = search(body).json()
+        assert exported == searched
+
+    @pytest.mark.django_db(transaction=True)
+    def test_csv_uses_the_import_format(self, export, companies, tmp_path):
+        response = export({"format": "csv", "sort_by": "name"})
+        assert response["Content-Disposition"] == 'attachment; filename="companies.csv"'
+
+        lines = content(response).decode().splitlines()
+        assert lines[0] == ";".join(COMPANY_INFORMATION_DATA_MAPPING)
+        assert lines[1] == "Acme;USA;Tech;2000;2024;1000;100;Private;50-100;Jane Doe;NY"
+
+        # The export can be imported again
+        file_path = tmp_path / "export.csv"
+        file_path.write_text("\n".join(lines))
+        ParseFile.read_csv_file_and_create_records(file_path, COMPANY_INFORMATION_DATA_MAPPING)
+        assert sorted(Company.objects.values_list("name", flat=True)) == ["Acme", "Beta", "Gamma"]
+
+    def test_empty_csv_has_the_header_only(self, export, companies):
+        lines = content(export({"format": "csv", "search input": "name:nobody"})).decode().splitlines()
+        assert lines == [";".join(COMPANY_INFORMATION_DATA_MAPPING)]
+
+    def test_gzip(self, export, companies):
+        response = export({"gzip": True})
+        assert response["Content-Encoding"] == "gzip"
+        assert len(gzip.decompress(content(response)).decode().splitlines()) == 3
+
+    def test_rows_are_encoded_in_chunks(self, companies, monkeypatch):
+        monkeypatch.setattr(SearchExport, "CHUNK_SIZE", 2)
+        chunks = list(SearchExport.iter_ndjson(SnapshotStore.get().rows))
+        assert [chunk.count("\n") for chunk in chunks] == [2, 1]
+
+    def test_unknown_format(self, export, companies):
+        response = export({"format": "xml"}, 400)
+        assert "Unsupported export format" in response.json()["Error"]
@@ -0,0 +1,73 @@
+import pytest
+from django.http import JsonResponse
+from api.fragments import EncodedRows, RowFragments, render
+from api.handle_response import HandleResponseUtils
+from api.models import Company
+from api.snapshot import SnapshotStore
+
+
+@pytest.fixture(autouse=True)
+def preencoded_rows(settings):
+    settings.SEARCH_PREENCODED_ROWS = True
+
+
+@pytest.fixture
+def companies(create_company):
+    for name, ceo_name, financials in (
+        ("Acme", "Hans Müller", [(2023, "1234.56", "-0.50"), (2024, 1500, 100)]),
+        ("Beta", "Jane \"JD\" Doe", [(2024, 900, 10)]),
+        ("Gamma", "José Ruiz", []),
+    ):
+        create_company(name, financials=financials, ceo_name=ceo_name)
+
+
+class TestRowFragments:
+    """Tests for the responses joined from the pre-encoded row fragments."""
+
+    @pytest.mark.parametrize("body", [
+        {},
+        {"sort_by": "revenue", "sort order": "desc"},
+        {"latest year only": True, "sort_by": "name"},
+        {"search input": "name:nobody"},
+    ])
+    def test_output_is_identical_to_json_response(self, search, companies, body):
+        response = search(body)
+        assert response["Content-Type"] == "application/json"
+        assert response.content == JsonResponse(response.json(), safe=False).content
+
+    def test_page_envelope_is_identical_to_json_response(self, search, companies):
+        response = search({"sort_by": "name", "page size": 2})
+        assert response.content == JsonResponse(response.json()).content
+
+    def test_rows_come_from_the_snapshot_fragments(self, companies):
+        snapshot = SnapshotStore.get()
+        assert len(snapshot.fragments.encoded) == len(snapshot.rows) + len(snapshot.latest_rows)
+
+        rows = EncodedRows(snapshot.rows, snapshot.fragments)
+        expected = JsonResponse(list(rows), safe=False).content
+        assert HandleResponseUtils.handle_response(rows, 200).content == expected
+        assert render({"results": rows[:1], "next_cursor": None}) == JsonResponse(
+            {"results": list(rows[:1]), "next_cursor": None}
+        ).content
+
+    def test_fragments_follow_the_changes(self, search, companies, django_capture_on_commit_callbacks):
+        search({})
+        with django_capture_on_commit_callbacks(execute=True):
+            company = Company.objects.get(name="Beta")
+            company.name = "Betamax"
+            company.save()
+            Company.objects.get(name="Gamma").delete()
+
+        snapshot = SnapshotStore.get()
+        assert len(snapshot.fragments.encoded) == len(snapshot.rows) + len(snapshot.latest_rows)
+        response = search({"sort_by": "name"})
+        assert [row["name"] for row in response.json()] == ["Acme", "Acme", "Betamax"]
+        assert response.content == JsonResponse(response.json(), safe=False).content
+
+    def test_disabled_fragments_give_the_same_output(self, search, companies, settings):
+        enabled = search({"sort_by": "name"}).content
+        settings.SEARCH_PREENCODED_ROWS = False
+        SnapshotStore.invalidate()
+        assert SnapshotStore.get().fragments is None
+        assert search({"sort_by": "name"}).content == enabled
+        assert not RowFragments.enabled()
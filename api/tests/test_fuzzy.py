@@ -0,0 +1,106 @@
+import random
+import pytest
+from api.fuzzy import FuzzyIndex, edit_distance
+from api.metrics import StageTimer
+from api.models import Company
+from api.search_sort_filter_v3 import ManualSQLQueryEngine
+from api.snapshot import SnapshotStore
+
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+@pytest.fixture
+def companies(create_company):
+    for name, ceo_name, headquarters, industry in (
+        ("TechNova", "Jane Doe", "San Francisco, CA", "Software"),
+        ("EcoGen", "Hans Müller", "Berlin, Germany", "Energy"),
+        ("TechNovum", "John Smith", "Austin, TX", "Software"),
+        ("MediCore", "Jane Roe", "Boston, MA", "Healthcare"),
+    ):
+        create_company(
+            name, industry, financials=[(2023, 1000, 100), (2024, 1000, 100)],
+            ceo_name=ceo_name, headquarters=headquarters,
+        )
+
+
+def names(search, query, **body):
+    body["search input"] = query
+    return sorted({row["name"] for row in search(body).json()})
+
+
+class TestFuzzyIndex:
+    """Tests for the edit distance and the deletion index."""
+
+    def test_edit_distance_is_bounded(self):
+        assert edit_distance("technova", "technova", 2) == 0
+        assert edit_distance("technova", "tecnova", 2) == 1
+        assert edit_distance("technova", "tehcnova", 2) == 2
+        assert edit_distance("technova", "ecogen", 2) == 3
+
+    def test_lookup_matches_a_full_comparison(self):
+        rng = random.Random(7)
+        words = list({"".join(rng.choice("abc") for _ in range(rng.randint(1, 12))) for _ in range(1000)})
+        index = FuzzyIndex.build("name", {i: {"name": word} for i, word in enumerate(words)})
+        for _ in range(100):
+            query = "".join(rng.choice("abc") for _ in range(rng.randint(1, 12)))
+            for distance in (0, 1, 2):
+                expected = {word for word in words if levenshtein(query, word) <= distance}
+                assert index.lookup(query, distance) == expected
+
+    def test_patched_index_leaves_the_old_version_alone(self):
+        index = FuzzyIndex.build("name", {1: {"name": "TechNova"}, 2: {"name": "EcoGen"}})
+        patched = index.patched({1: ({"name": "TechNova"}, {"name": "MediCore"}), 3: (None, {"name": "EcoGen"})})
+        assert index.lookup("technov", 1) == {"technova"}
+        assert patched.lookup("technov", 1) == set()
+        assert patched.companies(patched.lookup("medicor", 1)) == {1}
+        assert patched.companies({"ecogen"}) == {2, 3}
+
+
+@pytest.mark.django_db
+class TestFuzzySearch:
+    """Tests for the "%" search operator."""
+
+    def test_fuzzy_name(self, search, companies):
+        assert names(search, "name%tecnova~1") == ["TechNova"]
+        assert names(search, "name%technovm~1") == ["TechNova", "TechNovum"]
+
+    def test_default_distance_is_one(self, search, companies):
+        assert names(search, "ceo_name%jane do") == ["TechNova"]
+
+    def test_combines_with_other_clauses(self, search, companies):
+        assert names(search, "name%tecnovm~2 AND financial_year=2024 AND headquarters%austn, tx") == ["TechNovum"]
+
+    def test_latest_year_only(self, search, companies):
+        response = search({"search input": "name%ecogem", "latest year only": True})
+        assert [(row["name"], row["financial_year"]) for row in response.json()] == [("EcoGen", 2024)]
+
+    def test_not_indexed_field_is_compared_row_by_row(self, search, companies):
+        assert names(search, "industry%softwar") == ["TechNova", "TechNovum"]
+
+    def test_only_the_candidates_are_scanned(self, companies):
+        snapshot = SnapshotStore.get()
+        clauses = ManualSQLQueryEngine._parse_query("name%tecnova~1")
+        data = ManualSQLQueryEngine._select_data(snapshot, clauses)
+        timer = StageTimer()
+        assert [row["name"] for row in ManualSQLQueryEngine.filter_data(data, clauses, timer)] == ["TechNova"] * 2
+        assert timer.rows_scanned == 2
+
+    def test_index_follows_the_changes(self, search, companies, django_capture_on_commit_callbacks):
+        assert names(search, "name%medicor") == ["MediCore"]
+        with django_capture_on_commit_callbacks(execute=True):
+            Company.objects.filter(name="MediCore").update(name="MediCare")
+            Company.objects.get(name="MediCare").save()
+        assert (FuzzyIndex, "name") in SnapshotStore.get().indexes
+        assert names(search, "name%medicor") == []
+        assert names(search, "name%medicar") == ["MediCare"]
+
+    def test_distance_above_two_is_rejected(self, search, companies):
+        search({"search input": "name%tecnova~3"}, 400)
@@ -0,0 +1,85 @@
+import json
+import pytest
+from api.middleware import RequestRecorderMiddleware
+from benchmarks.load_test import LoadTest, load_workload, percentile, query_shape
+
+
+class TestWorkload:
+    """Tests for reading and grouping the replayed requests."""
+
+    def test_reads_bodies_and_recorded_entries(self, tmp_path):
+        workload = tmp_path / "workload.jsonl"
+        workload.write_text(
+            '{"search input": "industry:Tech"}\n'
+            '\n'
+            '{"path": "/api/companies/export", "body": {"format": "csv"}, "status": 200}\n',
+            encoding="utf-8",
+        )
+        assert load_workload(str(workload)) == [
+            ("/api/companies", {"search input": "industry:Tech"}),
+            ("/api/companies/export", {"format": "csv"}),
+        ]
+
+    def test_rejects_a_broken_line(self, tmp_path):
+        workload = tmp_path / "workload.jsonl"
+        workload.write_text('{"search input": "industry:Tech"}\n[1, 2]\n', encoding="utf-8")
+        with pytest.raises(ValueError, match=":2 "):
+            load_workload(str(workload))
+
+    def test_shape_drops_the_values(self):
+        first = query_shape("/api/companies", {"search input": "industry:Tech and revenue>5", "sort_by": "name"})
+        second = query_shape("/api/companies", {"search input": "industry:Finance AND revenue>99", "sort_by": "name"})
+        assert first == second == "industry:? AND revenue>? | sort name asc (mergesort)"
+        assert query_shape("/api/companies", {"page size": 10}) == "<all> | page"
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert (percentile(values, 50), percentile(values, 99), percentile(values, 100)) == (50, 99, 100)
+        assert percentile([], 99) == 0.0
+
+
+class TestRequestRecorder:
+    """Tests for the middleware that records the workload."""
+
+    @pytest.mark.django_db
+    def test_recorded_requests_replay_as_a_workload(self, client, search, settings, tmp_path):
+        settings.REQUEST_RECORDER_PATH = str(tmp_path / "recorded.jsonl")
+        settings.MIDDLEWARE = [*settings.MIDDLEWARE, "api.middleware.RequestRecorderMiddleware"]
+        bodies = [{"search input": "industry:Tech"}, {"sort_by": "name", "page size": 1}]
+        for body in bodies:
+            search(body)
+        client.get("/metrics")
+        RequestRecorderMiddleware.stop()
+
+        lines = [json.loads(line) for line in (tmp_path / "recorded.jsonl").read_text(encoding="utf-8").splitlines()]
+        assert [line["status"] for line in lines] == [200, 200]
+        assert load_workload(settings.REQUEST_RECORDER_PATH) == [("/api/companies", body) for body in bodies]
+
+    @pytest.mark.django_db
+    def test_disabled_by_default(self, search, settings):
+        assert settings.REQUEST_RECORDER_PATH == ""
+        assert "api.middleware.RequestRecorderMiddleware" not in settings.MIDDLEWARE
+        search({})
+        assert not RequestRecorderMiddleware._log.started()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLoadTest:
+    """Tests for replaying a workload against a live server."""
+
+    def test_replay_reports_every_request(self, live_server, companies):
+        workload = [
+            ("/api/companies", {"search input": "industry:Tech"}),
+            ("/api/companies", {"sort_by": "revenue", "sort order": "desc"}),
+            ("/api/companies", {"search input": "name%tecnova~3"}),
+        ]
+        load_test = LoadTest(live_server.url, workload, concurrency=3, requests=9)
+        results = load_test.run()
+        report = LoadTest.report(results, elapsed=1.0)
+
+        assert report["requests"] == 9
+        assert report["statuses"] == {"200": 6, "400": 3}
+        assert report["error_rate"] == pytest.approx(1 / 3, abs=1e-4)
+        assert report["shapes"]["name%?"]["errors"] == 3
+        assert report["shapes"]["industry:?"]["requests"] == 3
+        assert report["latency"]["p99_ms"] >= report["latency"]["p50_ms"] > 0
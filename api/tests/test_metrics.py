@@ -0,0 +1,78 @@
+import pytest
+from api.metrics import SearchMetrics, StageTimer, NULL_TIMER
+
+
+class TestStageTimer:
+    """Tests for the per-request lap timer."""
+
+    def test_marks_accumulate_per_stage(self):
+        timer = StageTimer()
+        timer.mark("filter")
+        timer.mark("filter")
+        assert list(timer.stages) == ["filter"]
+        assert timer.total_ns >= timer.stages["filter"]
+
+    def test_server_timing_lists_stages_and_total(self):
+        timer = StageTimer()
+        timer.mark("cache")
+        timer.mark("filter")
+        header = timer.server_timing()
+        assert header.startswith("cache;dur=")
+        assert ", filter;dur=" in header
+        assert ", total;dur=" in header
+
+    def test_null_timer_ignores_everything(self):
+        NULL_TIMER.mark("cache")
+        NULL_TIMER.rows_scanned += 10
+        assert NULL_TIMER.rows_scanned == 0
+        assert NULL_TIMER.stages == {}
+
+
+class TestRecord:
+    """Tests for queuing the finished timers."""
+
+    def test_timers_are_queued_under_the_lock(self, monkeypatch):
+        # A flush swaps the queue, an append outside the lock could land in the swapped out list
+        class LockedQueue(list):
+            def append(self, timer):
+                assert SearchMetrics._lock.locked()
+                super().append(timer)
+
+        monkeypatch.setattr(SearchMetrics, "FLUSH_THRESHOLD", 2)
+        monkeypatch.setattr(SearchMetrics, "_pending", LockedQueue())
+        SearchMetrics.record(StageTimer())
+        SearchMetrics.record(StageTimer())
+        assert SearchMetrics._pending == []
+        assert "search_requests_total 2" in SearchMetrics.render()
+
+
+@pytest.mark.django_db
+class TestSearchMetrics:
+    """Tests for the Server-Timing header and the /metrics endpoint."""
+
+    def test_disabled_by_default(self, client, search, companies, settings):
+        settings.SEARCH_METRICS_ENABLED = False
+        response = search({"search input": "industry:Tech"})
+        assert "Server-Timing" not in response
+        assert "search_requests_total 0" in client.get("/metrics").content.decode()
+
+    def test_server_timing_header(self, search, companies, settings):
+        settings.SEARCH_METRICS_ENABLED = True
+        response = search({"search input": "industry:Tech", "sort_by": "revenue"})
+        stages = [entry.split(";")[0] for entry in response["Server-Timing"].split(", ")]
+        assert stages == ["request", "cache", "parse", "admission", "filter", "sort", "encode", "total"]
+
+    def test_metrics_endpoint_publishes_histograms_and_counters(self, client, search, companies, settings):
+        settings.SEARCH_METRICS_ENABLED = True
+        search({"search input": "industry:Tech"})
+        search({"search input": "industry:Tech"})
+
+        response = client.get("/metrics")
+        text = response.content.decode()
+        assert response["Content-Type"].startswith("text/plain")
+        assert 'search_stage_duration_seconds_count{stage="filter"} 2' in text
+        assert 'search_stage_duration_seconds_bucket{stage="total",le="+Inf"} 2' in text
+        assert "search_requests_total 2" in text
+        assert "search_rows_scanned_total 6" in text
+        assert "search_rows_returned_total 4" in text
+        assert "search_cache_hits_total 1" in text
@@ -0,0 +1,105 @@
+import pytest
+from api.models import Company, FinancialData
+from api.pagination import KeysetPagination
+from api.snapshot import SnapshotStore
+
+
+@pytest.fixture
+def companies(create_company):
+    # Acme and Delta share a revenue, Beta has two financial years
+    for name, financials in (
+        ("Acme", [(2024, 500, 10)]),
+        ("Beta", [(2023, 700, 10), (2024, 900, 10)]),
+        ("Gamma", [(2024, 100, 10)]),
+        ("Delta", [(2024, 500, 10)]),
+    ):
+        create_company(name, financials=financials)
+
+
+def all_pages(search, body):
+    pages, cursor = [], None
+    while True:
+        page = search(dict(body, cursor=cursor) if cursor else body).json()
+        pages.append(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+class TestKeysetPagination:
+    """Tests for the cursor pagination of the search results."""
+
+    def test_pages_cover_the_sorted_result(self, search, companies):
+        body = {"sort_by": "revenue", "sort order": "desc", "page size": 2}
+        pages = all_pages(search, body)
+        assert [len(page["results"]) for page in pages] == [2, 2, 1]
+
+        rows = [row for page in pages for row in page["results"]]
+        assert [(row["name"], row["revenue"]) for row in rows] == [
+            ("Beta", 900), ("Beta", 700), ("Acme", 500), ("Delta", 500), ("Gamma", 100),
+        ]
+
+    @pytest.mark.parametrize("algorithm", ["mergesort", "quicksort", "natural_mergesort", "auto"])
+    def test_ties_are_broken_by_id(self, search, companies, algorithm):
+        body = {"sort_by": "revenue", "page size": 1, "algorithm": algorithm, "search input": "revenue:500"}
+        names = [page["results"][0]["name"] for page in all_pages(search, body)]
+        assert names == ["Acme", "Delta"]
+
+    def test_ties_are_broken_by_id_after_a_patch(self, search, companies, django_capture_on_commit_callbacks):
+        SnapshotStore.get()
+        with django_capture_on_commit_callbacks(execute=True):
+            FinancialData.objects.create(company=Company.objects.get(name="Acme"), year=2022, revenue=500, net_income=10)
+        # The new row of Acme is appended behind Delta
+        assert not SnapshotStore.get().ordered
+
+        body = {"sort_by": "revenue", "page size": 1, "search input": "revenue:500"}
+        rows = [page["results"][0] for page in all_pages(search, body)]
+        assert [(row["name"], row["financial_year"]) for row in rows] == [("Acme", 2022), ("Acme", 2024), ("Delta", 2024)]
+
+    def test_auto_reports_the_chosen_algorithm(self, search, companies):
+        body = {"sort_by": "revenue", "page size": 2, "algorithm": "auto"}
+        response = search(body)
+        assert response["X-Sort-Algorithm"] == response.json()["algorithm"] == "natural_mergesort"
+
+        # The next page reuses the cached order and its algorithm
+        next_page = search(dict(body, cursor=response.json()["next_cursor"])).json()
+        assert next_page["algorithm"] == "natural_mergesort"
+        assert search({"page size": 2}).json()["algorithm"] is None
+
+    def test_without_sort_rows_are_in_id_order(self, search, companies):
+        rows = search({"page size": 10, "latest year only": True}).json()["results"]
+        assert [row["name"] for row in rows] == ["Acme", "Beta", "Gamma", "Delta"]
+
+    def test_pages_stay_on_their_snapshot_version(self, search, companies, django_capture_on_commit_callbacks):
+        body = {"sort_by": "name", "page size": 2}
+        first = search(body).json()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Company.objects.filter(name="Gamma").get().delete()
+        assert SnapshotStore.get().version != first["snapshot_version"]
+
+        second = search(dict(body, cursor=first["next_cursor"])).json()
+        assert second["snapshot_version"] == first["snapshot_version"]
+        assert [row["name"] for row in second["results"]] == ["Beta", "Delta"]
+
+    def test_expired_order_continues_in_the_current_snapshot(self, search, companies):
+        body = {"sort_by": "name", "page size": 2}
+        first = search(body).json()
+
+        KeysetPagination.clear()
+        SnapshotStore.invalidate()
+        second = search(dict(body, cursor=first["next_cursor"])).json()
+        assert second["snapshot_version"] != first["snapshot_version"]
+        assert [row["name"] for row in second["results"]] == ["Beta", "Delta"]
+
+    def test_cursor_of_another_search_is_rejected(self, search, companies):
+        first = search({"sort_by": "name", "page size": 1}).json()
+        response = search({"sort_by": "revenue", "cursor": first["next_cursor"]}, 400).json()
+        assert response["Error"] == "The cursor belongs to a different search"
+
+    @pytest.mark.parametrize("body", [{"cursor": "not-a-cursor"}, {"page size": 0}, {"page size": "ten"}])
+    def test_invalid_parameters(self, search, companies, body):
+        search(body, 400)
+
+    def test_without_page_parameters_the_full_list_is_returned(self, search, companies):
+        assert isinstance(search({"sort_by": "name"}).json(), list)
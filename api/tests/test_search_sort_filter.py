@@ -0,0 +1,138 @@
+import pytest
+from api.cents import RAW_MONEY, from_cents, money_to_cents, present, to_cents
+from api.search_sort_filter_v3 import ManualSQLQueryEngine
+
+
+@pytest.fixture
+def companies(create_company):
+    create_company("Acme", "Tech", financials=[(2022, 1000, 100), (2023, 1100, 150), (2024, 1210, 200)])
+    create_company("Beta", "Tech", financials=[(2024, 500, -50)])
+    create_company("Gamma", "Finance", financials=[])
+
+
+class TestLatestYearOnly:
+    """Tests for the "latest year only" search mode backed by the snapshot rollup."""
+
+    def test_default_returns_one_row_per_company_and_year(self, search, companies):
+        assert len(search({}).json()) == 5
+
+    def test_latest_only_returns_one_row_per_company(self, search, companies):
+        rows = search({"latest year only": True, "sort_by": "name"}).json()
+        assert [(row["name"], row["financial_year"]) for row in rows] == [
+            ("Acme", 2024), ("Beta", 2024), ("Gamma", None),
+        ]
+
+    def test_rollup_aggregates(self, search, companies):
+        [acme] = search({"latest year only": True, "search input": "name:acme"}).json()
+        assert acme["revenue"] == 1210
+        assert acme["years_reported"] == 3
+        assert acme["first_financial_year"] == 2022
+        assert acme["revenue_cagr"] == pytest.approx(0.1)
+        assert acme["average_net_income"] == 150
+
+    def test_filters_apply_to_rollup_fields(self, search, companies):
+        rows = search({"latest year only": "true", "search input": "revenue_cagr>0.05"}).json()
+        assert [row["name"] for row in rows] == ["Acme"]
+
+    def test_company_without_financials_has_empty_rollup(self, search, companies):
+        [gamma] = search({"latest year only": True, "search input": "name:gamma"}).json()
+        assert gamma["years_reported"] == 0
+        assert gamma["revenue_cagr"] is None
+
+
+def float_match(value, op, literal):
+    """The comparison `_match` made before the money columns were kept in cents."""
+    try:
+        match op:
+            case ":" | "=":
+                return str(value) == str(literal)
+            case ">":
+                return float(value) > float(literal)
+            case "<":
+                return float(value) < float(literal)
+            case ">=":
+                return float(value) >= float(literal)
+            case "<=":
+                return float(value) <= float(literal)
+    except ValueError:
+        return False
+
+
+class TestSortAlgorithm:
+    """Tests for the sorting algorithm reported with the search result."""
+
+    @pytest.mark.parametrize("algorithm, expected", [
+        ("auto", "natural_mergesort"),
+        ("mergesort", "mergesort"),
+        ("natural_mergesort", "natural_mergesort"),
+        ("unknown", "quicksort"),
+    ])
+    def test_header_names_the_algorithm(self, search, companies, algorithm, expected):
+        body = {"sort_by": "name", "algorithm": algorithm}
+        response = search(body)
+        assert response["X-Sort-Algorithm"] == expected
+        assert [row["name"] for row in response.json()] == ["Acme", "Acme", "Acme", "Beta", "Gamma"]
+
+    @pytest.mark.parametrize("algorithm", ["mergesort", "natural_mergesort", "quicksort", "auto"])
+    def test_descending_ties_are_in_company_order(self, search, create_company, algorithm):
+        tied = [create_company(name).pk for name in ("Delta", "Alpha", "Charlie")]
+        top = create_company("Bravo", financials=[(2024, 2000, 100)]).pk
+        rows = search({"sort_by": "revenue", "sort order": "desc", "algorithm": algorithm}).json()
+        assert [row["id"] for row in rows] == [top, *tied]
+
+    def test_no_header_without_sorting(self, search, companies):
+        response = search({})
+        assert "X-Sort-Algorithm" not in response
+
+
+class TestMoneyInCents:
+    """Tests for the integer cents representation of revenue and net income."""
+
+    @pytest.mark.parametrize("value", [0, 1000, -50, 1234.56, -0.07, 99999999999.99, None])
+    def test_round_trip_keeps_the_value_and_type(self, value):
+        assert repr(from_cents(to_cents(value))) == repr(value)
+        assert present({"revenue": to_cents(value), "name": "Acme"}) == {"revenue": value, "name": "Acme"}
+
+    def test_stored_float_noise_is_kept_for_the_output(self):
+        row = money_to_cents({"revenue": 51470929.53000001, "net_income": 1234.56})
+        assert row == {"revenue": 5147092953, "net_income": 123456, RAW_MONEY: {"revenue": 51470929.53000001}}
+        assert present(row) == {"revenue": 51470929.53000001, "net_income": 1234.56}
+
+    def test_filters_match_the_float_comparison(self):
+        values = [0, 1000, 1001, -50, 1234.56, 1234.5, 0.07, -0.07, 999.99]
+        literals = ["1000", "1000.00", "1000.005", "1234.56", "1234.5", "1234.50", "0.07", "-0.07", "-50",
+                    "999.999", "1e3", "abc", "inf", "nan", "-0"]
+        for op in (":", "=", ">", "<", ">=", "<="):
+            for literal in literals:
+                [clause] = ManualSQLQueryEngine._parse_query(f"revenue{op}{literal}")
+                [f] = clause["filters"]
+                assert f["val"] == literal and "cents" in f
+                for value in values:
+                    row = {"revenue": to_cents(value)}
+                    assert ManualSQLQueryEngine._match(row, f) == float_match(value, op, literal), (value, op, literal)
+
+    def test_contains_compares_the_output_text(self):
+        [clause] = ManualSQLQueryEngine._parse_query("revenue~34.5")
+        assert ManualSQLQueryEngine._match({"revenue": to_cents(1234.56)}, clause["filters"][0])
+
+    @pytest.mark.django_db
+    def test_json_output_is_unchanged(self, search, create_company):
+        create_company("Acme", "Tech", financials=[(2023, "1234.56", "-0.50"), (2024, 1000, 100)])
+        response = search({"sort_by": "revenue", "search input": "revenue>=1000"})
+        assert [(row["revenue"], row["net_income"]) for row in response.json()] == [(1000, 100), (1234.56, -0.5)]
+        assert b'"revenue": 1000,' in response.content
+        assert b'"net_income": -0.5' in response.content
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("preencoded", [False, True])
+    def test_json_output_keeps_the_stored_float(self, search, create_company, settings, preencoded):
+        settings.SEARCH_PREENCODED_ROWS = preencoded
+        create_company("Acme", "Tech", financials=[(2024, 51470929.53000001, 100)])
+        create_company("Beta", "Tech", financials=[(2024, 51470929.54, 100)])
+        rows = search({"sort_by": "revenue", "sort order": "desc", "search input": "revenue<=51470929.53"}).json()
+        assert [(row["name"], row["revenue"]) for row in rows] == [("Acme", 51470929.53000001)]
+
+        response = search({"search input": "revenue>51470929.5", "latest year only": True, "sort_by": "revenue"})
+        assert b'"revenue": 51470929.53000001,' in response.content
+        assert b'"revenue": 51470929.54,' in response.content
+        assert RAW_MONEY.encode() not in response.content
@@ -0,0 +1,64 @@
+import json
+import os
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from api.slow_query_log import SlowQueryLog
+
+
+@pytest.fixture
+def slow_log(settings, tmp_path):
+    settings.SLOW_QUERY_LOG_PATH = str(tmp_path / "slow.jsonl")
+    settings.SLOW_QUERY_THRESHOLD_MS = 0.000001
+    return settings.SLOW_QUERY_LOG_PATH
+
+
+def read_log(path):
+    SlowQueryLog.stop()  # flushes the background writer
+    with open(path, encoding="utf-8") as log_file:
+        return [json.loads(line) for line in log_file]
+
+
+@pytest.mark.django_db
+class TestSlowQueryLog:
+    """Tests for the asynchronous slow query log and its summary command."""
+
+    def test_entry_records_query_details(self, search, companies, slow_log):
+        search({"search input": "industry:Tech", "sort_by": "name", "algorithm": "quicksort"})
+
+        [entry] = read_log(slow_log)
+        assert entry["search_input"] == "industry:Tech"
+        assert entry["clauses"] == [{"filters": [{"field": "industry", "op": ":", "val": "Tech"}], "logic": None}]
+        assert entry["algorithm"] == "quicksort"
+        assert entry["rows_scanned"] == 3
+        assert entry["rows_matched"] == 2
+        assert entry["status"] == 200
+        assert set(entry["stages_ms"]) == {"request", "cache", "parse", "admission", "filter", "sort", "encode"}
+
+    def test_derived_filter_keys_are_not_logged(self, search, companies, slow_log):
+        search({"search input": "revenue>=500 AND name%acne~1"})
+
+        [entry] = read_log(slow_log)
+        assert entry["clauses"] == [
+            {"filters": [{"field": "revenue", "op": ">=", "val": "500"}], "logic": "AND"},
+            {"filters": [{"field": "name", "op": "%", "val": "acne"}], "logic": None},
+        ]
+
+    def test_fast_queries_are_not_logged(self, search, companies, slow_log, settings):
+        settings.SLOW_QUERY_THRESHOLD_MS = 60_000
+        search({"search input": "industry:Tech"})
+        SlowQueryLog.stop()
+        assert not os.path.exists(slow_log)
+
+    def test_summary_command_ranks_offenders(self, search, companies, slow_log):
+        search({"search input": "industry:Tech"})
+        search({"search input": "industry:Finance"})
+        search({"search input": "name~ac"})
+        SlowQueryLog.stop()
+
+        output = StringIO()
+        call_command("slow_queries", "--path", slow_log, "--order-by", "count", stdout=output)
+        lines = output.getvalue().splitlines()
+        assert lines[0] == "3 slow queries in 2 groups, top 2:"
+        assert lines[1] == "1. industry:?"
+        assert "count=2" in lines[2]
@@ -0,0 +1,227 @@
+import pytest
+from django.db import connection
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete
+from django.test.utils import CaptureQueriesContext
+from api.models import Company, FinancialData, CompanySearchRow
+from api.autocomplete import AutocompleteIndex
+from api.search_table import SearchTable
+from api.signals import bulk_delete
+from api.snapshot import DataSnapshot, SnapshotStore
+
+
+def make_row(company_id, year=2024, name="Acme"):
+    return {"id": company_id, "name": name, "financial_year": year, "revenue": 1000, "net_income": 100}
+
+
+class TestDataSnapshot:
+    """Tests for patching a snapshot without rebuilding it."""
+
+    def test_patch_replaces_rows_in_place(self):
+        snapshot = DataSnapshot([make_row(1), make_row(2), make_row(3)], version=1, built_at=0)
+        new_row = make_row(2, name="Beta")
+        patched = snapshot.patched({2: [new_row]}, version=2)
+
+        assert patched.rows[1] is new_row
+        assert patched.rows[0] is snapshot.rows[0]
+        assert snapshot.rows[1]["name"] == "Acme"
+        assert patched.version == 2
+
+    def test_patch_appends_new_rows(self):
+        snapshot = DataSnapshot([make_row(1)], version=1, built_at=0)
+        patched = snapshot.patched({1: [make_row(1, 2024), make_row(1, 2023)], 5: [make_row(5)]}, version=2)
+
+        assert [row["id"] for row in patched.rows] == [1, 1, 5]
+        assert patched.positions == {1: [0, 1], 5: [2]}
+
+    def test_patch_removes_rows_and_keeps_positions_consistent(self):
+        rows = [make_row(1), make_row(2), make_row(2, 2023), make_row(3), make_row(4)]
+        snapshot = DataSnapshot(rows, version=1, built_at=0)
+        patched = snapshot.patched({2: [], 1: []}, version=2)
+
+        assert sorted(row["id"] for row in patched.rows) == [3, 4]
+        for company_id, positions in patched.positions.items():
+            assert all(patched.rows[position]["id"] == company_id for position in positions)
+        assert snapshot.positions == {1: [0], 2: [1, 2], 3: [3], 4: [4]}
+
+    def test_patch_tracks_the_tie_order(self):
+        snapshot = DataSnapshot([make_row(1, 2023), make_row(1, 2024), make_row(2), make_row(3)], version=1, built_at=0)
+        assert snapshot.ordered
+
+        # In place updates, deletes of the last rows and new companies keep the order
+        assert snapshot.patched({2: [make_row(2, name="Beta")], 3: [], 4: [make_row(4)]}, version=2).ordered
+        # A company that gets an extra year has it appended behind the other companies
+        assert not snapshot.patched({1: [make_row(1, 2022), make_row(1, 2023), make_row(1, 2024)]}, version=2).ordered
+        # The last row is moved into the hole of a deleted one
+        assert not snapshot.patched({1: [make_row(1, 2023)]}, version=2).ordered
+        assert not DataSnapshot([make_row(2), make_row(1)], version=1, built_at=0).ordered
+
+    def test_patch_recomputes_only_touched_rollups(self):
+        snapshot = DataSnapshot([make_row(1, 2023), make_row(1, 2024), make_row(2)], version=1, built_at=0)
+        patched = snapshot.patched({1: [make_row(1, 2023)]}, version=2)
+
+        assert patched.rollups[1]["financial_year"] == 2023
+        assert patched.rollups[1]["years_reported"] == 1
+        assert patched.rollups[2] is snapshot.rollups[2]
+        assert len(patched.latest_rows) == 2
+
+
+@pytest.mark.django_db
+class TestSnapshotStore:
+    """Tests for the signal driven snapshot updates."""
+
+    @pytest.fixture(autouse=True)
+    def no_full_rebuild(self, monkeypatch):
+        self.rebuilds = 0
+        original = SnapshotStore.rebuild.__func__
+
+        def counting_rebuild(cls, **kwargs):
+            self.rebuilds += 1
+            return original(cls, **kwargs)
+
+        monkeypatch.setattr(SnapshotStore, "rebuild", classmethod(counting_rebuild))
+
+    def test_company_update_is_patched_after_commit(self, create_company, django_capture_on_commit_callbacks):
+        company = create_company("Acme")
+        before = SnapshotStore.get()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            company.name = "Acme Renamed"
+            company.save()
+
+        after = SnapshotStore.get()
+        assert after.version > before.version
+        assert [row["name"] for row in after.rows] == ["Acme Renamed"]
+        assert self.rebuilds == 1
+
+    def test_related_rows_are_patched(self, create_company, django_capture_on_commit_callbacks):
+        company = create_company("Acme")
+        SnapshotStore.get()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            FinancialData.objects.create(company=company, year=2023, revenue=900, net_income=90)
+            company.details.delete()
+
+        rows = SnapshotStore.get().rows
+        assert sorted(row["financial_year"] for row in rows) == [2023, 2024]
+        assert all(row["ceo_name"] is None for row in rows)
+        assert self.rebuilds == 1
+
+    def test_company_delete_removes_rows(self, create_company, django_capture_on_commit_callbacks):
+        acme = create_company("Acme")
+        create_company("Beta")
+        SnapshotStore.get()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            acme.delete()
+
+        assert [row["name"] for row in SnapshotStore.get().rows] == ["Beta"]
+        assert self.rebuilds == 1
+
+    def test_bulk_delete_is_a_fast_delete(self, create_company, django_capture_on_commit_callbacks):
+        create_company("Acme", financials=[(2023, 1000, 100), (2024, 1000, 100)])
+        beta = create_company("Beta")
+        SnapshotStore.get()
+
+        with django_capture_on_commit_callbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            bulk_delete(FinancialData.objects.filter(year=2024))
+            bulk_delete(Company.objects.filter(pk=beta.pk))
+
+        # The related rows are deleted without loading them first
+        assert not [q for q in queries if q["sql"].startswith("SELECT") and "api_companydetails" in q["sql"]]
+        assert [(row["name"], row["financial_year"]) for row in SnapshotStore.get().rows] == [("Acme", 2023)]
+        assert self.rebuilds == 1
+        assert post_delete.has_listeners(Company)
+
+    def test_deletes_during_a_bulk_delete_are_synced(self, create_company, django_capture_on_commit_callbacks, monkeypatch):
+        create_company("Acme")
+        beta = create_company("Beta")
+        SnapshotStore.get()
+        raw_delete = QuerySet._raw_delete
+
+        def delete_beta_meanwhile(queryset, using):
+            if queryset.model is FinancialData:
+                # An ordinary delete that runs while the bulk delete is in progress
+                Company.objects.get(pk=beta.pk).delete()
+            return raw_delete(queryset, using)
+
+        monkeypatch.setattr(QuerySet, "_raw_delete", delete_beta_meanwhile)
+        with django_capture_on_commit_callbacks(execute=True):
+            bulk_delete(FinancialData.objects.filter(company__name="Acme"))
+
+        assert [(row["name"], row["financial_year"]) for row in SnapshotStore.get().rows] == [("Acme", None)]
+        assert list(CompanySearchRow.objects.values_list("name", "financial_year")) == [("Acme", None)]
+
+    def test_rows_are_in_company_and_year_order(self, create_company):
+        acme = create_company("Acme", financials=[(2024, 1000, 100), (2022, 1000, 100)])
+        create_company("Beta")
+        # Rewritten rows go to the end of the table
+        SearchTable.refresh([acme.pk])
+
+        rows = SnapshotStore.get().rows
+        assert [(row["name"], row["financial_year"]) for row in rows] == [("Acme", 2022), ("Acme", 2024), ("Beta", 2024)]
+
+    def test_expired_snapshot_is_rebuilt(self, create_company):
+        create_company("Acme")
+        first = SnapshotStore.get()
+        first.built_at -= SnapshotStore.REBUILD_INTERVAL
+
+        assert SnapshotStore.get().version > first.version
+        assert self.rebuilds == 2
+
+    def test_expired_snapshot_repairs_the_flat_table(self, create_company):
+        acme = create_company("Acme")
+        create_company("Beta")
+        first = SnapshotStore.get()
+
+        # Drift the signals never saw
+        CompanySearchRow.objects.filter(company_id=acme.pk).update(name="Stale")
+        CompanySearchRow.objects.filter(name="Beta").delete()
+        SnapshotStore.invalidate()
+        assert [row["name"] for row in SnapshotStore.get().rows] == ["Stale"]
+
+        SnapshotStore.get().built_at -= SnapshotStore.REBUILD_INTERVAL
+        assert [row["name"] for row in SnapshotStore.get().rows] == ["Acme", "Beta"]
+        assert sorted(CompanySearchRow.objects.values_list("name", flat=True)) == ["Acme", "Beta"]
+        assert first.version < SnapshotStore.get().version
+
+    def test_indexes_are_built_before_the_rebuilt_version_is_served(self, create_company, client, monkeypatch):
+        create_company("Acme")
+        client.get("/api/companies/autocomplete", {"field": "name", "prefix": "ac"})
+        first = SnapshotStore.get()
+        assert (AutocompleteIndex, "name") in first.indexes
+        first.built_at -= SnapshotStore.REBUILD_INTERVAL
+
+        second = SnapshotStore.get()
+        assert second.version > first.version
+        assert second.indexes[(AutocompleteIndex, "name")] is not first.indexes[(AutocompleteIndex, "name")]
+
+        built = []
+        monkeypatch.setattr(AutocompleteIndex, "build", classmethod(lambda cls, *args: built.append(args)))
+        response = client.get("/api/companies/autocomplete", {"field": "name", "prefix": "ac"})
+        assert response.status_code == 200
+        assert built == []
+
+    def test_changes_are_ignored_while_paused(self, create_company, django_capture_on_commit_callbacks):
+        SnapshotStore.get()
+        with SnapshotStore.paused(), django_capture_on_commit_callbacks(execute=True) as callbacks:
+            create_company("Acme")
+            # Bulk writers fill the flat table themselves
+            assert not CompanySearchRow.objects.exists()
+            SearchTable.rebuild()
+        assert callbacks == []
+        assert [row["name"] for row in SnapshotStore.get().rows] == ["Acme"]
+
+    def test_flat_table_follows_the_normalized_tables(self, create_company):
+        company = create_company("Acme")
+        FinancialData.objects.create(company=company, year=2023, revenue=900, net_income=90)
+        company.details.delete()
+        company.name = "Acme Renamed"
+        company.save()
+
+        rows = CompanySearchRow.objects.filter(company_id=company.id)
+        assert sorted(rows.values_list("financial_year", flat=True)) == [2023, 2024]
+        assert {(row.name, row.ceo_name) for row in rows} == {("Acme Renamed", None)}
+
+        company.delete()
+        assert not CompanySearchRow.objects.exists()
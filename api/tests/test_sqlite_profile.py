@@ -0,0 +1,40 @@
+import pytest
+from django.db import connection
+from django.db.utils import ConnectionHandler
+from coolboxtest.sqlite_profile import database_settings, import_profile
+
+
+class TestSQLiteProfile:
+    """Tests for the tuned SQLite connection profile."""
+
+    def test_untuned_settings_are_plain(self, tmp_path):
+        assert database_settings(tmp_path / "plain.sqlite3", tuned=False) == {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': tmp_path / "plain.sqlite3",
+        }
+
+    def test_new_connections_get_the_pragmas(self, tmp_path, django_db_blocker):
+        handler = ConnectionHandler({'default': database_settings(str(tmp_path / "tuned.sqlite3"), tuned=True)})
+        tuned = handler['default']
+        try:
+            with django_db_blocker.unblock(), tuned.cursor() as cursor:
+                pragmas = {}
+                for pragma in ("journal_mode", "synchronous", "temp_store", "cache_size"):
+                    cursor.execute(f"PRAGMA {pragma}")
+                    pragmas[pragma] = cursor.fetchone()[0]
+        finally:
+            tuned.close()
+
+        assert pragmas == {"journal_mode": "wal", "synchronous": 2, "temp_store": 2, "cache_size": -65536}
+        assert tuned.settings_dict['CONN_MAX_AGE'] == 600
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_profile_relaxes_synchronous(self, settings):
+        def synchronous():
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA synchronous")
+                return cursor.fetchone()[0]
+
+        with import_profile():
+            assert synchronous() == 1
+        assert synchronous() == 2
@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from django.conf import settings
+
+# Only the importer and the benchmarks need these, the web process must not load them
+DEFERRED_MODULES = ("pandas", "numpy", "dateutil")
+
+LOADED = """
+import json, sys
+import {module}
+import api.urls
+print(json.dumps([name for name in {deferred!r} if name in sys.modules]))
+"""
+
+
+def loaded_deferred_modules(module: str) -> list:
+    """Imports the entry point and the url conf in a fresh interpreter, returns the deferred modules it loaded."""
+    output = subprocess.run(
+        [sys.executable, "-c", LOADED.format(module=module, deferred=DEFERRED_MODULES)],
+        cwd=settings.BASE_DIR,
+        env=dict(os.environ, DJANGO_SETTINGS_MODULE="coolboxtest.settings"),
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(output.stdout)
+
+
+class TestStartupImports:
+    """Checks that the web process does not load the modules only the importer needs."""
+
+    def test_importing_the_parser_does_not_load_pandas(self):
+        code = "import django; django.setup(); import api.csv_parser, sys; print('pandas' in sys.modules)"
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE="coolboxtest.settings"),
+            capture_output=True, text=True, check=True,
+        )
+        assert output.stdout.strip() == "False"
+
+    @pytest.mark.parametrize("module", ["coolboxtest.wsgi", "coolboxtest.asgi"])
+    def test_entry_point_does_not_load_the_deferred_modules(self, module):
+        assert loaded_deferred_modules(module) == []
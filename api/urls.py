@@ -1,7 +1,10 @@
 from django.urls import path
-from api.views import SearchView
+from api.views import SearchView, ExportView, AutocompleteView, MetricsView
 
 
 urlpatterns = [
     path('api/companies', SearchView.as_view(), name='search_sort_filter'),
+    path('api/companies/export', ExportView.as_view(), name='search_export'),
+    path('api/companies/autocomplete', AutocompleteView.as_view(), name='autocomplete'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
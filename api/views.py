@@ -1,8 +1,13 @@
+from django.http import HttpResponse
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.permissions import AllowAny
+from .autocomplete import Autocomplete
 from .handle_response import HandleResponseUtils
 from .handle_exception_response import CustomExceptionHandler
+from .export import SearchExport
+from .metrics import SearchMetrics
+from .pagination import KeysetPagination
 from .search_sort_filter_v3 import ManualSQLQueryEngine
 
 
@@ -10,9 +15,52 @@ class SearchView(APIView):
     """Search function"""
     permission_classes = (AllowAny,)
     def get(self, request):
+        timer = SearchMetrics.timer()
         try:
-            message = ManualSQLQueryEngine.search_data(request)
+            if KeysetPagination.requested(request):
+                message = KeysetPagination.paginate(request, timer)
+            else:
+                message = ManualSQLQueryEngine.search_data(request, timer)
             status_code = status.HTTP_200_OK
-            return HandleResponseUtils.handle_response(message, status_code)
+            response = HandleResponseUtils.handle_response(message, status_code)
+            algorithm = message.get("algorithm") if isinstance(message, dict) else getattr(message, "algorithm", None)
+            if algorithm:
+                response["X-Sort-Algorithm"] = algorithm
+            timer.mark("encode")
+            return SearchMetrics.finish(timer, response)
+        except Exception as error:
+            timer.mark("error")
+            timer.error = str(error)
+            return SearchMetrics.finish(timer, CustomExceptionHandler.exception_handler(error))
+
+
+class ExportView(APIView):
+    """Streams the whole search result as NDJSON or CSV"""
+    permission_classes = (AllowAny,)
+    def get(self, request):
+        timer = SearchMetrics.timer()
+        try:
+            # The timer is finished when the stream ends
+            return SearchExport.export(request, timer)
+        except Exception as error:
+            timer.mark("error")
+            timer.error = str(error)
+            return SearchMetrics.finish(timer, CustomExceptionHandler.exception_handler(error))
+
+
+class AutocompleteView(APIView):
+    """Prefix autocomplete for the search box"""
+    permission_classes = (AllowAny,)
+    def get(self, request):
+        try:
+            message = Autocomplete.suggest(request)
+            return HandleResponseUtils.handle_response(message, status.HTTP_200_OK)
         except Exception as error:
             return CustomExceptionHandler.exception_handler(error)
+
+
+class MetricsView(APIView):
+    """Search metrics in Prometheus text format"""
+    permission_classes = (AllowAny,)
+    def get(self, request):
+        return HttpResponse(SearchMetrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,186 @@
+import argparse
+import csv
+import os
+import random
+from itertools import accumulate
+from typing import Iterator
+
+
+# Same headers (and order) as COMPANY_INFORMATION_DATA_MAPPING in api/csv_parser.py.
+# Kept as a literal so the generator can run without booting Django.
+CSV_HEADERS = [
+    'Name',
+    'Country',
+    'Industry',
+    'Year of foundation',
+    'Year',
+    'Revenue',
+    'Net Income',
+    'Privacy',
+    'Size',
+    'CEO Name',
+    'Headquarters',
+]
+
+INDUSTRIES = [
+    'Software', 'Finance', 'Healthcare', 'Manufacturing', 'Retail', 'Education',
+    'Renewable Energy', 'Agriculture', 'Telecommunications', 'Logistics',
+    'Biotechnology', 'Real Estate', 'Media', 'Automotive', 'Hospitality',
+]
+
+COUNTRIES = [
+    'USA', 'Germany', 'UK', 'China', 'India', 'Japan', 'France', 'Canada',
+    'Brazil', 'Australia', 'Netherlands', 'Sweden', 'South Korea', 'Spain',
+    'Italy', 'Mexico', 'Switzerland', 'Singapore', 'Bulgaria', 'Poland',
+]
+
+CITIES = [
+    'San Francisco', 'New York', 'Berlin', 'London', 'Beijing', 'Bangalore',
+    'Tokyo', 'Paris', 'Toronto', 'Sao Paulo', 'Sydney', 'Amsterdam',
+    'Stockholm', 'Seoul', 'Madrid', 'Milan', 'Mexico City', 'Zurich',
+    'Singapore', 'Sofia', 'Warsaw', 'Austin', 'Munich', 'Osaka',
+]
+
+NAME_PREFIXES = [
+    'Tech', 'Eco', 'Medi', 'Agro', 'Fin', 'Quantum', 'Blue', 'Green', 'Nova',
+    'Data', 'Bright', 'Cyber', 'Solar', 'Urban', 'Smart', 'Prime', 'Alpha',
+    'Vita', 'Terra', 'Aero', 'Hydro', 'Neo', 'Omni', 'Core', 'Stellar',
+]
+
+NAME_SUFFIXES = [
+    'Nova', 'Gen', 'Core', 'Link', 'Works', 'Soft', 'Labs', 'Logic', 'Wave',
+    'Sphere', 'Point', 'Systems', 'Dynamics', 'Net', 'Hub', 'Grid', 'Path',
+]
+
+FIRST_NAMES = [
+    'Jane', 'John', 'Hans', 'Yuki', 'Raj', 'Sofia', 'Li', 'Maria', 'Ahmed',
+    'Olga', 'Pierre', 'Carlos', 'Emma', 'Ivan', 'Aiko', 'Lucas', 'Priya',
+]
+
+LAST_NAMES = [
+    'Doe', 'Smith', 'Müller', 'Tanaka', 'Patel', 'Rossi', 'Wang', 'Garcia',
+    'Hassan', 'Ivanova', 'Dubois', 'Silva', 'Johnson', 'Petrov', 'Sato',
+]
+
+SIZES = [
+    '1-50 employees', '50-200 employees', '200-500 employees', '500-1000 employees',
+    '1000-5000 employees', '5000-10000 employees',
+]
+
+PRIVACY = ['Public', 'Private']
+
+FINANCIAL_YEARS = (2015, 2024)
+
+
+class CompanyDataGenerator:
+    """Seeded generator of synthetic company rows in the `ParseFile` .csv format.
+
+    Categorical columns follow a Zipf-like distribution (a handful of industries and
+    countries dominate, like real company registers) and the numeric columns can be
+    left empty at a configurable rate to exercise the None-safe code paths.
+
+    Methods
+    _______
+    rows(count: int) -> Iterator[dict]
+        Yields `count` rows keyed by the .csv headers.
+    write_csv(file_path: str, count: int) -> str
+        Streams `count` rows into a semicolon separated .csv file.
+    """
+
+    def __init__(self, seed: int = 42, null_rate: float = 0, skew: float = 1.1):
+        """
+        :param seed: Seed of the random generator, the same seed always yields the same rows.
+        :type seed: int.
+        :param null_rate: Fraction of rows with empty Year / Revenue / Net Income cells.
+            `ParseFile` rejects empty numbers, so only files that are loaded some other way should have any.
+        :type null_rate: float.
+        :param skew: Exponent of the Zipf-like weights of the categorical columns.
+        :type skew: float.
+        """
+        self.seed = seed
+        self.null_rate = null_rate
+        self.skew = skew
+
+    def _cumulative_weights(self, values: list) -> list:
+        """Builds cumulative Zipf-like weights for the given values.
+
+        :param values: The categorical values, the first ones become the most frequent.
+        :type values: list.
+        :return: The cumulative weights, usable by `random.choices`.
+        :rType: list[float].
+        """
+        return list(accumulate(1 / (rank ** self.skew) for rank in range(1, len(values) + 1)))
+
+    def rows(self, count: int) -> Iterator[dict]:
+        """Yields synthetic rows keyed by the .csv headers.
+
+        :param count: The number of rows to generate.
+        :type count: int.
+        :return: An iterator of rows, numeric cells are None for the null-bearing rows.
+        :rType: Iterator[dict].
+        """
+        rng = random.Random(self.seed)
+        industry_weights = self._cumulative_weights(INDUSTRIES)
+        country_weights = self._cumulative_weights(COUNTRIES)
+        city_weights = self._cumulative_weights(CITIES)
+
+        for index in range(count):
+            founded_year = rng.randint(1950, 2022)
+            year = rng.randint(max(founded_year, FINANCIAL_YEARS[0]), FINANCIAL_YEARS[-1])
+
+            # Log-normal revenue - most companies are small, a few are huge
+            revenue = round(rng.lognormvariate(16, 1.5), 2)
+            net_income = round(revenue * rng.uniform(-0.25, 0.35), 2)
+            if rng.random() < self.null_rate:
+                year = revenue = net_income = None
+
+            name = f"{rng.choice(NAME_PREFIXES)}{rng.choice(NAME_SUFFIXES)}"
+            if index >= len(NAME_PREFIXES) * len(NAME_SUFFIXES):
+                name = f"{name} {index}"
+
+            yield {
+                'Name': name,
+                'Country': rng.choices(COUNTRIES, cum_weights=country_weights)[0],
+                'Industry': rng.choices(INDUSTRIES, cum_weights=industry_weights)[0],
+                'Year of foundation': founded_year,
+                'Year': year,
+                'Revenue': revenue,
+                'Net Income': net_income,
+                'Privacy': rng.choice(PRIVACY),
+                'Size': rng.choice(SIZES),
+                'CEO Name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                'Headquarters': f"{rng.choices(CITIES, cum_weights=city_weights)[0]}, "
+                                f"{rng.choices(COUNTRIES, cum_weights=country_weights)[0]}",
+            }
+
+    def write_csv(self, file_path: str, count: int) -> str:
+        """Streams synthetic rows into a semicolon separated .csv file.
+
+        :param file_path: The destination file, parent folders are created if needed.
+        :type file_path: str.
+        :param count: The number of rows to write.
+        :type count: int.
+        :return: The path of the written file.
+        :rType: str.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        with open(file_path, 'w', newline='', encoding='utf-8') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=CSV_HEADERS, delimiter=';')
+            writer.writeheader()
+            for row in self.rows(count):
+                writer.writerow(row)
+        return file_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic company data .csv file.")
+    parser.add_argument('output', help="Path of the .csv file to write.")
+    parser.add_argument('--rows', type=int, default=10_000, help="Number of rows to generate.")
+    parser.add_argument('--seed', type=int, default=42, help="Seed of the random generator.")
+    parser.add_argument('--null-rate', type=float, default=0,
+                        help="Fraction of rows with empty Year / Revenue / Net Income cells, "
+                             "the import command rejects files with any.")
+    args = parser.parse_args()
+
+    CompanyDataGenerator(args.seed, args.null_rate).write_csv(args.output, args.rows)
+    print(f"{args.rows} rows were written to {args.output}")
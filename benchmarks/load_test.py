@@ -0,0 +1,385 @@
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Iterator
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_PATH = "/api/companies"
+
+# Same filter syntax as ManualSQLQueryEngine.QUERY_RE / LOGIC_RE.
+# Kept as a literal so the load test can run without booting Django.
+QUERY_RE = re.compile(r'(\w+)\s*(>=|<=|>|<|:|=|~|%)\s*"?([^"]+)"?')
+LOGIC_RE = re.compile(r'\s+(AND|OR)\s+', re.IGNORECASE)
+
+
+def load_workload(path: str) -> list:
+    """Reads a JSONL workload - one request per line.
+
+    A line is either a request body of the search endpoint, or an entry written by
+    `RequestRecorderMiddleware` ({"path": ..., "body": {...}, ...}).
+
+    :param path: The workload file.
+    :type path: str.
+    :return: (url path, request body) of every request, in file order.
+    :rType: list[tuple[str, dict]].
+    """
+    workload = []
+    with open(path, encoding='utf-8') as workload_file:
+        for line_number, line in enumerate(workload_file, start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as error:
+                raise ValueError(f"{path}:{line_number} is not valid JSON: {error}")
+            if not isinstance(entry, dict):
+                raise ValueError(f"{path}:{line_number} is not a JSON object")
+            if isinstance(entry.get("body"), dict):
+                workload.append((entry.get("path") or DEFAULT_PATH, entry["body"]))
+            else:
+                workload.append((DEFAULT_PATH, entry))
+    return workload
+
+
+def query_shape(path: str, body: dict) -> str:
+    """The shape of a request - the filtered fields and operators without the values, plus the sort.
+
+    Matches the grouping of `manage.py slow_queries --group-by shape`.
+
+    :rType: str.
+    """
+    parts = []
+    clauses = LOGIC_RE.split(str(body.get("search input") or "").strip())
+    for position, clause in enumerate(clauses):
+        if position % 2:
+            parts.append(clause.upper())
+        else:
+            parts.append(" ".join(f"{field}{op}?" for field, op, _ in QUERY_RE.findall(clause)))
+    shape = " ".join(part for part in parts if part) or "<all>"
+
+    if body.get("sort_by"):
+        # Same normalization as `CustomAlgorithms.algorithm_name`
+        algorithm = body.get("algorithm") or "mergesort"
+        if algorithm not in ("mergesort", "natural_mergesort", "auto"):
+            algorithm = "quicksort"
+        shape += f" | sort {body['sort_by']} {(body.get('sort order') or 'asc').lower()} ({algorithm})"
+    if str(body.get("latest year only", False)).lower() == "true":
+        shape += " | latest"
+    if "page size" in body or "cursor" in body:
+        shape += " | page"
+    if path != DEFAULT_PATH:
+        shape = f"{path} {shape}"
+    return shape
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of an ascending list.
+
+    :param sorted_values: The values, sorted ascending.
+    :type sorted_values: list[float].
+    :param q: The percentile, 0 - 100.
+    :type q: float.
+    :rType: float.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))  # ceil without floats
+    return sorted_values[int(rank) - 1]
+
+
+class LoadTest:
+    """Replays a recorded workload against a running server and measures it.
+
+    The requests are sent by `concurrency` worker threads. With a `rate` the run is open
+    loop - request i is due at `i / rate` seconds, and its latency is measured from that
+    moment, so a stalled server shows up in the latency instead of slowing down the
+    load (no coordinated omission). Without a rate every worker sends the next request
+    as soon as its previous one finished.
+
+    Methods
+    _______
+    run() -> list[dict]
+        Sends the whole workload and returns one result per request.
+    report(results: list, elapsed: float) -> dict
+        Summarizes the results - throughput, latency percentiles, errors and per-shape breakdown.
+    """
+
+    def __init__(self, base_url: str, workload: list, concurrency: int = 4, rate: float = 0,
+                 requests: int = None, timeout: float = 30):
+        """
+        :param base_url: The server, e.g. "http://127.0.0.1:8000".
+        :type base_url: str.
+        :param workload: (url path, request body) pairs from `load_workload`.
+        :type workload: list[tuple[str, dict]].
+        :param concurrency: The number of worker threads.
+        :type concurrency: int.
+        :param rate: Target requests per second, 0 sends as fast as the workers can.
+        :type rate: float.
+        :param requests: How many requests to send, the workload is repeated if it is shorter.
+            Defaults to the workload length.
+        :type requests: int.
+        :param timeout: Timeout of one request in seconds.
+        :type timeout: float.
+        """
+        if not workload:
+            raise ValueError("The workload is empty")
+        self.base_url = base_url.rstrip("/")
+        self.workload = workload
+        self.concurrency = concurrency
+        self.rate = rate
+        self.requests = requests or len(workload)
+        self.timeout = timeout
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """The index of the next request to send, None when the run is over.
+
+        :rType: int | None.
+        """
+        with self._lock:
+            if self._next >= self.requests:
+                return None
+            self._next += 1
+            return self._next - 1
+
+    def _send(self, path: str, body: dict) -> tuple:
+        """Sends one request and reads the whole response.
+
+        :return: (HTTP status or None on a transport error, response bytes, error message).
+        :rType: tuple[int | None, int, str | None].
+        """
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="GET",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, len(response.read()), None
+        except urllib.error.HTTPError as error:
+            return error.code, len(error.read()), None
+        except (urllib.error.URLError, OSError) as error:
+            return None, 0, str(getattr(error, 'reason', error))
+
+    def _worker(self, started: float, results: list) -> None:
+        """Sends requests until the run is over."""
+        while (index := self._take()) is not None:
+            path, body = self.workload[index % len(self.workload)]
+            due = started + index / self.rate if self.rate else time.perf_counter()
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            sent = time.perf_counter()
+            status, size, error = self._send(path, body)
+            finished = time.perf_counter()
+            results[index] = {
+                "index": index,
+                "shape": query_shape(path, body),
+                "status": status,
+                "bytes": size,
+                "error": error,
+                "latency_ms": (finished - due) * 1000,
+                "service_ms": (finished - sent) * 1000,
+                "finished_s": finished - started,
+            }
+
+    def run(self) -> list:
+        """Sends the whole workload and returns one result per request, in request order.
+
+        :rType: list[dict].
+        """
+        results = [None] * self.requests
+        self._next = 0
+        started = time.perf_counter()
+        workers = [
+            threading.Thread(target=self._worker, args=(started, results), daemon=True)
+            for _ in range(self.concurrency)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return results
+
+    @staticmethod
+    def _latency(values: list) -> dict:
+        """Latency statistics of a group of requests in milliseconds.
+
+        :rType: dict.
+        """
+        values = sorted(values)
+        return {
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "p99_ms": round(percentile(values, 99), 3),
+            "max_ms": round(values[-1], 3) if values else 0.0,
+            "mean_ms": round(sum(values) / len(values), 3) if values else 0.0,
+        }
+
+    @classmethod
+    def report(cls, results: list, elapsed: float) -> dict:
+        """Summarizes the results - throughput, latency percentiles, errors and per-shape breakdown.
+
+        A request is an error if it got no response or a status of 400 and above.
+
+        :param results: The results of `run`.
+        :type results: list[dict].
+        :param elapsed: The wall time of the run in seconds.
+        :type elapsed: float.
+        :rType: dict.
+        """
+        is_error = lambda result: result["status"] is None or result["status"] >= 400
+
+        statuses = defaultdict(int)
+        shapes = defaultdict(list)
+        for result in results:
+            statuses[str(result["status"]) if result["status"] is not None else "transport error"] += 1
+            shapes[result["shape"]].append(result)
+
+        # One bucket per second shows the stalls - cold start, snapshot rebuilds, admission rejects
+        timeline = defaultdict(list)
+        for result in results:
+            timeline[int(result["finished_s"])].append(result)
+
+        errors = sum(1 for result in results if is_error(result))
+        return {
+            "requests": len(results),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+            "errors": errors,
+            "error_rate": round(errors / len(results), 4) if results else 0.0,
+            "statuses": dict(sorted(statuses.items())),
+            "first_request_ms": round(results[0]["service_ms"], 3) if results else 0.0,
+            "latency": cls._latency([result["latency_ms"] for result in results]),
+            "service_time": cls._latency([result["service_ms"] for result in results]),
+            "shapes": {
+                shape: dict(
+                    requests=len(group),
+                    errors=sum(1 for result in group if is_error(result)),
+                    **cls._latency([result["latency_ms"] for result in group]),
+                )
+                for shape, group in sorted(shapes.items(), key=lambda item: -len(item[1]))
+            },
+            "timeline": [
+                dict(second=second, requests=len(group), errors=sum(1 for result in group if is_error(result)),
+                     p99_ms=round(percentile(sorted(result["latency_ms"] for result in group), 99), 3))
+                for second, group in sorted(timeline.items())
+            ],
+        }
+
+
+def start_server(port: int, timeout: float = 60) -> subprocess.Popen:
+    """Starts `manage.py runserver` on the given port and waits until it accepts connections.
+
+    :param port: The port to listen on.
+    :type port: int.
+    :param timeout: How long to wait for the server in seconds.
+    :type timeout: float.
+    :rType: subprocess.Popen.
+    """
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(PROJECT_DIR, 'manage.py'), 'runserver', f'127.0.0.1:{port}', '--noreload'],
+        cwd=PROJECT_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"The server exited with code {server.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"The server did not start within {timeout}s")
+
+
+def print_report(report: dict) -> None:
+    """Prints the human readable summary of a report."""
+    latency = report["latency"]
+    print(
+        f"{report['requests']} requests in {report['elapsed_s']}s - {report['throughput_rps']} req/s, "
+        f"errors {report['errors']} ({report['error_rate']:.2%}), statuses {report['statuses']}"
+    )
+    print(
+        f"latency p50={latency['p50_ms']}ms p95={latency['p95_ms']}ms p99={latency['p99_ms']}ms "
+        f"max={latency['max_ms']}ms, first request {report['first_request_ms']}ms"
+    )
+    for shape, stats in report["shapes"].items():
+        print(
+            f"  {shape}\n"
+            f"    requests={stats['requests']} errors={stats['errors']} "
+            f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms"
+        )
+
+
+def iter_results(results: list) -> Iterator[str]:
+    """The per-request results as JSON lines."""
+    for result in results:
+        yield json.dumps(result) + "\n"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a JSONL workload of search requests against a server.")
+    parser.add_argument('workload', help="JSONL file - one request body, or one recorded request, per line.")
+    parser.add_argument('--url', default=None, help="The server to load, e.g. http://127.0.0.1:8000.")
+    parser.add_argument('--start-server', action='store_true',
+                        help="Start manage.py runserver for the run (cold start included) instead of using --url.")
+    parser.add_argument('--port', type=int, default=8765, help="Port of the server started by --start-server.")
+    parser.add_argument('--concurrency', type=int, default=4, help="Number of concurrent workers.")
+    parser.add_argument('--rate', type=float, default=0, help="Target requests per second, 0 means unthrottled.")
+    parser.add_argument('--requests', type=int, default=None,
+                        help="Number of requests, the workload is repeated if needed. Defaults to its length.")
+    parser.add_argument('--timeout', type=float, default=30, help="Timeout of one request in seconds.")
+    parser.add_argument('--output', default=None, help="Where to write the JSON report.")
+    parser.add_argument('--results', default=None, help="Where to write the per-request results as JSONL.")
+    args = parser.parse_args()
+
+    if not args.start_server and not args.url:
+        parser.error("pass --url of a running server or --start-server")
+
+    server = start_server(args.port) if args.start_server else None
+    try:
+        base_url = f"http://127.0.0.1:{args.port}" if server else args.url
+        load_test = LoadTest(base_url, load_workload(args.workload), args.concurrency, args.rate,
+                             args.requests, args.timeout)
+        started = time.perf_counter()
+        results = load_test.run()
+        report = LoadTest.report(results, time.perf_counter() - started)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report["meta"] = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "workload": args.workload,
+        "url": base_url,
+        "concurrency": args.concurrency,
+        "rate": args.rate,
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(report, output_file, indent=2)
+        print(f"The report was written to {args.output}")
+    if args.results:
+        with open(args.results, 'w', encoding='utf-8') as results_file:
+            results_file.writelines(iter_results(results))
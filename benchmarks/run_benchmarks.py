@@ -0,0 +1,401 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import django
+
+# Add the project root path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Path to djano settings
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'coolboxtest.settings')
+
+# Django initialize
+django.setup()
+
+from django.db import connection, connections, transaction, OperationalError
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from api.algorithms import CustomAlgorithms
+from api.csv_parser import ParseFile, COMPANY_INFORMATION_DATA_MAPPING
+from api.models import Company, FinancialData, CompanyDetails
+from api.search_sort_filter_v3 import ManualSQLQueryEngine
+from api.search_table import SearchTable
+from api.snapshot import SnapshotStore
+from benchmarks.data_generator import CompanyDataGenerator
+from coolboxtest.sqlite_profile import SQLITE_TUNING
+
+
+DEFAULT_SIZES = [10_000, 100_000]
+
+# Representative query shapes - equality, substring, numeric range and logic connectors.
+BENCHMARK_QUERIES = [
+    "industry:Software",
+    "country:USA AND revenue>10000000",
+    "name~nova",
+    "founded_year>=2000 AND net_income<0",
+    "industry:Finance OR country:Germany",
+]
+
+SORT_KEYS = ["revenue", "name"]
+
+SORT_ALGORITHMS = {
+    "mergesort": CustomAlgorithms.merge_sort,
+    "quicksort": CustomAlgorithms.quick_sort,
+    "natural_mergesort": CustomAlgorithms.natural_merge_sort,
+}
+
+
+class BenchmarkRunner:
+    """Runs the per-stage benchmarks of the search pipeline for a ladder of dataset sizes.
+
+    Every size gets a fresh benchmark database filled with seeded synthetic data, so two
+    runs with the same arguments measure exactly the same work.
+
+    Methods
+    _______
+    run(sizes: list[int]) -> dict
+        Benchmarks every stage for every dataset size and returns the JSON report.
+    compare(report: dict, baseline: dict, tolerance: float) -> list[str]
+        Lists the stages that got slower than the baseline report.
+    """
+
+    # Populated copy of the search table, read while the import rewrites the real one
+    READ_TABLE = "benchmark_read_rows"
+
+    def __init__(self, seed: int, null_rate: float, repeat: int, import_max_rows: int, work_dir: str):
+        """
+        :param seed: Seed of the synthetic data generator.
+        :type seed: int.
+        :param null_rate: Fraction of rows without financial data.
+        :type null_rate: float.
+        :param repeat: How many times every stage is measured.
+        :type repeat: int.
+        :param import_max_rows: Biggest dataset size the row by row `ParseFile` import is timed on.
+        :type import_max_rows: int.
+        :param work_dir: Folder for the generated .csv files.
+        :type work_dir: str.
+        """
+        self.seed = seed
+        self.null_rate = null_rate
+        self.repeat = repeat
+        self.import_max_rows = import_max_rows
+        self.work_dir = work_dir
+        self.client = Client()
+
+    @staticmethod
+    def _stats(timings: list) -> dict:
+        """Summarizes a list of timings.
+
+        :param timings: The measured durations in seconds.
+        :type timings: list[float].
+        :return: Run count and min / median / mean / max durations in milliseconds.
+        :rType: dict.
+        """
+        timings_ms = [t * 1000 for t in timings]
+        return {
+            "runs": len(timings_ms),
+            "min_ms": round(min(timings_ms), 4),
+            "median_ms": round(statistics.median(timings_ms), 4),
+            "mean_ms": round(statistics.fmean(timings_ms), 4),
+            "max_ms": round(max(timings_ms), 4),
+        }
+
+    def _measure(self, func, repeat: int = None, setup=None) -> dict:
+        """Times `func` several times.
+
+        :param func: The callable that is benchmarked.
+        :type func: Callable.
+        :param repeat: How many times to run it, defaults to the runner setting.
+        :type repeat: int.
+        :param setup: Optional callable executed (untimed) before every run.
+        :type setup: Callable.
+        :return: The timing statistics.
+        :rType: dict.
+        """
+        timings = []
+        for _ in range(repeat or self.repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return self._stats(timings)
+
+    def _load_database(self, size: int) -> None:
+        """Bulk loads the synthetic rows, rows without financial data get no FinancialData record.
+
+        :param size: The number of companies to load.
+        :type size: int.
+        """
+        with SnapshotStore.paused():
+            Company.objects.all().delete()
+            generator = CompanyDataGenerator(self.seed, self.null_rate)
+            batch = []
+            for row in generator.rows(size):
+                batch.append({v: row[k] for k, v in COMPANY_INFORMATION_DATA_MAPPING.items()})
+                if len(batch) == 5_000:
+                    self._bulk_create(batch)
+                    batch = []
+            if batch:
+                self._bulk_create(batch)
+            SearchTable.rebuild()
+
+    @staticmethod
+    def _bulk_create(batch: list) -> None:
+        """Creates Company + related records for one batch of rows.
+
+        :param batch: Rows keyed by the model field names.
+        :type batch: list[dict].
+        """
+        with transaction.atomic():
+            companies = Company.objects.bulk_create([
+                Company(
+                    name=row['name'],
+                    country=row['country'],
+                    industry=row['industry'],
+                    founded_year=row['founded_year'],
+                )
+                for row in batch
+            ])
+            CompanyDetails.objects.bulk_create([
+                CompanyDetails(
+                    company=company,
+                    company_type=row['company_type'],
+                    size=row['size'],
+                    ceo_name=row['ceo_name'],
+                    headquarters=row['headquarters'],
+                )
+                for company, row in zip(companies, batch)
+            ])
+            FinancialData.objects.bulk_create([
+                FinancialData(
+                    company=company,
+                    year=row['year'],
+                    revenue=row['revenue'],
+                    net_income=row['net_income'],
+                )
+                for company, row in zip(companies, batch)
+                if row['revenue'] is not None
+            ])
+
+    def _search(self, body: str) -> None:
+        """Sends one search request through the Django test client.
+
+        :param body: The JSON encoded request body.
+        :type body: str.
+        :raises RuntimeError: If the view does not answer with 200.
+        """
+        response = self.client.generic("GET", "/api/companies", body, content_type="application/json")
+        if response.status_code != 200:
+            raise RuntimeError(f"Search failed with {response.status_code}: {response.content[:200]}")
+
+    def _benchmark_import(self, size: int) -> dict:
+        """Times the `ParseFile` import of a null-free .csv file (the importer rejects empty numbers).
+
+        :param size: The number of rows in the imported file.
+        :type size: int.
+        :return: The timing statistics.
+        :rType: dict.
+        """
+        csv_path = os.path.join(self.work_dir, f"companies_{size}.csv")
+        CompanyDataGenerator(self.seed, null_rate=0).write_csv(csv_path, size)
+        return self._measure(
+            lambda: ParseFile.read_csv_file_and_create_records(csv_path, COMPANY_INFORMATION_DATA_MAPPING),
+            repeat=1,
+        )
+
+    def _benchmark_reads_during_import(self, size: int) -> dict:
+        """Times full table reads while a `ParseFile` import runs in another thread.
+
+        The import empties the search table first, so the reads go to a populated copy of it
+        (`READ_TABLE`) - every read scans `size` rows and only the locking of the import differs.
+
+        :param size: The number of rows in the imported file.
+        :type size: int.
+        :return: The timing statistics of the reads, the number of failed ("database is locked") reads
+            and the rows of the last read.
+        :rType: dict.
+        """
+        csv_path = os.path.join(self.work_dir, f"companies_{size}.csv")
+        if not os.path.exists(csv_path):
+            CompanyDataGenerator(self.seed, null_rate=0).write_csv(csv_path, size)
+
+        self._load_database(size)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {self.READ_TABLE}")
+            cursor.execute(f"CREATE TABLE {self.READ_TABLE} AS SELECT * FROM api_companysearchrow")
+
+        def run_import():
+            try:
+                ParseFile.read_csv_file_and_create_records(csv_path, COMPANY_INFORMATION_DATA_MAPPING)
+            finally:
+                connections.close_all()
+
+        def read_rows():
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT * FROM {self.READ_TABLE} ORDER BY id, financial_year")
+                return cursor.fetchall()
+
+        importer = threading.Thread(target=run_import)
+        importer.start()
+        timings, errors, rows_read = [], 0, 0
+        while importer.is_alive():
+            start = time.perf_counter()
+            try:
+                rows_read = len(read_rows())
+                timings.append(time.perf_counter() - start)
+            except OperationalError:
+                errors += 1
+        importer.join()
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {self.READ_TABLE}")
+
+        stats = self._stats(timings) if timings else {"runs": 0}
+        stats["errors"] = errors
+        stats["rows_per_read"] = rows_read
+        return stats
+
+    def _benchmark_size(self, size: int) -> dict:
+        """Benchmarks every pipeline stage on one dataset size.
+
+        :param size: The number of generated companies.
+        :type size: int.
+        :return: The timing statistics of every stage.
+        :rType: dict.
+        """
+        results = {}
+
+        if size <= self.import_max_rows:
+            results["parse_file_import"] = self._benchmark_import(size)
+            results["reads_during_import"] = self._benchmark_reads_during_import(size)
+
+        self._load_database(size)
+
+        results["get_all_data_cold"] = self._measure(
+            ManualSQLQueryEngine._get_all_data, setup=SnapshotStore.invalidate
+        )
+        results["get_all_data_warm"] = self._measure(ManualSQLQueryEngine._get_all_data)
+        data = ManualSQLQueryEngine._get_all_data()
+
+        results["parse_query"] = self._measure(
+            lambda: [ManualSQLQueryEngine._parse_query(query) for query in BENCHMARK_QUERIES]
+        )
+
+        for query in BENCHMARK_QUERIES:
+            clauses = ManualSQLQueryEngine._parse_query(query)
+            results[f"filter_data[{query}]"] = self._measure(
+                lambda: ManualSQLQueryEngine.filter_data(data, clauses)
+            )
+
+        for algorithm, sort_func in SORT_ALGORITHMS.items():
+            for sort_key in SORT_KEYS:
+                results[f"{algorithm}[{sort_key}]"] = self._measure(lambda: sort_func(data, sort_key))
+
+        self._search(json.dumps({}))  # warm up url resolving and the view imports
+        for query in BENCHMARK_QUERIES:
+            body = json.dumps({"search input": query, "sort_by": "revenue", "sort order": "desc"})
+            results[f"search_view[{query}]"] = self._measure(lambda: self._search(body))
+
+        return results
+
+    def run(self, sizes: list) -> dict:
+        """Benchmarks every stage for every dataset size.
+
+        :param sizes: The dataset sizes (number of companies).
+        :type sizes: list[int].
+        :return: The JSON serializable report.
+        :rType: dict.
+        """
+        report = {
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "platform": platform.platform(),
+                "seed": self.seed,
+                "null_rate": self.null_rate,
+                "repeat": self.repeat,
+                "sqlite_tuning": SQLITE_TUNING,
+            },
+            "sizes": {},
+        }
+        for size in sizes:
+            print(f"Benchmarking {size} rows...")
+            SnapshotStore.invalidate()
+            report["sizes"][str(size)] = self._benchmark_size(size)
+        return report
+
+    @staticmethod
+    def compare(report: dict, baseline: dict, tolerance: float) -> list:
+        """Lists the stages whose median got slower than the baseline by more than `tolerance`.
+
+        :param report: The fresh benchmark report.
+        :type report: dict.
+        :param baseline: A previously saved benchmark report.
+        :type baseline: dict.
+        :param tolerance: Allowed slowdown, 0.2 means up to 20% slower.
+        :type tolerance: float.
+        :return: Human readable regression lines.
+        :rType: list[str].
+        """
+        regressions = []
+        for size, stages in report["sizes"].items():
+            baseline_stages = baseline.get("sizes", {}).get(size, {})
+            for stage, stats in stages.items():
+                previous = baseline_stages.get(stage)
+                if not previous or not previous.get("median_ms") or "median_ms" not in stats:
+                    continue
+                ratio = stats["median_ms"] / previous["median_ms"]
+                if ratio > 1 + tolerance:
+                    regressions.append(
+                        f"{size} rows - {stage}: {previous['median_ms']}ms -> {stats['median_ms']}ms (x{ratio:.2f})"
+                    )
+        return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the search pipeline on synthetic datasets.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Dataset sizes, e.g. --sizes 10000 100000 1000000 10000000")
+    parser.add_argument('--repeat', type=int, default=5, help="How many times every stage is measured.")
+    parser.add_argument('--seed', type=int, default=42, help="Seed of the synthetic data generator.")
+    parser.add_argument('--null-rate', type=float, default=0.02, help="Fraction of rows without financial data.")
+    parser.add_argument('--import-max-rows', type=int, default=100_000,
+                        help="Skip the row by row ParseFile import benchmark above this size.")
+    parser.add_argument('--db-path', help="SQLite file of the benchmark database, defaults to a temporary file.")
+    parser.add_argument('--output', default='bench_output.json', help="Where to write the JSON report.")
+    parser.add_argument('--compare', help="A previous JSON report to check for regressions.")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown against --compare.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Benchmark on a throwaway file database, never on the shipped db.sqlite3
+        connection.settings_dict['TEST']['NAME'] = args.db_path or os.path.join(work_dir, 'benchmark.sqlite3')
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            runner = BenchmarkRunner(args.seed, args.null_rate, args.repeat, args.import_max_rows, work_dir)
+            report = runner.run(args.sizes)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    with open(args.output, 'w', encoding='utf-8') as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"The report was written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            regressions = BenchmarkRunner.compare(report, json.load(baseline_file), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
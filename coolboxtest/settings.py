@@ -5,6 +5,8 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+from coolboxtest.sqlite_profile import database_settings  # noqa: E402 - reads SQLITE_TUNING
+
 SECRET_KEY = os.getenv("SECRET_KEY")
 DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 
@@ -12,6 +14,39 @@ DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 BASE_DIR = Path(__file__).resolve().parent.parent
 COMPANY_INFORMATION_FILE_PATH = os.path.join(BASE_DIR, 'company data', 'company_data_.csv')
 
+# Per-stage search timings (Server-Timing header + /metrics endpoint)
+SEARCH_METRICS_ENABLED = os.getenv("SEARCH_METRICS_ENABLED", "False").lower() == "true"
+
+# Searches slower than the threshold are written to a rotating JSONL file, 0 disables the log
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "0"))
+SLOW_QUERY_LOG_PATH = os.getenv("SLOW_QUERY_LOG_PATH", os.path.join(BASE_DIR, 'logs', 'slow_queries.jsonl'))
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUP_COUNT = 5
+
+# Admission control - searches with an estimated cost (rows matched against a filter) of at least
+# SEARCH_HEAVY_QUERY_COST share SEARCH_HEAVY_QUERY_CONCURRENCY slots per process, 0 disables the limit.
+# Every search stops after SEARCH_DEADLINE_MS, 0 disables the deadline.
+SEARCH_HEAVY_QUERY_COST = int(os.getenv("SEARCH_HEAVY_QUERY_COST", "2000000"))
+SEARCH_HEAVY_QUERY_CONCURRENCY = int(os.getenv("SEARCH_HEAVY_QUERY_CONCURRENCY", "2"))
+SEARCH_ADMISSION_WAIT_MS = float(os.getenv("SEARCH_ADMISSION_WAIT_MS", "100"))
+SEARCH_DEADLINE_MS = float(os.getenv("SEARCH_DEADLINE_MS", "10000"))
+SEARCH_RETRY_AFTER_SECONDS = int(os.getenv("SEARCH_RETRY_AFTER_SECONDS", "2"))
+
+# Keep the JSON of every snapshot row pre-encoded, responses join the fragments instead of encoding the rows (off by default, costs memory)
+SEARCH_PREENCODED_ROWS = os.getenv("SEARCH_PREENCODED_ROWS", "False").lower() == "true"
+
+# Read-only nodes: build the search snapshot straight from this .csv file instead of the db, an empty
+# path keeps the db. The file is checked for changes every SEARCH_SNAPSHOT_CSV_CHECK_SECONDS.
+SEARCH_SNAPSHOT_CSV = os.getenv("SEARCH_SNAPSHOT_CSV", "")
+SEARCH_SNAPSHOT_CSV_CHECK_SECONDS = float(os.getenv("SEARCH_SNAPSHOT_CSV_CHECK_SECONDS", "1"))
+
+# Search requests recorded as a JSONL workload for benchmarks/load_test.py, an empty path disables the recorder
+REQUEST_RECORDER_PATH = os.getenv("REQUEST_RECORDER_PATH", "")
+REQUEST_RECORDER_PREFIX = "/api/companies"
+REQUEST_RECORDER_SAMPLE_RATE = float(os.getenv("REQUEST_RECORDER_SAMPLE_RATE", "1"))
+REQUEST_RECORDER_MAX_BYTES = 50 * 1024 * 1024
+REQUEST_RECORDER_BACKUP_COUNT = 5
+
 ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS", "").split(",") if not DEBUG else ["localhost", "127.0.0.1"]
 
 # Application definition
@@ -44,6 +79,9 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+# The recorder reads every search body, it is only installed when it records somewhere
+if REQUEST_RECORDER_PATH:
+    MIDDLEWARE.append('api.middleware.RequestRecorderMiddleware')
 
 ROOT_URLCONF = 'coolboxtest.urls'
 
@@ -69,11 +107,10 @@ WSGI_APPLICATION = 'coolboxtest.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# The tuned SQLite profile (WAL, mmap, page cache, persistent per-thread connections)
+# lives in coolboxtest/sqlite_profile.py, SQLITE_TUNING=False restores the plain defaults.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_settings(BASE_DIR / 'db.sqlite3'),
 }
 
 